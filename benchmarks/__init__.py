@@ -0,0 +1,16 @@
+"""
+benchmarks
+~~~~~~~~~~
+
+Performance benchmarks for the Zed lang. Each module in this package can
+be run as a script, for example::
+
+    $ python -m benchmarks.startup
+
+The suite module runs the main benchmarks on generated programs, writes the
+results as JSON and compares them against a saved baseline::
+
+    $ python -m benchmarks.suite run --output baseline.json
+    $ python -m benchmarks.suite run --output results.json
+    $ python -m benchmarks.suite compare baseline.json results.json --threshold 0.1
+"""
@@ -0,0 +1,98 @@
+"""Benchmarks the latency of zed.aio under load.
+
+Many programs are submitted at once with zed.aio.run_many() while a ticker
+task measures how late the event loop wakes it up, showing whether running
+programs blocks the loop. The outputs are checked against running each
+program synchronously and a timed out run is checked to be cancelled.
+
+Usage::
+
+    $ python -m benchmarks.aio [--programs N] [--statements N] [--concurrency N]
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.utils import make_program
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+async def ticker(lags: List[float], interval: float = 0.005) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def bench(sources: List[str], concurrency: int) -> None:
+    import zed
+    import zed.aio
+
+    latencies: List[float] = []
+
+    async def timed(source: str) -> zed.RunResult:
+        start = time.perf_counter()
+        result = await zed.aio.run(source)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    lags: List[float] = []
+    tick = asyncio.ensure_future(ticker(lags))
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(source: str) -> zed.RunResult:
+        async with semaphore:
+            return await timed(source)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*map(bounded, sources))
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+
+    interpreter = zed.Interpreter()
+    for source, result in zip(sources, results):
+        if result.output != interpreter.run(source).output:
+            raise SystemExit('output of zed.aio.run() differs from Interpreter.run()')
+
+    ordered = await zed.aio.run_many(sources[:8], concurrency=2)
+    if [r.output for r in ordered] != [r.output for r in results[:8]]:
+        raise SystemExit('run_many() returned results out of order')
+
+    try:
+        await zed.aio.run(make_program(500000), timeout=0.05)
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise SystemExit('run() did not time out')
+
+    print('%d programs in %.3f s (%.0f programs/sec)' % (len(sources), elapsed, len(sources) / elapsed))
+    print('run() latency  p50 %7.2f ms  p99 %7.2f ms' % (
+        percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000))
+    print('event loop lag p50 %7.2f ms  p99 %7.2f ms' % (
+        percentile(lags, 50) * 1000, percentile(lags, 99) * 1000))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--programs', type=int, default=500)
+    parser.add_argument('--statements', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    sources = [
+        make_program(args.statements).replace('value number', 'program %d value' % i)
+        for i in range(args.programs)
+    ]
+    asyncio.run(bench(sources, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Benchmarks the memory retained per AST node by a parsed program.
+
+Usage::
+
+    $ python -m benchmarks.ast_memory [--statements N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from collections import Counter
+
+from benchmarks.utils import make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=1000000)
+    args = parser.parse_args()
+
+    import zed
+
+    source = make_program(args.statements)
+    tokens = zed.get_lexer('fast').tokenize(source)
+    parser_ = zed.get_parser()
+
+    gc.collect()
+    tracemalloc.start()
+    state = zed.ParserState()
+    program = parser_.parse(iter(tokens), state=state)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Count the distinct nodes reachable from the statements.
+    seen = set()
+    kinds: Counter = Counter()
+    for stmt in state.get_stmts():
+        for node in (stmt, getattr(stmt, 'value', None)):
+            if isinstance(node, zed.ast.BaseToken) and id(node) not in seen:
+                seen.add(id(node))
+                kinds[type(node).__name__] += 1
+
+    nodes = len(seen) + 1  # the Program
+    print('%d statements, %d nodes (%s)' % (
+        len(state.get_stmts()), nodes, ', '.join('%s: %d' % item for item in sorted(kinds.items()))))
+    print('%.1f bytes/node retained, %.1f MiB retained, %.1f MiB peak' %
+          (retained / nodes, retained / (1 << 20), peak / (1 << 20)))
+    del program
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmarks running a corpus of files with the batch runner.
+
+A temporary corpus is generated and run with run_batch() using several
+numbers of jobs, after checking that the results are in input order and
+match running each file alone. For comparison, a sample of the files is
+run with one ``python -m zed`` process per file.
+
+Usage::
+
+    $ python -m benchmarks.batch [--files N] [--statements N] [--sample N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import ROOT, make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--statements', type=int, default=1000)
+    parser.add_argument('--sample', type=int, default=10)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    import zed
+    from zed.batch import find_files, run_batch
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.files):
+            source = make_program(args.statements).replace('value number', 'file %d value' % i)
+            if i % 50 == 0:
+                source += 'print not_defined\n'
+            with open(os.path.join(tmp, 'file%05d.zed' % i), 'w') as f:
+                f.write(source)
+
+        paths = find_files(tmp)
+        interpreter = zed.Interpreter()
+        expected = [interpreter.run_file(path).output for path in paths]
+
+        for jobs in args.jobs:
+            start = time.perf_counter()
+            results = list(run_batch(paths, jobs))
+            elapsed = time.perf_counter() - start
+
+            if [r.path for r in results] != paths or [r.output for r in results] != expected:
+                raise SystemExit('batch results with %d jobs differ from running each file' % jobs)
+
+            print('batch -j %-2d %8.1f files/sec  (%.3f s)' % (jobs, len(paths) / elapsed, elapsed))
+
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        start = time.perf_counter()
+        for path in paths[:args.sample]:
+            subprocess.run(
+                [sys.executable, '-m', 'zed', '--engine', 'tree', path],
+                env=env, stdout=subprocess.DEVNULL, check=True,
+            )
+        elapsed = time.perf_counter() - start
+        print('python -m zed %5.1f files/sec  (%d files, %.3f s)' % (args.sample / elapsed, args.sample, elapsed))
+
+
+if __name__ == '__main__':
+    main()
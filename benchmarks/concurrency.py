@@ -0,0 +1,55 @@
+"""Benchmarks running many programs concurrently with a shared Interpreter.
+
+Every program is run from a thread pool of each size and its output is
+checked against the output of running it alone, so runs leaking state into
+each other are caught. Throughput is reported in programs per second.
+
+Usage::
+
+    $ python -m benchmarks.concurrency [--programs N] [--statements N] [--engine ENGINE]
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import argparse
+import time
+
+from benchmarks.utils import make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--programs', type=int, default=400)
+    parser.add_argument('--statements', type=int, default=200)
+    parser.add_argument('--engine', default='tree')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    import zed
+
+    interpreter = zed.Interpreter(lexer='fast', engine=args.engine)
+
+    # Programs differ from each other so mixed up outputs are detected.
+    sources = [
+        make_program(args.statements).replace('value number', 'program %d value' % i)
+        for i in range(args.programs)
+    ]
+    expected = [interpreter.run(source).output for source in sources]
+
+    for workers in args.workers:
+        with ThreadPoolExecutor(workers) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(interpreter.run, sources))
+            elapsed = time.perf_counter() - start
+
+        for result, output in zip(results, expected):
+            if not result.ok or result.output != output:
+                raise SystemExit('concurrent run with %d workers differs from sequential run' % workers)
+
+        print('%2d workers %10.0f programs/sec  (%.3f s)' % (workers, args.programs / elapsed, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmarks the execution speed of each engine in statements per second.
+
+Before timing, the output of every engine is checked to be identical to
+the output of the tree-walking engine.
+
+Only running the prepared program is timed. Compiling it for the vm and
+py engines is not, so the results do not reflect a single end to end run,
+where the vm engine is slower than the tree engine.
+
+Usage::
+
+    $ python -m benchmarks.engines [--statements N] [--runs N]
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict
+
+import argparse
+import contextlib
+import io
+import time
+
+from benchmarks.utils import make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    import zed
+
+    source = make_program(args.statements)
+    tokens = zed.get_lexer('fast').tokenize(source)
+
+    def parse() -> zed.ast.Program:
+        return zed.get_parser().parse(iter(tokens), state=zed.ParserState())  # type: ignore
+
+    def prepare_vm(program: zed.ast.Program) -> Callable[[], None]:
+        code = zed.vm.compile_program(program)
+        machine = zed.vm.VirtualMachine()
+        return lambda: machine.run(code)
+
+    def prepare_py(program: zed.ast.Program) -> Callable[[], None]:
+        code = zed.compile_to_code(source, lexer='fast')
+        return lambda: zed.exec_code(code)
+
+    # Maps an engine to a function that prepares a parsed program and returns
+    # a callable running it. Only the returned callable is timed.
+    engines: Dict[str, Callable[[zed.ast.Program], Callable[[], None]]] = {
+        'tree': lambda program: program.eval,
+        'vm': prepare_vm,
+        'py': prepare_py,
+    }
+
+    outputs = {}
+    for engine, prepare in engines.items():
+        run = prepare(parse())
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            run()
+        outputs[engine] = out.getvalue()
+        if outputs[engine] != outputs['tree']:
+            raise SystemExit('output of %r engine differs from tree engine' % engine)
+
+    nstmts = len(parse().tokens[0].state.get_stmts())
+    print('%d statements' % nstmts)
+
+    for engine, prepare in engines.items():
+        timings = []
+        for _ in range(args.runs):
+            run = prepare(parse())
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        print('%-6s %12.0f statements/sec  (%.3f s)' % (engine, nstmts / best, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""A seeded generator of synthetic Zed programs.
+
+The generated programs are valid: identifiers are only printed or deleted
+while they are defined. The same seed, size and mix always produce the same
+program, so benchmark results are comparable across runs and machines.
+
+Usage::
+
+    $ python -m benchmarks.generator [--statements N] [--mix MIX] [--seed N] > program.zed
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+import argparse
+import random
+import string
+
+
+class Mix:
+    """The shape of a generated program.
+
+    Parameters
+    ----------
+    print_literal, print_ident, let, delete: :class:`float`
+        The relative weights of printing a literal, printing an identifier,
+        defining an identifier and deleting one.
+    literal_length: :class:`int`
+        The average length of string literals.
+    identifiers: :class:`int`
+        The number of distinct identifiers used.
+    """
+    def __init__(
+        self,
+        print_literal: float = 1,
+        print_ident: float = 1,
+        let: float = 1,
+        delete: float = 1,
+        literal_length: int = 16,
+        identifiers: int = 64,
+    ) -> None:
+        self.weights = [print_literal, print_ident, let, delete]
+        self.literal_length = literal_length
+        self.identifiers = identifiers
+
+
+MIXES: Dict[str, Mix] = {
+    'balanced': Mix(),
+    'literals': Mix(print_literal=4, literal_length=2000),
+    'identifiers': Mix(print_ident=2, let=2, delete=0.2, identifiers=50000),
+    'churn': Mix(print_literal=0.2, print_ident=0.5, let=3, delete=3, identifiers=16),
+    'prints': Mix(print_literal=4, print_ident=4, let=0.5, delete=0.2),
+}
+
+
+def generate_program(statements: int, seed: int = 0, mix: str = 'balanced') -> str:
+    """Returns the source of a program with the given number of statements."""
+    rng = random.Random('%s:%d:%d' % (mix, seed, statements))
+    shape = MIXES[mix]
+    names = ['%s_%d' % (rng.choice(string.ascii_lowercase), i) for i in range(shape.identifiers)]
+    defined: List[str] = []
+    positions: Dict[str, int] = {}
+    lines = []
+
+    def literal() -> str:
+        length = rng.randint(0, shape.literal_length * 2)
+        text = ''.join(rng.choices(string.ascii_letters + string.digits + ' ', k=length))
+        return rng.choice(('"%s"', "'%s'")) % text
+
+    for kind in rng.choices(range(4), shape.weights, k=statements):
+        if kind == 1 and defined:
+            lines.append('print %s' % rng.choice(defined))
+        elif kind == 2:
+            name = rng.choice(names)
+            value = rng.choice(defined) if defined and rng.random() < 0.2 else literal()
+            lines.append('let %s = %s' % (name, value))
+            if name not in positions:
+                positions[name] = len(defined)
+                defined.append(name)
+        elif kind == 3 and defined:
+            # Swap the deleted name with the last one to remove it in O(1).
+            name = defined[rng.randrange(len(defined))]
+            last = defined.pop()
+            if last != name:
+                defined[positions[name]] = last
+                positions[last] = positions[name]
+            del positions[name]
+            lines.append('del %s' % name)
+        else:
+            lines.append('print %s' % literal())
+
+    return '\n'.join(lines) + '\n'
+
+def random_program(rng: random.Random, statements: int) -> str:
+    """Returns a random valid program over a few names, using let, del, print and undefined.
+
+    Unlike generate_program(), names are often bound to other names, redefined
+    and left without a value, and equal literals are common, which exercises
+    the optimizer.
+    """
+    names = ['a', 'b', 'c', 'd', 'e']
+    values = ['"one"', "'two'", '"one"', '""', 'undefined']
+    defined: List[str] = []
+    lines = []
+
+    for _ in range(statements):
+        choice = rng.random()
+        if choice < 0.3:
+            name = rng.choice(names)
+            value = rng.choice(values + defined) if rng.random() < 0.8 else None
+            lines.append('let %s' % name if value is None else 'let %s = %s' % (name, value))
+            if name not in defined:
+                defined.append(name)
+        elif choice < 0.4 and defined:
+            name = rng.choice(defined)
+            defined.remove(name)
+            lines.append('del %s' % name)
+        else:
+            lines.append('print %s' % rng.choice(values + defined))
+
+    return '\n'.join(lines) + '\n'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=1000)
+    parser.add_argument('--mix', choices=sorted(MIXES), default='balanced')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(generate_program(args.statements, args.seed, args.mix), end='')
+
+
+if __name__ == '__main__':
+    main()
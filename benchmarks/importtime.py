@@ -0,0 +1,106 @@
+"""Benchmarks the startup time of ``import zed``, lexing and a full run.
+
+Each scenario is run in a fresh interpreter and its wall clock time, less
+that of a bare interpreter, is reported along with the budget of scenario.
+The modules imported by each scenario are those in sys.modules at exit that
+a bare interpreter does not import. tests/test_imports.py checks that no
+scenario imports a module it must not import, such as the parser for
+``import zed``, and with ZED_TEST_IMPORT_TIMES=1 that none is over budget.
+
+Importing any part of rply imports all of it, so the rply lexer costs about
+as much to start as a full run. Only the fast lexer starts without rply.
+
+Usage::
+
+    $ python -m benchmarks.importtime [--runs N]
+"""
+
+from __future__ import annotations
+
+from typing import List, Set, Tuple
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import ROOT
+
+# Checks that lexing and reading the engines does not register the grammar.
+_LEX_ONLY = '''
+import zed
+list(zed.get_lexer(%r).lex('print "hello"'))
+zed.ENGINES, zed.OPTIMIZATION_LEVELS, zed.PARSER_ENGINES
+import zed.parser
+assert zed.parser._pg is None, 'grammar was registered without get_parser()'
+'''
+
+# Runs python with the given arguments and writes the modules imported to
+# stderr on exit. Unlike -X importtime, this sees the submodules imported
+# by importlib.import_module(), as zed.__getattr__() does.
+_RUNNER = '''
+import atexit, json, runpy, sys
+atexit.register(lambda: sys.stderr.write('\\n' + json.dumps(sorted(sys.modules)) + '\\n'))
+args = %r
+if args[0] == '-c':
+    sys.argv = ['-c', *args[2:]]
+    exec(compile(args[1], '<string>', 'exec'), {'__name__': '__main__'})
+else:
+    sys.argv = [args[1], *args[2:]]
+    runpy.run_module(args[1], run_name='__main__', alter_sys=True)
+'''
+
+# Modules that only the engines, the instrumented modes or the batch runner
+# need, and that lexing or running a file must therefore not import.
+_ENGINES = ['zed.pycompile', 'zed.stream', 'zed.stats', 'zed.memory', 'zed.trace', 'multiprocessing']
+
+
+def scenarios(path: str) -> List[Tuple[str, List[str], float, List[str]]]:
+    """Returns the scenarios as (name, arguments, budget in ms, modules that must not be imported).
+
+    The path is of a small Zed file to lex and run.
+    """
+    return [
+        ('import zed', ['-c', 'import zed'], 10, ['typing', 'rply', 'zed.parser', 'zed.lexer']),
+        ('fast lexer', ['-c', _LEX_ONLY % 'fast'], 30, ['rply', 'zed.vm', *_ENGINES]),
+        ('rply lexer', ['-c', _LEX_ONLY % 'rply'], 60, ['zed.vm', *_ENGINES]),
+        ('zed --lex fast', ['-m', 'zed', '--lex', '1', '--lexer', 'fast', path], 60, ['rply', 'zed.vm', *_ENGINES]),
+        ('zed file', ['-m', 'zed', '--no-cache', path], 100, _ENGINES),
+    ]
+
+def baseline() -> Tuple[float, Set[str]]:
+    """Returns the time in ms taken by and the modules imported by a bare interpreter."""
+    return import_times(['-c', 'pass'])
+
+def import_times(args: List[str]) -> Tuple[float, Set[str]]:
+    """Runs python with the given arguments and returns the time taken in ms and the modules imported."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', _RUNNER % (args,)], cwd=ROOT, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000, set(json.loads(proc.stderr.decode().splitlines()[-1]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.zed', delete=False) as f:
+        f.write('let greeting = "hello"\nprint greeting\n')
+    try:
+        bare = min(baseline()[0] for _ in range(args.runs))
+
+        print('%-16s %10s %10s' % ('scenario', 'start ms', 'budget ms'))
+        for name, argv, budget, _ in scenarios(f.name):
+            best = min(import_times(argv)[0] for _ in range(args.runs))
+            print('%-16s %10.1f %10.1f' % (name, best - bare, budget))
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Checks incremental parsing and the REPL session, and benchmarks keystroke latency.
+
+First, random edits are made to generated programs and after each edit the
+result of running the document must be the same as running its text from
+scratch, including the error and its position. Programs are also run one
+line at a time in a REPL session, which must print the same output.
+
+Then single character edits are made to a large document and the time from
+the edit to its first error being known is reported, against lexing and
+parsing the whole text again. Edits inside ``print`` statements only parse
+that statement, edits of a ``let`` also parse the statements using the
+variable until it is defined again. The ``print`` edits are then repeated
+with an invalid token in the middle of the document, whose position is
+looked up after each edit.
+
+Usage::
+
+    $ python -m benchmarks.incremental [--lines N] [--edits N] [--programs N] [--seed N]
+"""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import argparse
+import random
+import time
+
+from benchmarks.generator import generate_program
+
+_FRAGMENTS = ['print ', 'let ', 'del ', 'a', 'b', ' = ', '"x"', "'y'", 'undefined', ' ', '\n', '$', '"',
+              'print a\n', 'let a = "z"\n', 'del a\n']
+
+
+def check_document(rng: random.Random, programs: int, edits: int) -> None:
+    import zed
+
+    for i in range(programs):
+        parser = rng.choice(zed.PARSER_ENGINES)
+        interpreter = zed.Interpreter(lexer='fast', parser=parser)
+        source = generate_program(rng.randint(0, 40), i, rng.choice(['balanced', 'churn']))
+        # Short names make the random edits refer to defined variables.
+        doc = zed.IncrementalDocument(source.replace('a_', 'a').replace('b_', 'b'), parser=parser)
+
+        for _ in range(edits):
+            lines = doc.text.split('\n')
+            start = rng.randrange(len(lines))
+            end = min(len(lines) - 1, start + rng.choice([0, 0, 0, 1, 2]))
+            start_col = rng.randint(0, len(lines[start]))
+            end_col = rng.randint(start_col if start == end else 0, len(lines[end]))
+            doc.edit(start, start_col, end, end_col, ''.join(rng.choices(_FRAGMENTS, k=rng.randint(0, 3))))
+
+            expected = interpreter.run(doc.text)
+            result = doc.run()
+            if (result.output, str(result.error)) != (expected.output if expected.ok else '', str(expected.error)):
+                raise SystemExit('incremental document differs from a full run for:\n%r' % doc.text)
+
+def check_session(programs: int) -> None:
+    import zed
+
+    for i in range(programs):
+        source = generate_program(200, i, 'churn')
+        sink = zed.CaptureSink()
+        session = zed.Session(sink)
+        for line in source.splitlines():
+            session.run(line)
+        if sink.getvalue() != zed.Interpreter().run(source).output:
+            raise SystemExit('REPL session differs from a full run for seed %d' % i)
+
+def keystrokes(doc: Any, lines: List[str], kind: str, edits: int, rng: random.Random) -> List[float]:
+    """Types a character in the string literal of random lines of the given kind and returns the latencies."""
+    candidates = [i for i, line in enumerate(lines) if line.startswith(kind) and '"' in line]
+    timings = []
+    for index in rng.sample(candidates, edits):
+        col = lines[index].index('"') + 1
+        start = time.perf_counter()
+        doc.edit(index, col, index, col, 'x')
+        doc.error
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=100000)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--programs', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import zed
+    import zed.incremental
+
+    rng = random.Random(args.seed)
+    check_document(rng, args.programs, 20)
+    # Keeping the variables every few statements exercises updating them.
+    checkpoint, zed.incremental._CHECKPOINT = zed.incremental._CHECKPOINT, 2
+    try:
+        check_document(rng, args.programs // 3, 20)
+    finally:
+        zed.incremental._CHECKPOINT = checkpoint
+    check_session(args.programs // 10)
+    print('%d edited documents and %d REPL sessions match full runs' % (args.programs * 4 // 3, args.programs // 10))
+
+    source = generate_program(args.lines, args.seed, 'balanced')
+    lines = source.splitlines()
+    for engine in zed.PARSER_ENGINES:
+        lexer, parser_ = zed.get_lexer('fast'), zed.get_parser(engine=engine)
+        start = time.perf_counter()
+        parser_.parse(lexer.lex(source), state=zed.ParserState(zed.NullSink()))
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        doc = zed.IncrementalDocument(source, parser=engine)
+        opened = time.perf_counter() - start
+        print('%s parser, %d lines: full parse %.1f ms, opening document %.1f ms' % (
+            engine, len(lines), full * 1000, opened * 1000))
+
+        for kind in ('print', 'let'):
+            # The edits leave the lines where the next edits are looked up
+            # in the same place, as they only add characters.
+            timings = keystrokes(doc, lines, kind, args.edits, rng)
+            p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+            print('  %-6s keystroke p50 %7.3f ms   p99 %7.3f ms   %6.0fx faster than a full parse' % (
+                kind, p50 * 1000, p99 * 1000, full / p50))
+
+        middle = len(lines) // 2
+        doc.edit(middle, 0, middle, 0, '$')
+        lines[middle] = '$' + lines[middle]
+        timings = keystrokes(doc, lines, 'print', args.edits, rng)
+        p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+        print('  %-6s keystroke p50 %7.3f ms   p99 %7.3f ms   %6.0fx faster than a full parse' % (
+            'error', p50 * 1000, p99 * 1000, full / p50))
+        doc.edit(middle, 0, middle, 1, '')
+        lines[middle] = lines[middle][1:]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Benchmarks lex_parallel() with different numbers of workers.
+
+A large file is generated and lexed with 1, 2, 4 and 8 workers after
+checking that the tokens and their offsets are identical to lexing the
+whole source with the fast engine in a single process.
+
+Usage::
+
+    $ python -m benchmarks.lex_parallel [--statements N] [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.utils import best_of, make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=2000000)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    import zed
+
+    source = make_program(args.statements)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'program.zed')
+        with open(path, 'w') as f:
+            f.write(source)
+
+        expected = zed.get_lexer('fast').tokenize(source)
+        print('%.1f MiB, %d tokens, %d CPUs' % (len(source) / (1 << 20), len(expected), os.cpu_count() or 1))
+
+        for workers in args.workers:
+            tokens = zed.lex_parallel(path, workers)
+            if (tokens.types, tokens.starts, tokens.ends) != (expected.types, expected.starts, expected.ends):
+                raise SystemExit('tokens lexed with %d workers differ from a single process' % workers)
+
+            best, _ = best_of(lambda: zed.lex_parallel(path, workers), args.runs)
+            print('%d workers %12.0f tokens/sec  (%.3f s)' % (workers, len(tokens) / best, best))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Benchmarks the throughput of the lexer engines on a large generated program.
+
+The token streams of the engines are checked to be identical by
+tests/test_lexer.py.
+
+Usage::
+
+    $ python -m benchmarks.lexer [--size-mb N] [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from benchmarks.utils import best_of, make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=4.0)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    import zed
+
+    # Each generated statement is ~20 bytes on average.
+    source = make_program(int(args.size_mb * (1 << 20) / 20))
+    engines = zed.LEXER_ENGINES
+    ntokens = len(zed.get_lexer('fast').tokenize(source))
+    print('%.2f MB, %d tokens' % (len(source) / (1 << 20), ntokens))
+
+    for engine in engines:
+        lexer = zed.get_lexer(engine)
+        best, _ = best_of(lambda: sum(1 for _ in lexer.lex(source)), args.runs)
+        print('%-6s %10.0f tokens/sec  (%.3f s)' % (engine, ntokens / best, best))
+
+    # The rply engine computes line and column of every token while lexing,
+    # the fast engine only does so on request through its line index.
+    tokens = zed.get_lexer('fast').tokenize(source)
+
+    def resolve_last() -> None:
+        tokens._lines = None
+        tokens.getsourcepos(len(tokens) - 1)
+
+    def resolve_all() -> None:
+        tokens._lines = None
+        for i in range(len(tokens)):
+            tokens.getsourcepos(i)
+
+    best, _ = best_of(resolve_last, args.runs)
+    print('fast   line index + one position     %.3f ms' % (best * 1e3))
+    best, _ = best_of(resolve_all, args.runs)
+    print('fast   line index + every position   %.3f s' % best)
+
+
+if __name__ == '__main__':
+    main()
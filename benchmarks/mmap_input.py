@@ -0,0 +1,81 @@
+"""Benchmarks the peak memory of reading a file versus memory mapping it.
+
+Each program is lexed and parsed, and then optionally run with its output
+discarded, in a separate process which reports its peak RSS. The ``read``
+path reads the file into a string and lexes it with the fast engine while
+the ``mmap`` path uses lex_file(). Both paths are checked to print the same
+output first.
+
+Usage::
+
+    $ python -m benchmarks.mmap_input [--statements N ...] [--literal-size N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import ROOT, make_program
+
+# Parses (and runs) the program given on the command line and reports the
+# peak RSS in KiB.
+_RUNNER = '''
+import sys, zed
+from benchmarks.utils import peak_rss_kib
+path, mode, run = sys.argv[1], sys.argv[2], sys.argv[3] == 'run'
+if mode == 'mmap':
+    tokens = zed.lex_file(path)
+else:
+    with open(path) as f:
+        tokens = zed.get_lexer('fast').tokenize(f.read())
+output = zed.StreamSink() if sys.argv[3] == 'check' else zed.NullSink()
+program = zed.get_parser().parse(iter(tokens), state=zed.ParserState(output))
+del tokens
+if run or sys.argv[3] == 'check':
+    program.eval()
+sys.stderr.write('%d\\n' % peak_rss_kib())
+'''
+
+
+def measure(path: str, mode: str, action: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-c', _RUNNER, path, mode, action], cwd=ROOT, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+def peak_rss(path: str, mode: str, action: str) -> float:
+    proc = measure(path, mode, action)
+    return int(proc.stderr.decode().strip().splitlines()[-1]) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, nargs='+', default=[100000, 400000])
+    parser.add_argument('--literal-size', type=int, default=200,
+                        help='The length of padding added to each string literal.')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='zed-bench-')
+    try:
+        print('%10s %12s %10s %10s %10s %10s' % (
+            'statements', 'size', 'parse read', 'parse mmap', 'run read', 'run mmap'))
+        for count in args.statements:
+            path = os.path.join(directory, 'program.zed')
+            with open(path, 'w') as f:
+                f.write(make_program(count).replace('value number', 'value ' + 'x' * args.literal_size))
+
+            if measure(path, 'read', 'check').stdout != measure(path, 'mmap', 'check').stdout:
+                raise SystemExit('output of mmap path differs from read path')
+
+            size = os.path.getsize(path) / (1 << 20)
+            results = [peak_rss(path, mode, action) for action in ('parse', 'run') for mode in ('read', 'mmap')]
+            print('%10d %8.2f MiB' % (count, size) + ''.join('%7.1f MiB' % value for value in results))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Benchmarks the optimization levels of zed.optimize().
+
+A large program is optimized at each level and the number of nodes
+evaluated, the optimization time and the run time are reported. That every
+level prints the same output with every engine is checked by
+tests/test_optimizer.py.
+
+Usage::
+
+    $ python -m benchmarks.optimize [--statements N] [--seed N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from benchmarks.generator import random_program
+from benchmarks.utils import make_program
+
+
+def run_levels(source: str) -> None:
+    import zed
+
+    tokens = zed.get_lexer('fast').tokenize(source)
+
+    for level in zed.OPTIMIZATION_LEVELS:
+        program = zed.get_parser().parse(iter(tokens), state=zed.ParserState(zed.NullSink()))
+
+        start = time.perf_counter()
+        zed.optimize(program, level)  # type: ignore
+        optimized = time.perf_counter() - start
+
+        # Each statement is evaluated and so is the value of each print.
+        stmts = list(zed.vm.iter_statements(program))  # type: ignore
+        nodes = len(stmts) + sum(isinstance(stmt, zed.ast.Print) for stmt in stmts)
+        distinct = len({id(stmt.value) for stmt in stmts if isinstance(stmt, zed.ast.Print)})
+
+        start = time.perf_counter()
+        program.eval()  # type: ignore
+        elapsed = time.perf_counter() - start
+
+        print('-O%d %9d nodes evaluated  %8d distinct values  optimize %.3f s  run %.3f s' % (
+            level, nodes, distinct, optimized, elapsed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=400000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workloads = [
+        ('generated', make_program(args.statements)),
+        ('random', random_program(rng, args.statements)),
+    ]
+    for name, source in workloads:
+        print(name)
+        run_levels(source)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmarks the throughput of print-heavy programs with each output sink.
+
+StreamSink matches the previous behaviour of calling print() for every
+print statement. The output is written to a pipe that is drained by a
+background thread.
+
+Usage::
+
+    $ python -m benchmarks.output [--prints N] [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+
+def drain(fd: int) -> None:
+    with open(fd, 'rb') as f:
+        while f.read(1 << 16):
+            pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prints', type=int, default=200000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    import zed
+
+    source = "let greeting = 'Hello World'\n" + 'print greeting\n' * args.prints
+    tokens = zed.get_lexer('fast').tokenize(source)
+    sinks = {
+        'stream': zed.StreamSink,
+        'buffered': zed.BufferedSink,
+        'capture': zed.CaptureSink,
+        'null': zed.NullSink,
+    }
+
+    read_fd, write_fd = os.pipe()
+    reader = threading.Thread(target=drain, args=(read_fd,))
+    reader.start()
+
+    stdout = sys.stdout
+    with open(write_fd, 'w') as pipe:
+        for name, sink_class in sinks.items():
+            timings = []
+            for _ in range(args.runs):
+                sys.stdout = pipe
+                try:
+                    sink = sink_class()
+                    program = zed.get_parser().parse(iter(tokens), state=zed.ParserState(sink))
+
+                    start = time.perf_counter()
+                    program.eval()  # type: ignore
+                    sink.flush()
+                    timings.append(time.perf_counter() - start)
+                finally:
+                    sys.stdout = stdout
+
+            best = min(timings)
+            print('%-9s %12.0f prints/sec  (%.3f s)' % (name, args.prints / best, best))
+
+    reader.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Benchmarks the parsing speed of the parser engines.
+
+The parsing speed of each engine is reported in statements per second. That
+both parsers produce the same result is checked by tests/test_parser.py.
+
+Usage::
+
+    $ python -m benchmarks.parsers [--statements N] [--seed N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.generator import MIXES, generate_program
+
+
+def parse_rate(engine: str, source: str, repeat: int) -> float:
+    import zed
+
+    tokens = zed.get_lexer('fast').tokenize(source)
+    parser = zed.get_parser(engine=engine)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(iter(tokens), state=zed.ParserState(zed.NullSink()))
+        best = min(best, time.perf_counter() - start)
+    return len(source.splitlines()) / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for mix in sorted(MIXES):
+        source = generate_program(args.statements, args.seed, mix)
+        rply, fast = (parse_rate(engine, source, args.repeat) for engine in ('rply', 'fast'))
+        print('%-12s rply %10.0f stmts/sec   fast %10.0f stmts/sec   %.1fx' % (mix, rply, fast, fast / rply))
+
+
+if __name__ == '__main__':
+    main()
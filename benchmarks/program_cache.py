@@ -0,0 +1,57 @@
+"""Benchmarks `python -m zed` with and without the compiled program cache.
+
+Usage::
+
+    $ python -m benchmarks.program_cache [--statements N] [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import ROOT, best_of, make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    import zed
+
+    directory = tempfile.mkdtemp(prefix='zed-bench-')
+    try:
+        path = os.path.join(directory, 'program.zed')
+        with open(path, 'w') as f:
+            f.write(make_program(args.statements))
+
+        cache_dir = os.path.join(directory, 'cache')
+        for name, compile_file in (('zed.compile_file()', zed.compile_file),
+                                   ('vm.compile_file()', zed.vm.compile_file)):
+            miss, _ = best_of(lambda: compile_file(path, cache_dir, use_cache=False), args.runs)
+            compile_file(path, cache_dir)
+            hit, _ = best_of(lambda: compile_file(path, cache_dir), args.runs)
+            print('%-20s uncached %9.3f ms   cached %9.3f ms' % (name, miss * 1e3, hit * 1e3))
+
+        for engine in ('tree', 'py'):
+            def run(*options: str) -> None:
+                subprocess.run([sys.executable, '-m', 'zed', path, '--engine', engine, *options], cwd=ROOT,
+                               check=True, stdout=subprocess.DEVNULL)
+
+            uncached, _ = best_of(lambda: run('--no-cache'), args.runs)
+            run()
+            cached, _ = best_of(run, args.runs)
+            print('%-20s uncached %9.3f ms   cached %9.3f ms   (%d statements)' %
+                  ('--engine ' + engine, uncached * 1e3, cached * 1e3, args.statements))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
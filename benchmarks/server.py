@@ -0,0 +1,87 @@
+"""Benchmarks the end-to-end latency of running a file on a zed server.
+
+A server is started with ``python -m zed serve`` and a file is run repeatedly
+both with ``python -m zed run --connect`` and with a cold ``python -m zed``,
+after checking that both print the same output. The latency of run_remote()
+alone, without starting a client process, is reported as well.
+
+Usage::
+
+    $ python -m benchmarks.server [--statements N] [--runs N]
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import ROOT, make_program
+
+
+def timed_runs(command: List[str], runs: int, env: dict) -> List[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def report(name: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    print('%-22s p50 %8.2f ms  min %8.2f ms' % (name, timings[len(timings) // 2] * 1000, timings[0] * 1000))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    from zed.server import run_remote
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    zed = [sys.executable, '-m', 'zed']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'program.zed')
+        sock = os.path.join(tmp, 'zed.sock')
+        with open(filename, 'w') as f:
+            f.write(make_program(args.statements))
+
+        server = subprocess.Popen(zed + ['serve', '--socket', sock], env=env)
+        try:
+            while not os.path.exists(sock):
+                time.sleep(0.01)
+
+            client = zed + ['run', '--connect', sock, filename]
+            cold = zed + ['--engine', 'tree', '--no-cache', filename]
+            outputs = [subprocess.run(command, env=env, stdout=subprocess.PIPE, check=True).stdout
+                       for command in (client, cold)]
+            if outputs[0] != outputs[1]:
+                raise SystemExit('output of server differs from python -m zed')
+
+            report('python -m zed', timed_runs(cold, args.runs, env))
+            report('python -m zed run', timed_runs(client, args.runs, env))
+
+            with open(filename) as f:
+                source = f.read()
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                run_remote(sock, source, stream=io.StringIO())
+                timings.append(time.perf_counter() - start)
+            report('run_remote()', timings)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
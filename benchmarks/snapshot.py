@@ -0,0 +1,120 @@
+"""Checks prelude snapshots and benchmarks the per-run setup cost with and without them.
+
+First, random scripts that use, redefine and delete the variables of a
+prelude are run one after another from a snapshot with every engine. Each
+must print the same output and fail with the same message as running the
+prelude followed by the script, and no script may see the changes made
+by another.
+
+Then, for preludes of several sizes, the cost of setting up a run is
+reported: lexing, parsing and defining the prelude again, copying its
+variables into a new dictionary, or starting from a snapshot. Running a
+short script end to end after parsing the prelude and from a snapshot is
+reported as well.
+
+Usage::
+
+    $ python -m benchmarks.snapshot [--sizes N ...] [--scripts N] [--repeat N] [--seed N]
+"""
+
+from __future__ import annotations
+
+from typing import Callable, List
+
+import argparse
+import random
+import time
+
+_SCRIPT_STATEMENTS = 10
+
+
+def make_prelude(size: int) -> str:
+    """Returns a prelude defining the given number of variables."""
+    return ''.join("let p_%d = 'prelude value %d'\n" % (i, i) for i in range(size))
+
+def make_script(rng: random.Random, size: int) -> str:
+    """Returns a short script using the variables of a prelude of the given size."""
+    lines = []
+    for _ in range(_SCRIPT_STATEMENTS):
+        name = 'p_%d' % rng.randrange(size)
+        kind = rng.random()
+        if kind < 0.6:
+            lines.append('print %s' % name)
+        elif kind < 0.8:
+            lines.append('let %s = "script value"' % name)
+        else:
+            lines.append('del %s' % name)
+    return '\n'.join(lines) + '\n'
+
+def check(rng: random.Random, scripts: int) -> None:
+    import zed
+
+    prelude = make_prelude(20)
+    snapshot = zed.compile_snapshot(prelude)
+    before = dict(snapshot.definitions)
+    for engine in zed.ENGINES:
+        from_snapshot = zed.Interpreter(engine=engine, snapshot=snapshot)
+        from_source = zed.Interpreter(engine=engine)
+        for _ in range(scripts):
+            script = make_script(rng, 20)
+            result, expected = from_snapshot.run(script), from_source.run(prelude + script)
+            if (result.output, result.error and result.error.message) != \
+                    (expected.output, expected.error and expected.error.message):
+                raise SystemExit('running from a snapshot differs with the %s engine for:\n%s' % (engine, script))
+
+    if dict(snapshot.definitions) != before:
+        raise SystemExit('scripts changed the variables of snapshot')
+
+def per_run(func: Callable[[], object], repeat: int, runs: int) -> float:
+    """Returns the best time of calling func in microseconds, over batches of runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(runs):
+            func()
+        best = min(best, (time.perf_counter() - start) / runs)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--scripts', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import zed
+
+    rng = random.Random(args.seed)
+    check(rng, args.scripts)
+    print('%d scripts run the same from a snapshot with every engine' % (args.scripts * len(zed.ENGINES)))
+
+    lexer, parser_ = zed.get_lexer('rply'), zed.get_parser()
+    print('%8s %14s %14s %14s %16s %16s' % ('prelude', 'reparse us', 'dict copy us', 'snapshot us',
+                                           'run reparse us', 'run snapshot us'))
+    for size in args.sizes:
+        prelude = make_prelude(size)
+        snapshot = zed.compile_snapshot(prelude)
+        definitions = dict(snapshot.definitions)
+        runs = max(1, 20000 // size)
+        scripts: List[str] = [make_script(rng, size) for _ in range(64)]
+
+        def reparse() -> None:
+            parser_.parse(lexer.lex(prelude), state=zed.ParserState(zed.NullSink()))
+
+        def copy() -> None:
+            zed.ParserState(zed.NullSink())._definitions = dict(definitions)
+
+        reparsed = per_run(reparse, args.repeat, runs)
+        copied = per_run(copy, args.repeat, runs * 10)
+        snapshotted = per_run(lambda: zed.ParserState(zed.NullSink(), snapshot), args.repeat, runs * 10)
+
+        plain, overlay = zed.Interpreter(), zed.Interpreter(snapshot=snapshot)
+        run_reparse = per_run(lambda: plain.run(prelude + rng.choice(scripts)), args.repeat, runs)
+        run_snapshot = per_run(lambda: overlay.run(rng.choice(scripts)), args.repeat, runs)
+        print('%8d %14.1f %14.1f %14.1f %16.1f %16.1f' % (size, reparsed, copied, snapshotted, run_reparse, run_snapshot))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmarks the startup time of `python -m zed` with a cold and warm parse table cache.
+
+Usage::
+
+    $ python -m benchmarks.startup [--runs N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import ROOT, best_of, make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    import zed
+
+    cache_dir = tempfile.mkdtemp(prefix='zed-bench-')
+    try:
+        os.environ['ZED_CACHE_DIR'] = cache_dir
+
+        def build(use_cache: bool) -> None:
+            zed.reset_parser()
+            zed.get_parser(use_cache=use_cache)
+
+        cold, _ = best_of(lambda: build(False), args.runs)
+        zed.warm_parser_cache()
+        warm, _ = best_of(lambda: build(True), args.runs)
+        print('get_parser()      cold %8.3f ms   warm %8.3f ms' % (cold * 1e3, warm * 1e3))
+
+        path = os.path.join(cache_dir, 'hello.zed')
+        with open(path, 'w') as f:
+            f.write(make_program(4))
+
+        def run() -> None:
+            subprocess.run([sys.executable, '-m', 'zed', path], cwd=ROOT, check=True,
+                           stdout=subprocess.DEVNULL)
+
+        def run_cold() -> None:
+            for name in os.listdir(cache_dir):
+                if name.startswith('parser-'):
+                    os.unlink(os.path.join(cache_dir, name))
+            run()
+
+        cold, cold_mean = best_of(run_cold, args.runs)
+        zed.warm_parser_cache()
+        warm, warm_mean = best_of(run, args.runs)
+        print('python -m zed     cold %8.3f ms   warm %8.3f ms   (best of %d)' %
+              (cold * 1e3, warm * 1e3, args.runs))
+        print('                  cold %8.3f ms   warm %8.3f ms   (mean)' %
+              (cold_mean * 1e3, warm_mean * 1e3))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Benchmarks the peak memory of normal and streaming execution as the program grows.
+
+Usage::
+
+    $ python -m benchmarks.stream [--statements N ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.utils import ROOT, make_program
+
+# Runs the program given on the command line and reports the peak RSS in KiB.
+_RUNNER = '''
+import sys, zed
+from benchmarks.utils import peak_rss_kib
+with open(sys.argv[1]) as f:
+    if sys.argv[2] == 'stream':
+        zed.run_stream(f)
+    else:
+        zed.get_parser().parse(zed.get_lexer().lex(f.read()), state=zed.ParserState()).eval()
+sys.stderr.write('%d\\n' % peak_rss_kib())
+'''
+
+
+def peak_rss(path: str, mode: str) -> int:
+    proc = subprocess.run([sys.executable, '-c', _RUNNER, path, mode], cwd=ROOT, check=True,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return int(proc.stderr.decode().strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, nargs='+', default=[10000, 100000, 400000])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='zed-bench-')
+    try:
+        print('%10s %12s %14s %14s' % ('statements', 'size', 'normal (MiB)', 'stream (MiB)'))
+        for count in args.statements:
+            path = os.path.join(directory, 'program.zed')
+            with open(path, 'w') as f:
+                f.write(make_program(count))
+
+            size = os.path.getsize(path) / (1 << 20)
+            normal = peak_rss(path, 'normal') / 1024
+            stream = peak_rss(path, 'stream') / 1024
+            print('%10d %9.2f MiB %14.1f %14.1f' % (count, size, normal, stream))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
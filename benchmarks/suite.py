@@ -0,0 +1,155 @@
+"""Runs the benchmark suite and compares its results against a baseline.
+
+The ``run`` command times cold start, grammar build, lexing, parsing,
+evaluation and end to end runs on programs of each mix from the generator
+and writes the results as JSON. Every metric is the best of several runs
+in seconds, so lower is better.
+
+The ``compare`` command compares the results with a saved baseline and
+exits with status 1 when a tracked metric is slower than the baseline by
+more than the threshold.
+
+Usage::
+
+    $ python -m benchmarks.suite run [--output FILE] [--statements N] [--repeat N] [--seed N]
+    $ python -m benchmarks.suite compare BASELINE RESULTS [--threshold 0.1] [--track PATTERN ...]
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.generator import MIXES, generate_program
+from benchmarks.utils import ROOT, best_of
+
+
+def run_suite(statements: int, repeat: int, seed: int) -> Dict[str, Any]:
+    """Runs the suite and returns the results as a JSON serializable dictionary."""
+    import zed
+
+    metrics: Dict[str, float] = {}
+
+    def record(name: str, func: Any) -> None:
+        metrics[name], _ = best_of(func, repeat)
+
+    directory = tempfile.mkdtemp(prefix='zed-bench-')
+    try:
+        env = dict(os.environ, ZED_CACHE_DIR=directory)
+        path = os.path.join(directory, 'hello.zed')
+        with open(path, 'w') as f:
+            f.write('print "hello"\n')
+
+        def start(*args: str) -> None:
+            subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        record('startup.import', lambda: start('-c', 'import zed'))
+        record('startup.run', lambda: start('-m', 'zed', '--no-cache', path))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def build(use_cache: bool) -> None:
+        zed.reset_parser()
+        zed.get_parser(use_cache=use_cache)
+
+    record('grammar.build', lambda: build(False))
+    zed.get_parser()
+
+    interpreter = zed.Interpreter(engine='tree')
+    for mix in sorted(MIXES):
+        source = generate_program(statements, seed, mix)
+        for lexer in zed.LEXER_ENGINES:
+            record('%s.lex.%s' % (mix, lexer), lambda: list(zed.get_lexer(lexer).lex(source)))
+
+        tokens = list(zed.get_lexer('rply').lex(source))
+
+        def parse() -> Any:
+            return zed.get_parser().parse(iter(tokens), state=zed.ParserState(zed.NullSink()))
+
+        record('%s.parse' % mix, parse)
+
+        # Evaluation consumes the statements, so each run gets a new program.
+        programs = [parse() for _ in range(repeat)]
+        record('%s.eval' % mix, lambda: programs.pop().eval())
+        record('%s.end_to_end' % mix, lambda: interpreter.run(source, zed.NullSink()))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'statements': statements,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'metrics': metrics,
+    }
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any], threshold: float,
+            track: Optional[List[str]] = None) -> List[str]:
+    """Prints the change of each metric and returns the names of regressed metrics."""
+    regressions = []
+    print('%-32s %12s %12s %9s' % ('metric', 'baseline s', 'current s', 'change'))
+    for name, before in sorted(baseline['metrics'].items()):
+        after = results['metrics'].get(name)
+        if after is None or not before:
+            continue
+
+        change = after / before - 1
+        tracked = track is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in track)
+        regressed = tracked and change > threshold
+        if regressed:
+            regressions.append(name)
+        print('%-32s %12.6f %12.6f %+8.1f%%%s' % (name, before, after, change * 100, '  REGRESSED' if regressed else ''))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='Run the suite and write the results as JSON.')
+    run.add_argument('--output', help='The file to write the results to (default: stdout).')
+    run.add_argument('--statements', type=int, default=20000)
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--seed', type=int, default=0)
+
+    cmp = commands.add_parser('compare', help='Compare results against a baseline.')
+    cmp.add_argument('baseline')
+    cmp.add_argument('results')
+    cmp.add_argument('--threshold', type=float, default=0.1,
+                     help='The allowed slowdown as a fraction of the baseline (default: 0.1).')
+    cmp.add_argument('--track', nargs='+', metavar='PATTERN',
+                     help='Only fail on metrics matching these glob patterns (default: all).')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        text = json.dumps(run_suite(args.statements, args.repeat, args.seed), indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(text + '\n')
+        else:
+            print(text)
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.results) as f:
+        results = json.load(f)
+
+    regressions = compare(baseline, results, args.threshold, args.track)
+    if regressions:
+        raise SystemExit('%d metrics regressed by more than %.0f%%: %s' % (
+            len(regressions), args.threshold * 100, ', '.join(regressions)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Benchmarks the memory used per token by the lexed token stream of each lexer engine.
+
+The rply engine produces a list of rply.Token objects while the fast engine
+produces a TokenBuffer. The source string itself is excluded from the count.
+
+Usage::
+
+    $ python -m benchmarks.tokens_memory [--statements N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.utils import make_program
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=200000)
+    args = parser.parse_args()
+
+    import zed
+
+    source = make_program(args.statements)
+    lexers = {
+        'rply': lambda: list(zed.get_lexer('rply').lex(source)),
+        'fast': lambda: zed.get_lexer('fast').tokenize(source),
+    }
+
+    for engine, lex in lexers.items():
+        gc.collect()
+        tracemalloc.start()
+        tokens = lex()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print('%-6s %8d tokens  %7.1f bytes/token retained  %7.1f bytes/token peak' %
+              (engine, len(tokens), current / len(tokens), peak / len(tokens)))
+        del tokens
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmarks the overhead of execution tracing on the tree engine.
+
+A program is parsed and evaluated with tracing off, with a no-op callback
+on every statement, with sampling and again after tracing is removed. The
+output of each traced run is checked against the untraced output and the
+number of callback calls against the sampling rate.
+
+Usage::
+
+    $ python -m benchmarks.trace [--statements N] [--every N ...] [--repeat N]
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, List, Optional
+
+import argparse
+import time
+
+from benchmarks.utils import make_program
+
+
+def run(
+    source: str,
+    repeat: int,
+    callback: Optional[Callable[..., Any]] = None,
+    every: int = 1,
+    remove: bool = False,
+) -> List[Any]:
+    """Parses and evaluates the source repeat times and returns (parse, eval, output) of the best run.
+
+    If a callback is given, each run is traced with it, unless remove is set
+    in which case tracing is removed again before the run.
+    """
+    import zed
+
+    tokens = zed.get_lexer('fast').tokenize(source)
+    best: Optional[List[Any]] = None
+    for _ in range(repeat):
+        output = zed.CaptureSink()
+        state = zed.ParserState(output)
+        if callback is not None:
+            zed.set_trace(state, callback, every=every)
+            if remove:
+                zed.set_trace(state, None)
+
+        start = time.perf_counter()
+        program = zed.get_parser().parse(iter(tokens), state=state)
+        parsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        program.eval()  # type: ignore
+        elapsed = time.perf_counter() - start
+
+        if best is None or parsed + elapsed < best[0] + best[1]:
+            best = [parsed, elapsed, output]
+    return best  # type: ignore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statements', type=int, default=400000)
+    parser.add_argument('--every', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import zed
+
+    source = make_program(args.statements)
+    stmts = len(source.splitlines())
+    calls = [0]
+
+    def callback(event: str, state: Any, arg: Any) -> None:
+        if event == 'statement':
+            calls[0] += 1
+
+    # Each config is (name, every, remove), where every is None when not traced.
+    configs = [('off', None, False), ('every 1', 1, False)]
+    configs += [('every %d' % every, every, False) for every in args.every]
+    configs.append(('removed', 1, True))
+
+    expected = None
+    print('%-12s %10s %10s %12s' % ('trace', 'parse s', 'eval s', 'callbacks'))
+    for name, every, remove in configs:
+        calls[0] = 0
+        parsed, elapsed, output = run(source, args.repeat, callback if every else None, every or 1, remove)
+
+        text = output.getvalue()
+        if expected is None:
+            expected = text
+        elif text != expected:
+            raise SystemExit('output with trace %s differs from untraced output' % name)
+        if every and not remove and calls[0] != args.repeat * -(-stmts // every):
+            raise SystemExit('trace %s made %d statement callbacks' % (name, calls[0]))
+
+        print('%-12s %10.3f %10.3f %12d' % (name, parsed, elapsed, calls[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Helpers shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+from typing import Callable, List, Tuple
+
+import os
+import sys
+import time
+
+__all__ = (
+    'ROOT',
+    'make_program',
+    'best_of',
+    'peak_rss_kib',
+)
+
+# The repository root, so benchmarks can spawn `python -m zed` from anywhere.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def make_program(statements: int) -> str:
+    """Returns the source of a program with roughly the given number of statements."""
+    lines: List[str] = []
+    for i in range(statements // 4 or 1):
+        lines.append("let var_%d = 'value number %d'" % (i, i))
+        lines.append('print var_%d' % i)
+        lines.append('print "literal %d"' % i)
+        lines.append('del var_%d' % i)
+    return '\n'.join(lines) + '\n'
+
+def best_of(func: Callable[[], object], repeat: int = 5) -> Tuple[float, float]:
+    """Runs func repeat times and returns the (best, mean) wall time in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+def peak_rss_kib() -> int:
+    """Returns the peak resident set size of this process in KiB.
+
+    On Linux, ru_maxrss is inherited from the parent across fork() and exec()
+    so the VmHWM of /proc is preferred when available.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,79 @@
+"""Checks that batches report every file in order, including failures."""
+
+from __future__ import annotations
+
+from typing import Any, List
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import zed
+
+from zed.batch import find_files, run_batch
+from benchmarks.generator import generate_program
+from benchmarks.utils import ROOT
+
+
+@pytest.fixture
+def paths(tmp_path: Any) -> List[str]:
+    """Returns files that print their index, with some failing ones among them."""
+    sources = ['print "%d"\n' % i for i in range(12)]
+    sources[3] = 'print "3"\nlet @\n'
+    sources[7] = 'let a = "7"\nprint a\ndel a\nprint a\n'
+    sources[10] = generate_program(200, 10)
+
+    paths = []
+    for i, source in enumerate(sources):
+        path = str(tmp_path / ('%02d.zed' % i))
+        with open(path, 'w') as f:
+            f.write(source)
+        paths.append(path)
+
+    with open(paths[5], 'wb') as f:
+        f.write(b'print "\xff"\n')
+    paths.insert(9, str(tmp_path / 'missing.zed'))
+    return paths
+
+
+@pytest.mark.parametrize('jobs', [1, 2, 4])
+def test_order_and_errors(paths: List[str], jobs: int) -> None:
+    results = list(run_batch(paths, jobs))
+    assert [result.path for result in results] == paths
+
+    interpreter = zed.Interpreter()
+    for path, result in zip(paths, results):
+        if path.endswith('missing.zed'):
+            assert not result.ok and 'No such file' in str(result.error)
+        elif path.endswith('05.zed'):
+            assert not result.ok and 'decode' in str(result.error)
+        else:
+            expected = interpreter.run_file(path)
+            assert (result.output, result.error) == (expected.output, None if expected.ok else str(expected.error))
+
+    assert [os.path.basename(result.path) for result in results if not result.ok] == [
+        '03.zed', '05.zed', '07.zed', 'missing.zed',
+    ]
+
+def test_find_files(paths: List[str], tmp_path: Any) -> None:
+    os.makedirs(str(tmp_path / 'sub'))
+    nested = str(tmp_path / 'sub' / 'nested.zed')
+    with open(nested, 'w') as f:
+        f.write('print "x"\n')
+
+    found = [path for path in paths if os.path.exists(path)] + [nested]
+    assert find_files(str(tmp_path)) == sorted(found)
+    assert find_files(str(tmp_path / '0*.zed')) == [path for path in found if '/0' in path]
+
+def test_cli(paths: List[str], tmp_path: Any) -> None:
+    proc = subprocess.run([sys.executable, '-m', 'zed', 'batch', '--json', '-j', '2', str(tmp_path)], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    results = [json.loads(line) for line in proc.stdout.splitlines()]
+
+    assert proc.returncode == 1
+    assert [result['path'] for result in results] == find_files(str(tmp_path))
+    assert [result['ok'] for result in results].count(False) == 3
+    assert results[0]['output'] == '0\n'
+    assert '12 files (3 failed)' in proc.stderr
@@ -0,0 +1,92 @@
+"""Checks the compiled program cache of the default and vm engines."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import zed
+
+from benchmarks.utils import ROOT
+
+SOURCE = 'let a = "x"\nprint a\nlet b\nprint b\nprint undefined\ndel a\nprint "y"\n'
+
+
+def run(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-m', 'zed', *args], cwd=ROOT, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+def phases(stderr: str) -> Dict[str, Dict[str, Any]]:
+    return {phase['name']: phase for phase in json.loads(stderr)['phases']}
+
+
+@pytest.fixture
+def program(tmp_path: Any) -> str:
+    path = str(tmp_path / 'program.zed')
+    with open(path, 'w') as f:
+        f.write(SOURCE)
+    return path
+
+
+def test_second_run_hits(program: str) -> None:
+    expected = zed.Interpreter().run(SOURCE).output
+    assert run(program).stdout == expected
+    assert os.listdir(os.path.join(os.path.dirname(program), '__zedcache__')) == ['program.zedb']
+
+    result = run('--stats=json', program)
+    assert result.stdout == expected
+    assert phases(result.stderr)['load']['cache'] == 'hit'
+    assert 'lex' not in phases(result.stderr)
+
+def test_modified_file_misses(program: str) -> None:
+    run(program)
+    with open(program, 'a') as f:
+        f.write('print "z"\n')
+
+    result = run('--stats=json', program)
+    assert phases(result.stderr)['load']['cache'] == 'miss'
+    assert result.stdout.endswith('z\n')
+    assert phases(run('--stats=json', program).stderr)['load']['cache'] == 'miss'
+    run(program)
+    assert phases(run('--stats=json', program).stderr)['load']['cache'] == 'hit'
+
+@pytest.mark.parametrize('options', [['--no-cache'], ['--mmap'], ['--trace']])
+def test_bypassed(program: str, options: List[str]) -> None:
+    run(*options, program)
+    assert not os.path.exists(os.path.join(os.path.dirname(program), '__zedcache__'))
+
+def test_options_are_keyed(program: str, tmp_path: Any) -> None:
+    cache_dir = str(tmp_path / 'cache')
+    zed.vm.compile_file(program, cache_dir)
+    assert zed.vm.load_cached(program, cache_dir) is not None
+    assert zed.vm.load_cached(program, cache_dir, lexer='fast') is None
+    assert zed.vm.load_cached(program, cache_dir, optimize=1) is None
+    assert zed.vm.load_cached(program) is None
+
+def test_round_trip(program: str, tmp_path: Any) -> None:
+    cache_dir = str(tmp_path / 'cache')
+    compiled = zed.vm.compile_file(program, cache_dir)
+    loaded = zed.vm.load_cached(program, cache_dir)
+    assert loaded is not None
+    assert loaded.disassemble() == compiled.disassemble()
+    assert zed.sentinels.UNDEFINED in loaded.consts
+
+    sink = zed.CaptureSink()
+    zed.vm.VirtualMachine().run(loaded, sink)
+    assert sink.getvalue() == zed.Interpreter().run(SOURCE).output
+
+def test_corrupt_cache(program: str, tmp_path: Any) -> None:
+    cache_dir = str(tmp_path / 'cache')
+    zed.vm.compile_file(program, cache_dir)
+    path = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 4)
+
+    assert zed.vm.load_cached(program, cache_dir) is None
+    assert len(zed.vm.compile_file(program, cache_dir)) == 9
+    assert zed.vm.load_cached(program, cache_dir) is not None
@@ -0,0 +1,81 @@
+"""Checks the lazy imports of the zed package and, optionally, their time budgets.
+
+The time budgets depend on the machine and its load, so they are only
+checked when the ZED_TEST_IMPORT_TIMES environment variable is set.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, List
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+from benchmarks.importtime import baseline, import_times, scenarios
+from benchmarks.utils import ROOT
+
+_RUNS = 5
+
+# The budgets are for a quiet machine, this allows for some noise.
+_MARGIN = 1.5
+
+_NAMES = [scenario[0] for scenario in scenarios('')]
+
+
+def run(code: str) -> str:
+    """Runs the code in a fresh interpreter and returns its output."""
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.PIPE)
+    return proc.stdout.decode()
+
+
+@pytest.fixture(scope='module')
+def program() -> Iterator[str]:
+    with tempfile.NamedTemporaryFile('w', suffix='.zed', delete=False) as f:
+        f.write('let greeting = "hello"\nprint greeting\n')
+    try:
+        yield f.name
+    finally:
+        os.unlink(f.name)
+
+
+@pytest.mark.parametrize('name', _NAMES)
+def test_forbidden_modules(program: str, name: str) -> None:
+    _, argv, _, forbidden = next(scenario for scenario in scenarios(program) if scenario[0] == name)
+    _, startup = baseline()
+    _, modules = import_times(argv)
+    assert not set(forbidden).intersection(modules - startup), '%s imports a forbidden module' % name
+
+@pytest.mark.skipif(not os.environ.get('ZED_TEST_IMPORT_TIMES'), reason='set ZED_TEST_IMPORT_TIMES=1 to check')
+@pytest.mark.parametrize('name', _NAMES)
+def test_budget(program: str, name: str) -> None:
+    _, argv, budget, _ = next(scenario for scenario in scenarios(program) if scenario[0] == name)
+    # The first run writes the bytecode and parse table caches.
+    import_times(argv)
+    bare = min(baseline()[0] for _ in range(_RUNS))
+    best = min(import_times(argv)[0] for _ in range(_RUNS))
+    assert best - bare <= budget * _MARGIN, '%s took %.1f ms, over its budget of %d ms' % (name, best - bare, budget)
+
+@pytest.mark.parametrize('name', ['lexer', 'parser', 'state', 'sentinels', 'ast', 'vm', 'optimizer'])
+def test_submodule_attribute(name: str) -> None:
+    assert run('import zed; print(zed.%s.__name__)' % name).strip() == 'zed.' + name
+
+def test_optimize_is_the_function() -> None:
+    output = run('import zed.optimizer as o, zed; print(o.__name__, zed.optimize is o.optimize)')
+    assert output.split() == ['zed.optimizer', 'True']
+
+def test_exports() -> None:
+    import zed
+
+    missing: List[str] = [name for name in zed.__all__ if not hasattr(zed, name)]
+    assert not missing
+    assert set(zed.__all__) <= set(dir(zed))
+
+def test_unknown_attribute() -> None:
+    import zed
+
+    with pytest.raises(AttributeError):
+        zed.does_not_exist  # type: ignore
@@ -0,0 +1,52 @@
+"""Checks that an edited document runs the same as its text from scratch."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+import zed
+
+from benchmarks.generator import generate_program
+
+_FRAGMENTS = ['print ', 'let ', 'del ', 'a', 'b', ' = ', '"x"', "'y'", 'undefined', ' ', '\n', '$', '"',
+              'print a\n', 'let a = "z"\n', 'del a\n']
+
+
+def check_edits(doc: zed.IncrementalDocument, rng: random.Random, edits: int, parser: str) -> None:
+    interpreter = zed.Interpreter(lexer='fast', parser=parser)
+    for _ in range(edits):
+        lines = doc.text.split('\n')
+        start = rng.randrange(len(lines))
+        end = min(len(lines) - 1, start + rng.choice([0, 0, 0, 1, 2]))
+        start_col = rng.randint(0, len(lines[start]))
+        end_col = rng.randint(start_col if start == end else 0, len(lines[end]))
+        doc.edit(start, start_col, end, end_col, ''.join(rng.choices(_FRAGMENTS, k=rng.randint(0, 3))))
+
+        expected, result = interpreter.run(doc.text), doc.run()
+        assert (result.output, str(result.error)) == (expected.output if expected.ok else '', str(expected.error)), \
+            doc.text
+
+
+@pytest.mark.parametrize('parser', ['rply', 'fast'])
+@pytest.mark.parametrize('seed', range(10))
+def test_random_edits(parser: str, seed: int) -> None:
+    rng = random.Random(seed)
+    source = generate_program(rng.randint(0, 40), seed, rng.choice(['balanced', 'churn']))
+    # Short names make the random edits refer to defined variables.
+    doc = zed.IncrementalDocument(source.replace('a_', 'a').replace('b_', 'b'), parser=parser)
+    check_edits(doc, rng, 30, parser)
+
+def test_error_moves_with_edits() -> None:
+    # The error is looked up after each edit while lines before it are
+    # inserted, removed and changed.
+    doc = zed.IncrementalDocument(generate_program(300, 0) + 'print $\n')
+    rng = random.Random(0)
+    for _ in range(100):
+        line = rng.randrange(290)
+        if rng.random() < 0.5:
+            doc.edit(line, 0, line, 0, 'print "new"\n')
+        else:
+            doc.edit(line, 0, line + 1, 0, '')
+        expected = zed.Interpreter(lexer='fast').run(doc.text).error
+        assert str(doc.error) == str(expected)
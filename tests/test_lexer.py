@@ -0,0 +1,131 @@
+"""Checks that the lexer engines produce the same tokens."""
+
+from __future__ import annotations
+
+from typing import Any, List, Tuple
+
+import pytest
+import zed
+
+from rply.errors import LexingError
+from benchmarks.generator import MIXES, generate_program
+
+
+def tokens(engine: str, source: str) -> List[Tuple[Any, ...]]:
+    """Returns the type, text and source position of every token."""
+    return [describe(t) for t in zed.get_lexer(engine).lex(source)]
+
+def describe(token: Any) -> Tuple[Any, ...]:
+    pos = token.source_pos
+    return token.name, token.value, pos.idx, pos.lineno, pos.colno
+
+
+@pytest.mark.parametrize('mix', sorted(MIXES))
+@pytest.mark.parametrize('seed', range(3))
+def test_generated_programs(mix: str, seed: int) -> None:
+    source = generate_program(200, seed, mix)
+    assert tokens('fast', source) == tokens('rply', source)
+
+@pytest.mark.parametrize('source', [
+    '',
+    '\n\n',
+    '  print   a\t\n',
+    'let a = "x"\nprint a\ndel a',
+    'print "é"\nlet b = \'ü\'\nprint b\n',
+    'let a\nprint undefined\n',
+])
+def test_edge_cases(source: str) -> None:
+    assert tokens('fast', source) == tokens('rply', source)
+
+@pytest.mark.parametrize('source', ['let a = @\n', 'print "unterminated\n', 'print a\nlet $b\n'])
+def test_errors_at_same_offset(source: str) -> None:
+    # The rply lexer reports the column of the previous token, so only the
+    # offset and line are compared.
+    positions = []
+    for engine in zed.LEXER_ENGINES:
+        with pytest.raises(LexingError) as info:
+            tokens(engine, source)
+        pos = info.value.getsourcepos()
+        positions.append((pos.idx, pos.lineno))
+    assert positions[0] == positions[1]
+
+def test_keyword_prefixes() -> None:
+    # The fast lexer does not split identifiers at keyword prefixes.
+    names = [t.name for t in zed.get_lexer('fast').lex('let printer = "x"\n')]
+    assert names == ['STMT_LET', 'IDENT', 'OP_ASSIGN', 'LT_STRING']
+
+def test_bytes_source() -> None:
+    source = 'let a = "é"\nprint a\nprint "ü x"\n' + generate_program(50, 1)
+    lexer = zed.get_lexer('fast')
+    from_bytes = list(map(describe, lexer.tokenize(source.encode())))
+    assert from_bytes == list(map(describe, lexer.tokenize(source)))
+
+@pytest.mark.parametrize('source', [
+    generate_program(300, 7),
+    'let a = "é"\nprint a\nprint "ü x"\nlet b = \'日本\'\nprint b\n',
+    'print "x"\r\nlet a = "\u00a0"\r\n',
+    '',
+])
+def test_mmap(tmp_path: Any, source: str) -> None:
+    path = str(tmp_path / 'program.zed')
+    with open(path, 'w', newline='') as f:
+        f.write(source)
+
+    expected = list(map(describe, zed.get_lexer('fast').tokenize(source)))
+    assert list(map(describe, zed.lex_file(path))) == expected
+    assert tokens('rply', source) == expected
+
+@pytest.mark.parametrize('source', [
+    'print\u00a0"x"\n',
+    'let a\u0663 = "x"\n',
+    'let \u00e9 = "x"\n',
+    'print "é"\nlet a\u2003= "x"\n',
+    'print "é"\nlet @\n',
+])
+def test_mmap_errors(tmp_path: Any, source: str) -> None:
+    # Whitespace, digits and letters outside of ASCII are rejected by every
+    # engine, whether lexing text or the bytes of a file.
+    path = str(tmp_path / 'program.zed')
+    with open(path, 'w') as f:
+        f.write(source)
+
+    positions = []
+    for lex in (zed.lex_file, zed.get_lexer('fast').tokenize, zed.get_lexer('rply').lex):
+        with pytest.raises(LexingError) as info:
+            list(lex(path if lex is zed.lex_file else source))
+        pos = info.value.getsourcepos()
+        positions.append((pos.idx, pos.lineno))
+    assert positions[0] == positions[1] == positions[2]
+
+@pytest.mark.parametrize('workers', [2, 3, 8, 64])
+@pytest.mark.parametrize('source', [
+    generate_program(300, 4),
+    'print "é"\nlet b = \'ü\'\n\n\nprint b',
+    'print "a"\r\nprint "b"\r\n',
+    'print "x"\n',
+    '',
+])
+def test_parallel(tmp_path: Any, workers: int, source: str) -> None:
+    # With many workers, the chunks are a few lines or less and some are empty.
+    path = str(tmp_path / 'program.zed')
+    with open(path, 'w', newline='') as f:
+        f.write(source)
+
+    expected = zed.get_lexer('fast').tokenize(source)
+    tokens = zed.lex_parallel(path, workers)
+    assert (tokens.types, tokens.starts, tokens.ends) == (expected.types, expected.starts, expected.ends)
+    assert list(map(describe, tokens)) == list(map(describe, expected))
+
+@pytest.mark.parametrize('workers', [2, 8])
+def test_parallel_errors(tmp_path: Any, workers: int) -> None:
+    source = generate_program(100, 5) + 'print "é"\nlet $b\n' + generate_program(100, 6)
+    path = str(tmp_path / 'program.zed')
+    with open(path, 'w') as f:
+        f.write(source)
+
+    with pytest.raises(LexingError) as expected:
+        zed.get_lexer('fast').tokenize(source)
+    with pytest.raises(LexingError) as info:
+        zed.lex_parallel(path, workers)
+    pos, expected_pos = info.value.getsourcepos(), expected.value.getsourcepos()
+    assert (pos.idx, pos.lineno, pos.colno) == (expected_pos.idx, expected_pos.lineno, expected_pos.colno)
@@ -0,0 +1,53 @@
+"""Checks that optimizing a program does not change what it prints."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import random
+
+import pytest
+import zed
+
+from benchmarks.generator import random_program
+
+
+def parse(source: str) -> Any:
+    return zed.get_parser().parse(zed.get_lexer().lex(source), state=zed.ParserState(zed.NullSink()))
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_random_programs(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(10):
+        source = random_program(rng, rng.randint(1, 60))
+        expected = zed.Interpreter(engine='tree').run(source)
+        for engine in zed.ENGINES:
+            for level in zed.OPTIMIZATION_LEVELS:
+                result = zed.Interpreter(engine=engine, optimize=level).run(source)
+                assert (result.output, str(result.error)) == (expected.output, str(expected.error)), \
+                    '%s engine at -O%d differs for:\n%s' % (engine, level, source)
+
+def test_errors_are_kept() -> None:
+    source = 'let a = "x"\nprint a\ndel a\nprint a\n'
+    expected = zed.Interpreter().run(source)
+    assert expected.error is not None
+    for level in zed.OPTIMIZATION_LEVELS:
+        assert str(zed.Interpreter(optimize=level).run(source).error) == str(expected.error)
+
+def test_level_1_removes_definitions() -> None:
+    program = parse('let a = "x"\nlet b = a\nprint b\ndel a\nprint "y"\n')
+    stats = zed.optimize(program, 1)
+    assert (stats.statements, stats.removed, stats.interned) == (5, 3, 0)
+    assert [type(stmt).__name__ for stmt in zed.vm.iter_statements(program)] == ['Print', 'Print']
+
+def test_level_2_interns_constants() -> None:
+    program = parse('let a = "x"\nprint a\nprint "x"\nprint undefined\nprint undefined\nprint "y"\n')
+    stats = zed.optimize(program, 2)
+    assert (stats.interned, stats.constants) == (2, 3)
+    values = [stmt.value for stmt in zed.vm.iter_statements(program)]
+    assert values[0] is values[1] and values[2] is values[3]
+
+def test_unknown_level() -> None:
+    with pytest.raises(ValueError):
+        zed.optimize(parse('print "x"\n'), max(zed.OPTIMIZATION_LEVELS) + 1)
@@ -0,0 +1,74 @@
+"""Checks the fast parser against the rply parser."""
+
+from __future__ import annotations
+
+from typing import Any, Iterator, Tuple
+
+import random
+
+import pytest
+import zed
+
+from rply.errors import LexingError, ParsingError
+from benchmarks.generator import MIXES, generate_program
+
+_WORDS = ['print', 'let', 'del', '=', 'a', 'b', 'c', '"x"', "'y'", 'undefined', '\n']
+
+
+def random_tokens(rng: random.Random, length: int) -> str:
+    """Returns a source made of random tokens, which is usually invalid."""
+    return ' '.join(rng.choice(_WORDS) for _ in range(length))
+
+def outcome(engine: str, lexer: str, source: str) -> Tuple[Any, ...]:
+    """Parses and runs the source and returns everything observable about it.
+
+    This is the printed output, the error and its position, the number of
+    tokens read from the lexer and the statements and definitions left in
+    the parser state.
+    """
+    read = [0]
+
+    def counted(tokens: Iterator[Any]) -> Iterator[Any]:
+        for token in tokens:
+            read[0] += 1
+            yield token
+
+    state = zed.ParserState(zed.CaptureSink())
+    error: Any = None
+    try:
+        program = zed.get_parser(engine=engine).parse(counted(zed.get_lexer(lexer).lex(source)), state=state)
+    except (zed.CompilationError, LexingError, ParsingError) as exc:
+        pos = exc.getsourcepos() if hasattr(exc, 'getsourcepos') else exc.pos  # type: ignore
+        error = (type(exc).__name__, str(exc) if isinstance(exc, zed.CompilationError) else None,
+                 pos and (pos.idx, pos.lineno, pos.colno))
+    else:
+        program.eval()  # type: ignore
+
+    stmts = [(type(stmt).__name__, stmt.meta.get('ident')) for stmt in state.get_stmts()]
+    return error, read[0], state.output.getvalue(), stmts, sorted(state._definitions)  # type: ignore
+
+def check(source: str) -> None:
+    for lexer in zed.LEXER_ENGINES:
+        assert outcome('fast', lexer, source) == outcome('rply', lexer, source), \
+            'fast parser differs from rply parser with the %s lexer for:\n%r' % (lexer, source)
+
+
+@pytest.mark.parametrize('source', ['', '\n', 'print', 'let', 'let a =', 'del a', 'print a',
+                                    'let a\nlet a = a\ndel a\nprint a', 'print "x" "y"', 'let = "x"'])
+def test_edge_cases(source: str) -> None:
+    check(source)
+
+@pytest.mark.parametrize('mix', sorted(MIXES))
+@pytest.mark.parametrize('seed', range(4))
+def test_generated_programs(mix: str, seed: int) -> None:
+    check(generate_program(random.Random(seed).randint(1, 50), seed, mix))
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_tokens(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(50):
+        check(random_tokens(rng, rng.randint(1, 12)))
+
+def test_unknown_engine() -> None:
+    with pytest.raises(ValueError):
+        zed.get_parser(engine='unknown')
@@ -0,0 +1,81 @@
+"""Checks which files at the socket path the server replaces."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from zed.server import run_remote
+from benchmarks.utils import ROOT
+
+
+def serve(path: str) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, '-m', 'zed', 'serve', '--socket', path], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+def wait_until_listening(path: str, proc: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and proc.poll() is None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+                return
+            except OSError:
+                time.sleep(0.05)
+    raise AssertionError('server did not start')
+
+def run(path: str) -> str:
+    stream = io.StringIO()
+    assert run_remote(path, 'print "hello"\n', stream=stream) is None
+    return stream.getvalue()
+
+
+@pytest.fixture
+def path(tmp_path: Any) -> str:
+    # Unix socket paths are limited to about 100 bytes.
+    return os.path.join(str(tmp_path), 's')
+
+
+def test_stale_socket_is_replaced(path: str) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(path)
+
+    proc = serve(path)
+    try:
+        wait_until_listening(path, proc)
+        assert run(path) == 'hello\n'
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def test_regular_file_is_kept(path: str) -> None:
+    with open(path, 'w') as f:
+        f.write('data')
+
+    proc = serve(path)
+    _, stderr = proc.communicate(timeout=30)
+    assert proc.returncode == 2
+    assert 'is not a socket' in stderr
+    with open(path) as f:
+        assert f.read() == 'data'
+
+def test_running_server_is_kept(path: str) -> None:
+    first = serve(path)
+    try:
+        wait_until_listening(path, first)
+        second = serve(path)
+        _, stderr = second.communicate(timeout=30)
+        assert second.returncode == 2
+        assert 'already listening' in stderr
+        assert run(path) == 'hello\n'
+    finally:
+        first.terminate()
+        first.wait()
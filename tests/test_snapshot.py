@@ -0,0 +1,153 @@
+"""Checks that programs started from a snapshot do not affect each other."""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, Tuple
+
+import subprocess
+import sys
+
+import pytest
+import zed
+
+from benchmarks.utils import ROOT
+
+PRELUDE = 'let greeting = "hello"\nlet nothing\nlet gone = "x"\ndel gone\nlet alias = greeting\n'
+
+
+@pytest.fixture(scope='module')
+def snapshot() -> zed.Snapshot:
+    return zed.compile_snapshot(PRELUDE)
+
+
+def run(snapshot: Optional[zed.Snapshot], source: str, engine: str = 'tree') -> Tuple[str, str]:
+    result = zed.Interpreter(engine=engine, snapshot=snapshot).run(source)
+    return result.output, str(result.error)
+
+def parse(state: zed.ParserState, source: str) -> None:
+    zed.get_parser().parse(zed.get_lexer().lex(source), state=state).eval()  # type: ignore
+
+def cli(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, '-m', 'zed', 'snapshot', *args], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+@pytest.mark.parametrize('engine', zed.ENGINES)
+def test_prelude_variables(snapshot: zed.Snapshot, engine: str) -> None:
+    source = 'print greeting\nprint nothing\nprint alias\n'
+    assert run(snapshot, source, engine) == ('hello\nundefined\nhello\n', 'None')
+    assert run(snapshot, 'print gone\n', engine) == run(None, 'print gone\n', engine)
+
+@pytest.mark.parametrize('engine', zed.ENGINES)
+def test_delete_and_redefine(snapshot: zed.Snapshot, engine: str) -> None:
+    source = 'del greeting\nlet greeting = "again"\nprint greeting\nprint alias\ndel greeting\n'
+    assert run(snapshot, source, engine) == ('again\nhello\n', 'None')
+
+    _, error = run(snapshot, 'del greeting\nprint greeting\n', engine)
+    assert "identifier 'greeting' not defined" in error
+
+    # The snapshot is unchanged for the next run.
+    assert run(snapshot, 'print greeting\n', engine) == ('hello\n', 'None')
+    assert set(snapshot.definitions) == {'greeting', 'nothing', 'alias'}
+
+def test_states_do_not_share_writes(snapshot: zed.Snapshot) -> None:
+    first, second = zed.CaptureSink(), zed.CaptureSink()
+    a, b = zed.ParserState(first, snapshot), zed.ParserState(second, snapshot)
+
+    parse(a, 'del greeting\nlet mine = "a"\nlet nothing = "defined"\n')
+    parse(b, 'print greeting\nprint nothing\nlet greeting = "b"\n')
+    parse(a, 'let greeting = "a"\nprint greeting\nprint nothing\n')
+    parse(b, 'print greeting\n')
+
+    assert first.getvalue() == 'a\ndefined\n'
+    assert second.getvalue() == 'hello\nundefined\nb\n'
+    assert 'mine' in a._definitions and 'mine' not in b._definitions
+    assert sorted(a._definitions) == ['alias', 'greeting', 'mine', 'nothing']
+    assert sorted(b._definitions) == ['alias', 'greeting', 'nothing']
+
+    with pytest.raises(zed.CompilationError):
+        parse(b, 'print mine\n')
+
+def test_overlay_mapping(snapshot: zed.Snapshot) -> None:
+    overlay = snapshot.overlay()
+    del overlay['greeting']
+    overlay['extra'] = None
+
+    assert 'greeting' not in overlay and 'nothing' in overlay
+    assert sorted(overlay) == sorted(overlay.keys()) == ['alias', 'extra', 'nothing']
+    assert len(overlay) == 3 and overlay.get('greeting') is None
+    with pytest.raises(KeyError):
+        overlay['greeting']
+    with pytest.raises(KeyError):
+        del overlay['greeting']
+
+    copy = overlay.copy()
+    copy['greeting'] = None
+    assert 'greeting' in copy and 'greeting' not in overlay
+
+def test_save_and_load(snapshot: zed.Snapshot, tmp_path: Any) -> None:
+    path = str(tmp_path / 'prelude.zeds')
+    snapshot.save(path)
+    loaded = zed.load_snapshot(path)
+
+    assert loaded.to_data() == snapshot.to_data() == {
+        'definitions': {'greeting': 'hello', 'nothing': None, 'alias': 'hello'},
+    }
+    assert isinstance(loaded.definitions['nothing'], zed.ast.Undefined)
+    source = 'print greeting\nprint nothing\nprint alias\nprint undefined\n'
+    for engine in zed.ENGINES:
+        assert run(loaded, source, engine) == run(snapshot, source, engine)
+
+    assert zed.read_prelude(path).to_data() == snapshot.to_data()
+
+def test_load_rejects_other_files(tmp_path: Any) -> None:
+    path = str(tmp_path / 'prelude.zed')
+    with open(path, 'w') as f:
+        f.write(PRELUDE)
+
+    with pytest.raises(ValueError):
+        zed.load_snapshot(path)
+    assert zed.read_prelude(path).to_data() == zed.compile_snapshot(PRELUDE).to_data()
+
+@pytest.mark.parametrize('source', ['print "x"\n', 'let a = "x"\nprint a\n'])
+def test_print_in_prelude(source: str) -> None:
+    with pytest.raises(ValueError):
+        zed.compile_snapshot(source)
+
+@pytest.mark.parametrize('source', ['let @\n', 'let = "x"\n', 'print a\n'])
+def test_invalid_prelude(source: str) -> None:
+    with pytest.raises(zed.CompilationError):
+        zed.compile_snapshot(source)
+
+def test_cli(tmp_path: Any) -> None:
+    prelude = str(tmp_path / 'prelude.zed')
+    with open(prelude, 'w') as f:
+        f.write(PRELUDE)
+
+    output = str(tmp_path / 'prelude.zeds')
+    proc = cli(prelude, '-o', output)
+    assert (proc.returncode, proc.stderr) == (0, '')
+    assert zed.load_snapshot(output).to_data() == zed.compile_snapshot(PRELUDE).to_data()
+
+@pytest.mark.parametrize('source, message', [
+    (None, 'cannot read prelude'),
+    ('let @\n', 'cannot read prelude'),
+    ('print "x"\n', 'cannot read prelude'),
+    (PRELUDE, 'cannot save snapshot'),
+])
+def test_cli_errors(tmp_path: Any, source: Optional[str], message: str) -> None:
+    prelude = str(tmp_path / 'prelude.zed')
+    if source is not None:
+        with open(prelude, 'w') as f:
+            f.write(source)
+
+    proc = cli(prelude, '-o', str(tmp_path / 'missing' / 'prelude.zeds'))
+    assert proc.returncode == 2
+    assert message in proc.stderr
+    assert 'Traceback' not in proc.stderr
+
+@pytest.mark.parametrize('args', [[], ['prelude.zed']])
+def test_cli_usage(args: List[str]) -> None:
+    proc = cli(*args)
+    assert proc.returncode == 2
+    assert proc.stderr.startswith('usage: python -m zed snapshot')
@@ -0,0 +1,54 @@
+"""Checks that streaming a program prints the same as running it whole."""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import io
+import random
+
+import pytest
+import zed
+
+from benchmarks.generator import generate_program, random_program
+
+
+def stream(source: str, chunk_size: int, lexer: str = 'rply') -> Tuple[str, Optional[str]]:
+    """Returns the output of streaming the source and its error, if any."""
+    sink = zed.CaptureSink()
+    try:
+        zed.run_stream(io.StringIO(source), zed.ParserState(sink), chunk_size, lexer=lexer)
+    except zed.CompilationError as error:
+        return sink.getvalue(), str(error)
+    return sink.getvalue(), None
+
+
+@pytest.mark.parametrize('lexer', zed.LEXER_ENGINES)
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, zed.stream.DEFAULT_CHUNK_SIZE])
+def test_generated_programs(lexer: str, chunk_size: int) -> None:
+    source = generate_program(300, 2)
+    expected = zed.Interpreter(lexer).run(source)
+    assert stream(source, chunk_size, lexer) == (expected.output, None)
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64])
+@pytest.mark.parametrize('seed', range(4))
+def test_random_programs(chunk_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(10):
+        source = random_program(rng, rng.randint(1, 40))
+        expected = zed.Interpreter().run(source)
+        assert stream(source, chunk_size) == (expected.output, None), \
+            'chunks of %d differ for:\n%s' % (chunk_size, source)
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64])
+def test_statement_across_chunks(chunk_size: int) -> None:
+    source = 'let greeting = "hello world"\nprint greeting\nprint "no newline"'
+    assert stream(source, chunk_size) == ('hello world\nno newline\n', None)
+
+@pytest.mark.parametrize('chunk_size', [1, 64])
+def test_errors(chunk_size: int) -> None:
+    # Streamed statements are evaluated before the rest is parsed, so the
+    # output before an error is kept.
+    source = 'let a = "x"\nprint a\ndel a\nprint a\nprint "y"\n'
+    expected = zed.Interpreter().run(source)
+    assert stream(source, chunk_size) == ('x\n', str(expected.error))
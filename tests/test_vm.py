@@ -0,0 +1,71 @@
+"""Checks that the bytecode VM prints the same as the tree engine."""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import pytest
+import zed
+
+from benchmarks.generator import MIXES, generate_program
+
+
+def run(engine: str, source: str, snapshot: Optional[zed.Snapshot] = None) -> Tuple[str, str]:
+    result = zed.Interpreter(engine=engine, snapshot=snapshot).run(source)
+    return result.output, str(result.error)
+
+def check(source: str, snapshot: Optional[zed.Snapshot] = None) -> None:
+    assert run('vm', source, snapshot) == run('tree', source, snapshot), source
+
+
+@pytest.mark.parametrize('mix', sorted(MIXES))
+def test_generated_programs(mix: str) -> None:
+    check(generate_program(300, 3, mix))
+
+@pytest.mark.parametrize('source', ['', '\n', '\n\n\n', '  \t\n'])
+def test_empty_programs(source: str) -> None:
+    # The grammar needs at least one statement, so both engines fail alike.
+    assert run('vm', source) == ('', 'invalid syntax')
+    check(source)
+
+@pytest.mark.parametrize('source', [
+    'let a = "x"\nprint a\ndel a\nprint a\n',
+    'print a\n',
+    'let a = "x"\ndel a\ndel a\n',
+    'print "x"\nlet = "y"\n',
+    'print "x"\nlet @\n',
+])
+def test_errors(source: str) -> None:
+    _, error = run('vm', source)
+    assert error != 'None'
+    check(source)
+
+@pytest.mark.parametrize('source', [
+    'let a\nprint a\nprint undefined\n',
+    'let a = "x"\nlet b = a\ndel a\nprint b\nlet a = "y"\nprint a\nprint b\n',
+    'let a = "x"\nlet a = a\nprint a\n',
+])
+def test_bindings(source: str) -> None:
+    check(source)
+
+@pytest.mark.parametrize('source', [
+    'print greeting\nprint nothing\n',
+    'let greeting = "bye"\nprint greeting\n',
+    'del greeting\nlet greeting = "again"\nprint greeting\n',
+    'let copy = greeting\ndel greeting\nprint copy\n',
+    'del greeting\nprint greeting\n',
+])
+def test_snapshot_preludes(source: str) -> None:
+    snapshot = zed.compile_snapshot('let greeting = "hello"\nlet nothing\n')
+    check(source, snapshot)
+    # Runs must not change the snapshot.
+    assert run('vm', 'print greeting\n', snapshot) == ('hello\n', 'None')
+
+def test_disassemble() -> None:
+    state = zed.ParserState(zed.NullSink())
+    program = zed.get_parser().parse(zed.get_lexer().lex('let a = "x"\nprint a\nprint "x"\ndel a\n'), state=state)
+    code = zed.vm.compile_program(program)
+    assert len(code) == 5 and code.consts == ('x',) and code.names == ('a',)
+    assert [line.split()[1] for line in code.disassemble()] == [
+        'LOAD_CONST', 'STORE_SLOT', 'PRINT_SLOT', 'PRINT_CONST', 'DELETE_SLOT',
+    ]
@@ -9,11 +9,65 @@ License: MIT
 Author: Izhar Ahmad
 """
 
+from __future__ import annotations
+
 __version__ = '0.1.0-alpha1'
 __license__ = 'MIT'
 __author__ = 'Izhar Ahmad'
 
-from zed import ast as ast
-from zed.lexer import *
-from zed.parser import *
-from zed.state import *
+import importlib
+
+# Importing typing is avoided here as it is the largest part of importing
+# this package; type checkers treat this constant as typing.TYPE_CHECKING.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+# The submodules are only imported when one of their names is first
+# accessed, so that importing zed (or only the lexer) does not pay for the
+# parser and the engines. This maps each exported name to its submodule.
+_EXPORTS: Dict[str, str] = {}
+for _module, _names in (
+    ('incremental', ('IncrementalDocument',)),
+    ('interpreter', ('Interpreter', 'RunResult', 'RunCancelled', 'ENGINES')),
+    ('lexer', ('get_tokens', 'get_lexer', 'reset_lexer', 'FastLexer', 'lex_parallel', 'lex_file',
+               'LEXER_ENGINES', 'PARALLEL_LEX_THRESHOLD')),
+    ('memory', ('profile_memory', 'MemoryStats', 'PhaseMemory')),
+    ('optimizer', ('optimize', 'OptimizationStats', 'OPTIMIZATION_LEVELS')),
+    ('output', ('OutputSink', 'StreamSink', 'BufferedSink', 'CaptureSink', 'NullSink')),
+    ('parser', ('get_parser', 'reset_parser', 'parser_cache_hit', 'grammar_fingerprint', 'warm_parser_cache',
+                'FastParser', 'PARSER_ENGINES', 'CompilationError')),
+    ('repl', ('Session', 'run_repl')),
+    ('pycompile', ('compile_to_code', 'transpile', 'compile_file', 'exec_code', 'ExecutionError')),
+    ('snapshot', ('Snapshot', 'compile_snapshot', 'load_snapshot', 'read_prelude')),
+    ('state', ('ParserState',)),
+    ('stats', ('run_with_stats', 'Stats', 'PhaseStats')),
+    ('stream', ('run_stream', 'split_statements')),
+    ('tokens', ('TokenBuffer', 'BufferToken', 'LineIndex', 'Source')),
+    ('trace', ('set_trace', 'get_trace', 'format_event', 'TRACE_EVENTS')),
+):
+    _EXPORTS.update(dict.fromkeys(_names, _module))
+del _module, _names
+
+__all__ = ('ast', 'vm', *_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        # Any other name is looked up as a submodule, such as zed.lexer,
+        # which sets itself as an attribute of this package once imported.
+        try:
+            return importlib.import_module('zed.' + name)
+        except ModuleNotFoundError as error:
+            if error.name != 'zed.' + name:
+                raise
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+    value = getattr(importlib.import_module('zed.' + module), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()).union(__all__))
+
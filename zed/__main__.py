@@ -23,27 +23,241 @@
 from __future__ import annotations
 
 import argparse
+import os
+import sys
 import zed
 
+if sys.argv[1:2] == ['batch']:
+    from zed import batch
+    sys.exit(batch.main(sys.argv[2:]))
+if sys.argv[1:2] == ['serve']:
+    from zed import server
+    sys.exit(server.main_serve(sys.argv[2:]))
+if sys.argv[1:2] == ['run']:
+    from zed import server
+    sys.exit(server.main_run(sys.argv[2:]))
+if sys.argv[1:2] == ['snapshot']:
+    from zed import snapshot
+    sys.exit(snapshot.main(sys.argv[2:]))
+
 parser = argparse.ArgumentParser(description='CLI for the Zed language')
 parser.add_argument(
-    'filename', help='The name of file to operate on.', type=str
+    'filename', help='The name of file to operate on. Without it, inputs are read interactively.', type=str, nargs='?'
 )
 parser.add_argument('--lex', help='Lex the file and output tokens rather than running it.', default=False)
+parser.add_argument(
+    '--lexer',
+    help='The lexer engine to use (default: rply).',
+    choices=zed.LEXER_ENGINES,
+    default='rply',
+)
+parser.add_argument(
+    '--parser',
+    help='The parser engine to use (default: rply).',
+    choices=zed.PARSER_ENGINES,
+    default='rply',
+)
+parser.add_argument(
+    '--engine',
+    help='The engine used to execute the program (default: tree).',
+    choices=zed.ENGINES,
+    default='tree',
+)
+parser.add_argument(
+    '-O',
+    help='Optimize the program before running it. Repeat for more optimizations (-OO).',
+    action='count',
+    default=0,
+    dest='optimize',
+)
+parser.add_argument(
+    '--no-cache',
+    help='Do not read or write the compiled program cache.',
+    action='store_true',
+)
+parser.add_argument(
+    '--cache-dir',
+    help='The directory to store the compiled program cache in (default: __zedcache__ next to the file).',
+    default=None,
+)
+parser.add_argument(
+    '--stream',
+    help='Run the file one statement at a time in constant memory.',
+    action='store_true',
+)
+parser.add_argument(
+    '--mmap',
+    help='Memory map the file and lex it without reading it into memory. Uses the fast lexer.',
+    action='store_true',
+)
+parser.add_argument(
+    '--stats',
+    help='Report the time taken by each phase to stderr, as text or with --stats=json as JSON.',
+    nargs='?',
+    const='text',
+    metavar='FORMAT',
+)
+parser.add_argument(
+    '--memstats',
+    help='Report the memory used by each phase and retained by the AST to stderr, as text or with '
+         '--memstats=json as JSON. Runs the program with the tree engine.',
+    nargs='?',
+    const='text',
+    metavar='FORMAT',
+)
+parser.add_argument(
+    '--trace',
+    help='Write the statements and definitions of the program to stderr as it runs. Implies --engine tree.',
+    action='store_true',
+)
+parser.add_argument(
+    '--trace-every',
+    help='Only trace every Nth statement (default: 1).',
+    type=int,
+    default=1,
+    metavar='N',
+)
+parser.add_argument(
+    '--prelude',
+    help='A prelude, or a snapshot of one saved by "python -m zed snapshot", to run the program after.',
+    metavar='FILE',
+)
+parser.add_argument(
+    '--warm-cache',
+    help='Build the parse table cache ahead of time and exit.',
+    action='store_true',
+)
 
 args = parser.parse_args()
 
-with open(args.filename, 'r') as f:
-    source = f.read()
-    lexer = zed.get_lexer()
+# As the format is optional, "--stats file.zed" takes the filename as format.
+for option in ('stats', 'memstats'):
+    value = getattr(args, option)
+    if value is not None and value not in ('text', 'json') and args.filename is None:
+        args.filename = value
+        setattr(args, option, 'text')
+
+if args.warm_cache:
+    print(zed.warm_parser_cache())
+    exit()
+if args.filename is None and (args.lex or args.stats or args.memstats or args.stream or args.mmap or args.trace):
+    parser.error('the following arguments are required: filename')
+if args.optimize not in zed.OPTIMIZATION_LEVELS:
+    parser.error('the highest optimization level is -O%s' % ('O' * (max(zed.OPTIMIZATION_LEVELS) - 1)))
+if args.mmap and (args.stream or args.engine == 'py'):
+    parser.error('--mmap requires --engine tree or --engine vm')
+if args.stats not in (None, 'text', 'json'):
+    parser.error('--stats format must be text or json')
+if args.stats and (args.stream or args.mmap):
+    parser.error('--stats cannot be used with --stream or --mmap')
+if args.memstats not in (None, 'text', 'json'):
+    parser.error('--memstats format must be text or json')
+if args.memstats and (args.stats or args.stream or args.mmap):
+    parser.error('--memstats cannot be used with --stats, --stream or --mmap')
+if args.trace_every < 1:
+    parser.error('--trace-every must be at least 1')
+if args.trace and (args.stats or args.memstats):
+    parser.error('--trace cannot be used with --stats or --memstats')
+if args.prelude and (args.stats or args.memstats):
+    parser.error('--prelude cannot be used with --stats or --memstats')
 
-    if args.lex:
-        for token in lexer.lex(source):
-            print(token)
+snapshot = None
+if args.prelude:
+    try:
+        snapshot = zed.read_prelude(args.prelude, args.lexer, args.parser)
+    except (OSError, zed.CompilationError, ValueError) as error:
+        parser.error('cannot read prelude: %s' % error)
+
+if args.lex:
+    # Only the fast lexer can lex parts of a file in parallel.
+    if args.lexer == 'fast' and os.path.getsize(args.filename) >= zed.PARALLEL_LEX_THRESHOLD:
+        tokens = iter(zed.lex_parallel(args.filename))
     else:
-        parser = zed.get_parser()
-        try:
-            parser.parse(lexer.lex(source), state=zed.ParserState()).eval()  # type: ignore
-        except zed.CompilationError as error:
-            print(error)
-            exit()
+        with open(args.filename, 'r') as f:
+            tokens = zed.get_lexer(args.lexer).lex(f.read())
+    for token in tokens:
+        print(token)
+    exit()
+
+# Output is buffered and written in large blocks rather than once per print.
+output = zed.BufferedSink()
+stats = zed.Stats() if args.stats else None
+memory = zed.MemoryStats() if args.memstats else None
+state = zed.ParserState(output, snapshot)
+
+if args.trace:
+    # Only the tree engine evaluates the statements one by one.
+    args.engine = 'tree'
+    zed.set_trace(state, lambda event, state, arg: sys.stderr.write('trace: %s\n' % zed.format_event(event, arg)),
+                  every=args.trace_every)
+
+if args.filename is None:
+    # Without a file, the inputs are run one by one as they are typed.
+    from zed import repl
+    sys.exit(repl.run_repl(args.lexer, args.parser, snapshot=snapshot))
+
+try:
+    if stats is not None:
+        code = None
+        if args.engine != 'py' and not args.no_cache:
+            # The bytecode cached by a normal run is used but not written.
+            with stats.phase('load') as phase:
+                code = zed.vm.load_cached(args.filename, args.cache_dir, args.lexer, args.optimize)
+                phase.counters['cache'] = 'miss' if code is None else 'hit'
+
+        if code is not None:
+            with stats.phase('eval') as phase:
+                phase.counters['instructions'] = len(code)
+                zed.vm.VirtualMachine().run(code, output)
+        else:
+            with stats.phase('read'):
+                with open(args.filename, 'r') as f:
+                    source = f.read()
+            zed.run_with_stats(source, stats, output, args.lexer, args.engine, args.optimize, args.parser)
+    elif memory is not None:
+        with open(args.filename, 'r') as f:
+            source = f.read()
+        zed.profile_memory(source, memory, output, args.lexer, args.optimize, args.parser)
+    elif args.stream:
+        with open(args.filename, 'r') as f:
+            zed.run_stream(f, state, parser=args.parser, lexer=args.lexer)
+    elif args.engine == 'py':
+        if snapshot is not None:
+            # The code cache of files does not cover the prelude, so it is bypassed.
+            with open(args.filename, 'r') as f:
+                code = zed.compile_to_code(f.read(), args.filename, args.lexer, args.optimize, args.parser, snapshot)
+        else:
+            code = zed.compile_file(args.filename, args.cache_dir, not args.no_cache, args.lexer, args.optimize,
+                                    args.parser)
+        zed.exec_code(code, output)
+    elif not (args.no_cache or args.mmap or args.trace or snapshot is not None):
+        # The tree engine prints the same output as the bytecode, which is
+        # cached so that running the file again skips lexing and parsing.
+        code = zed.vm.compile_file(args.filename, args.cache_dir, True, args.lexer, args.optimize, args.parser)
+        zed.vm.VirtualMachine().run(code, output)
+    else:
+        if args.mmap:
+            tokens = iter(zed.lex_file(args.filename))
+        else:
+            with open(args.filename, 'r') as f:
+                tokens = zed.get_lexer(args.lexer).lex(f.read())
+
+        program = zed.get_parser(engine=args.parser).parse(tokens, state=state)
+        if args.optimize:
+            zed.optimize(program, args.optimize)  # type: ignore
+
+        if args.engine == 'vm':
+            zed.vm.VirtualMachine().run(zed.vm.compile_program(program), output)  # type: ignore
+        else:
+            program.eval()  # type: ignore
+except zed.CompilationError as error:
+    output.flush()
+    print(error)
+finally:
+    output.flush()
+    if stats is not None:
+        sys.stdout.flush()
+        sys.stderr.write((stats.to_json() if args.stats == 'json' else stats.format()) + '\n')
+    if memory is not None:
+        sys.stdout.flush()
+        sys.stderr.write((memory.to_json() if args.memstats == 'json' else memory.format()) + '\n')
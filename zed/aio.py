@@ -0,0 +1,148 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the asyncio front-end for Zed lang.
+
+Programs are run by an :class:`Interpreter` in a bounded thread pool so
+that the event loop is never blocked by lexing, parsing or evaluation. Each
+program gets its own output which is returned in a :class:`RunResult`.
+
+When the awaiting task is cancelled or times out, a program that has not
+started yet is dropped and a running program is stopped at the next
+cancellation check of the interpreter.
+
+The main components of this module are:
+
+- run()          : Runs a program without blocking the event loop.
+- run_many()     : Runs many programs with bounded concurrency.
+- get_executor() : Returns the default executor programs are run in.
+
+This module is not imported by ``import zed`` and must be imported as
+``zed.aio`` explicitly.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from zed.interpreter import Interpreter, RunResult
+
+import asyncio
+import os
+import threading
+
+__all__ = (
+    "run",
+    "run_many",
+    "get_executor",
+)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_interpreter: Optional[Interpreter] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the default executor used to run programs.
+
+    The executor is created on first call and has one worker per CPU.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(os.cpu_count() or 1, thread_name_prefix='zed')
+        return _executor
+
+async def run(
+    source: str,
+    *,
+    timeout: Optional[float] = None,
+    interpreter: Optional[Interpreter] = None,
+    executor: Optional[Executor] = None,
+) -> RunResult:
+    """Runs the given source in an executor and returns a :class:`RunResult`.
+
+    Compilation errors are returned in the result rather than raised.
+
+    Parameters
+    ----------
+    source: :class:`str`
+        The source of program.
+    timeout: Optional[:class:`float`]
+        The number of seconds after which the run is cancelled and
+        :exc:`asyncio.TimeoutError` is raised.
+    interpreter: Optional[:class:`Interpreter`]
+        The interpreter to run the program with. Defaults to a shared
+        interpreter using the tree engine.
+    executor: Optional[:class:`concurrent.futures.Executor`]
+        The executor to run the program in. Defaults to get_executor().
+    """
+    global _interpreter
+    if interpreter is None:
+        if _interpreter is None:
+            _interpreter = Interpreter()
+        interpreter = _interpreter
+
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    future = loop.run_in_executor(executor or get_executor(), interpreter.run, source, None, cancelled)
+
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except BaseException:
+        # Stop the program if it is still running in the executor.
+        cancelled.set()
+        raise
+
+async def run_many(
+    sources: Iterable[str],
+    *,
+    concurrency: int = 8,
+    timeout: Optional[float] = None,
+    interpreter: Optional[Interpreter] = None,
+    executor: Optional[Executor] = None,
+) -> List[RunResult]:
+    """Runs the given sources and returns their results in the same order.
+
+    At most ``concurrency`` programs are run at once. The timeout applies to
+    each program separately. If any program times out or the call is cancelled,
+    the remaining programs are cancelled and the exception is propagated.
+
+    The other parameters are the same as of run().
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1')
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(source: str) -> RunResult:
+        async with semaphore:
+            return await run(source, timeout=timeout, interpreter=interpreter, executor=executor)
+
+    tasks = [asyncio.ensure_future(run_one(source)) for source in sources]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
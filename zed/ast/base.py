@@ -22,8 +22,7 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, List
-from rply.token import BaseBox
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
 if TYPE_CHECKING:
     from zed.state import ParserState
@@ -34,9 +33,13 @@ __all__ = (
 )
 
 
-class BaseToken(BaseBox):
+class BaseToken:
     r"""Base class for other AST assets.
 
+    AST assets use ``__slots__`` rather than an instance dictionary. Subclasses
+    must declare the slots for their attributes and list the attributes that
+    are initialized from keyword arguments in ``_fields``.
+
     Parameters
     ----------
     state: :class:`ParserState`
@@ -44,16 +47,21 @@ class BaseToken(BaseBox):
     \*\*kwargs:
         The additional keyword arguments passed to token as metadata. These
         are handled by subclasses.
-
-    Attributes
-    ----------
-    meta: Dict[:class:`str`, Any]
-        The raw metadata passed as keyword while initializing
-        the token.
     """
+    __slots__ = ('state',)
+
+    _fields: Tuple[str, ...] = ()
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         self.state = state
-        self.meta = kwargs.copy()
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        """Dict[:class:`str`, Any]: The metadata passed as keyword while initializing the token.
+
+        This is built on access from the attributes of the token.
+        """
+        return {field: getattr(self, field) for field in self._fields}
 
     def eval(self) -> Any:
         """Evaluates the token.
@@ -74,6 +82,10 @@ class Program(BaseToken):
     tokens:
         The list of other tokens in the program.
     """
+    __slots__ = ('tokens',)
+
+    _fields = ('tokens',)
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
@@ -22,12 +22,13 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, List
+from typing import TYPE_CHECKING, Any, List, Optional
 from zed.sentinels import UNDEFINED
 from zed.ast.base import BaseToken
 
 if TYPE_CHECKING:
     from zed.state import ParserState
+    from zed.tokens import Source
 
 __all__ = (
     'String',
@@ -38,15 +39,36 @@ __all__ = (
 class String(BaseToken):
     """Represents a string literal.
 
+    The literal is either given by its ``value`` or by the ``source`` it
+    appears in along with its ``start`` and ``end`` offsets. In the latter
+    case, the value is only sliced (and for a bytes-like source, decoded)
+    from the source when it is first accessed.
+
     Attributes
     ----------
     value: :class:`str`
         The string literal.
     """
+    __slots__ = ('_value', '_source', '_start', '_end')
+
+    _fields = ('value',)
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
-        self.value = kwargs.pop('value')
+        self._value: Optional[str] = kwargs.pop('value', None)
+        self._source: Optional[Source] = kwargs.pop('source', None)
+        self._start: int = kwargs.pop('start', 0)
+        self._end: int = kwargs.pop('end', 0)
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            text = self._source[self._start:self._end]  # type: ignore
+            self._value = text if isinstance(text, str) else bytes(text).decode('utf-8')
+            # The source is no longer needed and may be released.
+            self._source = None
+        return self._value
 
     def eval(self):
         return self.value
@@ -54,6 +76,8 @@ class String(BaseToken):
 
 class Undefined(BaseToken):
     """Represents an undefined literal."""
+    __slots__ = ()
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
@@ -38,6 +38,8 @@ __all__ = (
 
 class Statements(BaseToken):
     """An evaluator class that manages statements to evaluate later."""
+    __slots__ = ()
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
@@ -53,13 +55,17 @@ class Print(BaseToken):
     value: :class:`BaseToken`
         The token to print.
     """
+    __slots__ = ('value',)
+
+    _fields = ('value',)
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
         self.value: BaseToken = kwargs.pop('value')
 
     def eval(self):
-        print(self.value.eval())
+        self.state.output.print(self.value.eval())
 
 
 class Let(BaseToken):
@@ -72,6 +78,10 @@ class Let(BaseToken):
     value: :class:`BaseToken`
         The value being assigned.
     """
+    __slots__ = ('ident', 'value')
+
+    _fields = ('ident', 'value')
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
@@ -90,6 +100,10 @@ class Del(BaseToken):
     ident: :class:`str`
         The identifier that is being deleted.
     """
+    __slots__ = ('ident',)
+
+    _fields = ('ident',)
+
     def __init__(self, state: ParserState, **kwargs: Any) -> None:
         super().__init__(state, **kwargs)
 
@@ -0,0 +1,230 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the batch runner for Zed lang.
+
+The batch runner runs many files on a process pool. The lexer and parser are
+built once in the parent process, which is then forked into the workers so
+no worker builds the grammar again. Where fork is not available, each worker
+builds them once in its initializer instead.
+
+The main components of this module are:
+
+- find_files()  : Finds the files matched by a directory or glob pattern.
+- run_batch()   : Runs files on a process pool and yields their results.
+- BatchResult   : The result of running a single file.
+- main()        : The entry point of ``python -m zed batch``.
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, List, Optional, Sequence
+from zed.interpreter import Interpreter, ENGINES
+from zed.lexer import LEXER_ENGINES
+from zed.parser import PARSER_ENGINES, CompilationError
+from zed.snapshot import Snapshot, read_prelude
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+__all__ = (
+    "find_files",
+    "run_batch",
+    "BatchResult",
+)
+
+
+_interpreter: Optional[Interpreter] = None
+
+
+class BatchResult:
+    """The result of running a single file in a batch.
+
+    Attributes
+    ----------
+    path: :class:`str`
+        The path of file.
+    output: :class:`str`
+        The output printed by the file.
+    error: Optional[:class:`str`]
+        The error message if running the file failed.
+    elapsed: :class:`float`
+        The time taken to run the file, in seconds.
+    """
+    __slots__ = ('path', 'output', 'error', 'elapsed')
+
+    def __init__(self, path: str, output: str, error: Optional[str], elapsed: float) -> None:
+        self.path = path
+        self.output = output
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        return '<BatchResult path=%r ok=%r elapsed=%r>' % (self.path, self.ok, self.elapsed)
+
+    @property
+    def ok(self) -> bool:
+        """:class:`bool`: Whether the file ran without errors."""
+        return self.error is None
+
+    def to_json(self) -> str:
+        """Returns the result as a line of JSON."""
+        return json.dumps({
+            'path': self.path,
+            'ok': self.ok,
+            'output': self.output,
+            'error': self.error,
+            'elapsed': self.elapsed,
+        })
+
+
+def find_files(pattern: str) -> List[str]:
+    """Returns the files matched by the given directory or glob pattern.
+
+    A directory matches all ``.zed`` files in it, recursively. The files
+    are returned in sorted order.
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '**', '*.zed')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def run_batch(
+    paths: Sequence[str],
+    jobs: Optional[int] = None,
+    lexer: str = 'rply',
+    engine: str = 'tree',
+    parser: str = 'rply',
+    snapshot: Optional[Snapshot] = None,
+) -> Iterator[BatchResult]:
+    """Runs the given files and yields their results in the same order.
+
+    Each file runs with its own parser state and captured output. Files
+    that fail to compile or run are reported in their result and do not
+    stop the batch.
+
+    Parameters
+    ----------
+    paths: Sequence[:class:`str`]
+        The paths of files to run.
+    jobs: Optional[:class:`int`]
+        The number of worker processes. Defaults to the number of CPUs. When
+        1, the files are run in this process.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    engine: :class:`str`
+        The engine used to execute the files, see Interpreter.
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude that every file starts from.
+    """
+    # Creating the interpreter builds the lexer and parser, which forked
+    # workers then inherit from the parent.
+    _init_worker(lexer, engine, parser, snapshot)
+
+    if jobs == 1 or len(paths) <= 1:
+        yield from map(_run_file, paths)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    # Larger chunks reduce the per-file IPC overhead for small files.
+    chunksize = max(1, min(64, len(paths) // (jobs * 8)))
+
+    with context.Pool(jobs, _init_worker, (lexer, engine, parser, snapshot)) as pool:
+        yield from pool.imap(_run_file, paths, chunksize)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs ``python -m zed batch`` with the given arguments.
+
+    Returns the exit status, which is 1 if any of the files failed.
+    """
+    parser = argparse.ArgumentParser(prog='python -m zed batch', description='Run many Zed files in parallel.')
+    parser.add_argument('patterns', help='The directories or glob patterns of files to run.', nargs='+')
+    parser.add_argument('-j', '--jobs', help='The number of worker processes (default: number of CPUs).', type=int)
+    parser.add_argument('--json', help='Write the results as JSON lines.', action='store_true')
+    parser.add_argument('--timings', help='Report the time taken by each file to stderr.', action='store_true')
+    parser.add_argument('--lexer', help='The lexer engine to use (default: rply).', choices=LEXER_ENGINES,
+                        default='rply')
+    parser.add_argument('--engine', help='The engine used to execute the files (default: tree).', choices=ENGINES,
+                        default='tree')
+    parser.add_argument('--parser', help='The parser engine to use (default: rply).', choices=PARSER_ENGINES,
+                        default='rply')
+    parser.add_argument('--prelude', help='A prelude or saved snapshot that every file starts from.')
+    args = parser.parse_args(argv)
+
+    paths = [path for pattern in args.patterns for path in find_files(pattern)]
+    if not paths:
+        parser.error('no files matched')
+
+    snapshot = None
+    if args.prelude is not None:
+        try:
+            snapshot = read_prelude(args.prelude, args.lexer, args.parser)
+        except (OSError, CompilationError, ValueError) as error:
+            parser.error('cannot read prelude: %s' % error)
+
+    failed = 0
+    start = time.perf_counter()
+
+    for result in run_batch(paths, args.jobs, args.lexer, args.engine, args.parser, snapshot):
+        failed += not result.ok
+        if args.json:
+            sys.stdout.write(result.to_json() + '\n')
+        else:
+            _write_result(result)
+        if args.timings:
+            sys.stderr.write('%10.2f ms  %s\n' % (result.elapsed * 1000, result.path))
+
+    elapsed = time.perf_counter() - start
+    sys.stderr.write('%d files (%d failed) in %.3f s, %.1f files/sec\n' % (
+        len(paths), failed, elapsed, len(paths) / elapsed))
+    return 1 if failed else 0
+
+
+def _init_worker(lexer: str, engine: str, parser: str, snapshot: Optional[Snapshot]) -> None:
+    global _interpreter
+    _interpreter = Interpreter(lexer, engine, parser=parser, snapshot=snapshot)
+
+def _run_file(path: str) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        result = _interpreter.run_file(path)  # type: ignore
+    except (OSError, UnicodeDecodeError) as error:
+        return BatchResult(path, '', str(error), time.perf_counter() - start)
+
+    # Errors are sent as text as they are not always picklable.
+    error = None if result.ok else str(result.error)
+    return BatchResult(path, result.output, error, time.perf_counter() - start)
+
+def _write_result(result: BatchResult) -> None:
+    sys.stdout.write('==> %s <==\n' % result.path)
+    sys.stdout.write(result.output)
+    if result.error is not None:
+        sys.stdout.write(result.error + '\n')
@@ -0,0 +1,136 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the on-disk cache helpers for Zed lang.
+
+The main components of this module are:
+
+- get_cache_dir()          : Returns the directory where Zed stores its cache files.
+- read_cache()             : Reads a cache file, returning None if it is unavailable.
+- write_cache()            : Atomically writes a cache file.
+- get_program_cache_path() : Returns the path of the cache file of a program.
+- get_program_cache_key()  : Returns the key identifying the cached form of a program.
+
+The cache is strictly best-effort. Failing to read or write a cache file
+is never an error, the caller simply does the work that the cache would
+have saved.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+from appdirs import AppDirs
+
+import hashlib
+import os
+import sys
+import tempfile
+
+__all__ = (
+    "get_cache_dir",
+    "read_cache",
+    "write_cache",
+    "get_program_cache_path",
+    "get_program_cache_key",
+)
+
+
+CACHE_DIRNAME = '__zedcache__'
+
+
+def get_cache_dir() -> str:
+    """Returns the directory used for storing Zed cache files.
+
+    This is the user cache directory of the platform unless it is
+    overridden by the ``ZED_CACHE_DIR`` environment variable.
+    """
+    return os.environ.get('ZED_CACHE_DIR') or AppDirs('zed').user_cache_dir
+
+def read_cache(path: str) -> Optional[bytes]:
+    """Reads the cache file at the given path.
+
+    Returns None if the file does not exist or cannot be read.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def write_cache(path: str, data: bytes) -> bool:
+    """Atomically writes data to the cache file at the given path.
+
+    The data is first written to a temporary file in the same directory
+    which is then renamed over the target path, so concurrent readers
+    never observe a partially written file. Returns True if the file
+    was written.
+    """
+    directory = os.path.dirname(path) or '.'
+    try:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    except OSError:
+        return False
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        return False
+
+    return True
+
+def get_program_cache_path(filename: str, cache_dir: Optional[str] = None, suffix: str = 'c') -> str:
+    """Returns the path of the cache file storing the compiled form of a program.
+
+    Like Python's __pycache__, this is in a ``__zedcache__`` directory next
+    to the file unless another directory is given. The suffix is appended
+    to the name of file and tells apart the compiled forms of each engine.
+    """
+    name = os.path.basename(filename) + suffix
+    if cache_dir is None:
+        return os.path.join(os.path.dirname(filename), CACHE_DIRNAME, name)
+
+    # Files with same name in different directories share the cache directory.
+    digest = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, '%s-%s' % (digest, name))
+
+def get_program_cache_key(magic: bytes, data: bytes, lexer: str, optimize: int) -> bytes:
+    """Returns the key that a cache file of the program with the given source starts with.
+
+    The key covers the source, the Zed version, the grammar_fingerprint()
+    and the Python implementation so a stale cache file is never used.
+    """
+    from zed import __version__
+    from zed.parser import grammar_fingerprint
+
+    hasher = hashlib.sha256()
+    for part in (__version__, grammar_fingerprint(), sys.implementation.cache_tag, lexer, optimize):
+        hasher.update(str(part).encode())
+        hasher.update(b'\0')
+    hasher.update(data)
+    return magic + hasher.digest()
@@ -0,0 +1,468 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements incremental parsing of Zed programs for editors.
+
+A document keeps the tokens of each line and the AST node of each
+statement. Tokens never span lines so an edit only lexes the lines it
+changes, and statements are split at the statement keywords (see
+split_statements()) so it only regroups the statements around the edit.
+
+As identifiers are resolved while parsing, a statement following the edit
+may still need to be parsed again when it uses a variable whose value the
+edit changed. The document tracks the variables whose values differ from
+before the edit and parses again the statements using them, until no
+variable differs anymore. The statements after that point are reused.
+
+A statement that fails to compile is recorded with its error and the
+statements after it are parsed as if it was not there. Only the first
+error of document is reported, which is the error a full parse reports.
+
+The main components of this module are:
+
+- IncrementalDocument : A Zed program that is parsed incrementally as it is edited.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+import itertools
+
+from rply.errors import LexingError, ParsingError
+from rply.token import SourcePosition
+from zed.interpreter import RunResult
+from zed.lexer import get_lexer
+from zed.output import CaptureSink, NullSink
+from zed.parser import get_parser, CompilationError
+from zed.state import ParserState
+from zed.stream import STATEMENT_TOKENS
+
+if TYPE_CHECKING:
+    from zed.output import OutputSink
+    from zed.tokens import BufferToken
+
+__all__ = (
+    "IncrementalDocument",
+)
+
+
+# Marks a variable that is not defined in the effects of a statement.
+_MISSING = object()
+
+# Each line is lexed with a line number of its own, so that the position
+# of an error tells the line it occurred on whatever the line moved to.
+# The lines lexed together are numbered from the next multiple of 2 ** 32.
+_serials = itertools.count(1)
+
+# The number of statements replayed before the variables are kept again.
+_CHECKPOINT = 1024
+
+
+class _Line:
+    # The text and tokens of a line, with the statements starting on it. A
+    # lexing error ends the tokens of line at its column. Some lines keep
+    # the variables defined before them, to replay the variables from. The
+    # index and offset of line are as of the given number of shifts, see
+    # IncrementalDocument._locate().
+    __slots__ = ('text', 'tokens', 'error', 'stmts', 'env', 'index', 'offset', 'shifts')
+
+    def __init__(self, text: str, tokens: List[BufferToken], error: Optional[int] = None) -> None:
+        self.text = text
+        self.tokens = tokens
+        self.error = error
+        self.stmts: List[_Statement] = []
+        self.env: Optional[Dict[str, Any]] = None
+        self.index = 0
+        self.offset = 0
+        self.shifts = 0
+
+
+class _Statement:
+    # The tokens of a statement along with the result of parsing them: the
+    # node or error, and the values the statement left its variables with.
+    __slots__ = ('tokens', 'key', 'reads', 'writes', 'node', 'error', 'effects')
+
+    def __init__(self, tokens: List[Tuple[_Line, BufferToken]]) -> None:
+        self.tokens = tokens
+        self.key = tuple((token.gettokentype(), token.getstr()) for _, token in tokens)
+        self.writes: Tuple[str, ...] = ()
+        if len(self.key) > 1 and self.key[0][0] in ('STMT_LET', 'STMT_DEL') and self.key[1][0] == 'IDENT':
+            self.writes = (self.key[1][1],)
+
+        # A let statement does not depend on the previous value of its
+        # variable, a del statement only on whether it is defined.
+        skip = 1 if self.key[0][0] == 'STMT_LET' else None
+        self.reads: FrozenSet[str] = frozenset(value for i, (tp, value) in enumerate(self.key)
+                                               if tp == 'IDENT' and i != skip)
+        self.node: Any = None
+        self.error: Optional[Tuple[Exception, Optional[Tuple[_Line, BufferToken]]]] = None
+        self.effects: Tuple[Tuple[str, Any], ...] = ()
+
+
+class IncrementalDocument:
+    """A Zed program that is parsed incrementally as it is edited.
+
+    The document is always parsed; the first compilation error, if any, is
+    available from :attr:`error` and the program is run with run().
+
+    Parameters
+    ----------
+    text: :class:`str`
+        The initial text of document.
+    parser: :class:`str`
+        The parser engine to use, see get_parser(). The fast lexer engine
+        is always used.
+
+    Attributes
+    ----------
+    reparsed: :class:`int`
+        The number of statements parsed by the last edit.
+    """
+    def __init__(self, text: str = '', parser: str = 'rply') -> None:
+        self._parser = get_parser(engine=parser)
+        self._state = ParserState(NullSink())
+        self._lines: List[_Line] = []
+        # Each edit moves the lines after it by a number of lines and
+        # characters. Rather than updating these lines, the edit is recorded
+        # as (end, lines, characters) and applied to a line when it is looked up.
+        self._shifts: List[Tuple[int, int, int]] = []
+        self._failed_lines: Set[_Line] = set()
+        self._failed_stmts: Set[_Statement] = set()
+        self._error: Any = None
+        self.reparsed = 0
+        self._replace(0, 0, text.split('\n'))
+
+    @property
+    def text(self) -> str:
+        """:class:`str`: The text of document."""
+        return '\n'.join(line.text for line in self._lines)
+
+    @property
+    def error(self) -> Optional[CompilationError]:
+        """Optional[:class:`CompilationError`]: The first compilation error of document."""
+        if self._error is None:
+            self._error = self._find_error()
+        return self._error or None
+
+    def edit(self, start_line: int, start_col: int, end_line: int, end_col: int, text: str) -> None:
+        """Replaces the text between the given positions with the given text.
+
+        Lines and columns start at 0 and the end position is exclusive, like
+        the ranges of text edits sent by editors.
+        """
+        if not (0 <= start_line <= end_line < len(self._lines)):
+            raise IndexError('line out of range')
+
+        prefix = self._lines[start_line].text[:start_col]
+        suffix = self._lines[end_line].text[end_col:]
+        self._replace(start_line, end_line + 1, (prefix + text + suffix).split('\n'))
+
+    def run(self, output: Optional[OutputSink] = None) -> RunResult:
+        """Runs the document and returns a :class:`RunResult`.
+
+        The result is the same as running the text of document with an
+        :class:`Interpreter` using the tree engine and fast lexer.
+        """
+        error = self.error
+        if error is not None:
+            return RunResult('', error)
+
+        sink = output or CaptureSink()
+        self._state.output = sink
+        try:
+            for line in self._lines:
+                for stmt in line.stmts:
+                    stmt.node.eval()
+        finally:
+            self._state.output = NullSink()
+        return RunResult(sink.getvalue() if output is None else '')  # type: ignore
+
+    def _replace(self, start: int, end: int, texts: List[str]) -> None:
+        # Replaces the lines from start to end (exclusive) with new lines.
+        lines = self._lines
+        new_lines = _lex_lines(texts)
+        self._shift(start, end, new_lines)
+
+        # The statement before the edit continues on the edited lines unless
+        # they start with a statement keyword, so the lines are grouped again
+        # from the line its statement starts on. The statements after the
+        # edit continue until the next line starting with a keyword.
+        first = start
+        if not (_starts_stmt(new_lines[0]) and (start == end or _starts_stmt(lines[start]))):
+            while first > 0:
+                first -= 1
+                line = lines[first]
+                if line.stmts and line.stmts[0].tokens[0][1] is line.tokens[0]:
+                    break
+        last = end
+        while last < len(lines) and not _starts_stmt(lines[last]):
+            last += 1
+
+        old_stmts = [stmt for line in lines[first:last] for stmt in line.stmts]
+        self._failed_lines.difference_update(lines[start:end])
+        self._failed_lines.update(line for line in new_lines if line.error is not None)
+        self._failed_stmts.difference_update(old_stmts)
+
+        region = lines[first:start] + new_lines + lines[end:last]
+        lines[start:end] = new_lines
+        for line in region[1:]:
+            line.env = None
+        new_stmts = _group(region)
+
+        # The variables are replayed up to the edit, then the statements
+        # that did not change are reused and the others are parsed again.
+        env = self._replay(first)
+        old_env = dict(env)
+        for stmt in old_stmts:
+            _apply(old_env, stmt.effects)
+
+        self.reparsed = 0
+        reuse = True
+        for i, stmt in enumerate(new_stmts):
+            reuse = reuse and i < len(old_stmts) and old_stmts[i].key == stmt.key and old_stmts[i].error is None
+            if reuse:
+                stmt.node, stmt.effects = old_stmts[i].node, old_stmts[i].effects
+                _apply(env, stmt.effects)
+            else:
+                self._parse(stmt, env)
+
+        # The statements after the edit are parsed again as long as they
+        # use a variable whose value differs from before the edit. Only the
+        # values of those variables differ in the lines keeping variables.
+        changed: Set[str] = set()
+        for stmt in old_stmts + new_stmts:
+            _update(changed, stmt.writes, env, old_env)
+
+        for index in range(first + len(region), len(lines)):
+            if not changed:
+                break
+
+            line = lines[index]
+            if line.env is not None:
+                _apply(line.env, tuple((name, env.get(name, _MISSING)) for name in changed))
+            for stmt in line.stmts:
+                _apply(old_env, stmt.effects)
+                if changed.intersection(stmt.reads):
+                    self._parse(stmt, env)
+                else:
+                    _apply(env, stmt.effects)
+                _update(changed, stmt.writes, env, old_env)
+
+        self._error = None
+
+    def _replay(self, end: int) -> Dict[str, Any]:
+        # Returns the variables defined before the given line. They are
+        # replayed from the closest line keeping variables, and the lines
+        # that are replayed over keep them every so often.
+        lines = self._lines
+        start = end
+        while start > 0 and lines[start].env is None:
+            start -= 1
+
+        env = dict(lines[start].env or {}) if start < len(lines) else {}
+        count = 0
+        for index in range(start, end):
+            line = lines[index]
+            # Copying the variables takes about as long as replaying as many
+            # statements, which bounds the memory used by the copies.
+            if count > _CHECKPOINT and count > len(env):
+                line.env = dict(env)
+                count = 0
+            for stmt in line.stmts:
+                _apply(env, stmt.effects)
+            count += len(line.stmts)
+        return env
+
+    def _parse(self, stmt: _Statement, env: Dict[str, Any]) -> None:
+        # Parses the statement in the given variables and records its
+        # effects on them.
+        state = self._state
+        state._definitions = env
+        stmt.node = stmt.error = None
+        self._failed_stmts.discard(stmt)
+        try:
+            self._parser.parse((token for _, token in stmt.tokens), state=state)
+        except (CompilationError, ParsingError) as error:
+            # The position is that of a token in the statement, or None when
+            # the statement ended too early.
+            pos = error.pos if isinstance(error, CompilationError) else error.getsourcepos()
+            located = None
+            if pos is not None:
+                located = next(item for item in stmt.tokens if item[1].getsourcepos().lineno == pos.lineno
+                               and item[1].getsourcepos().idx == pos.idx)
+            stmt.error = (error, located)
+            self._failed_stmts.add(stmt)
+        else:
+            stmt.node = state.get_stmts()[0]
+        finally:
+            state.get_stmts().clear()
+            state._definitions = {}
+
+        stmt.effects = tuple((name, env.get(name, _MISSING)) for name in stmt.writes)
+        self.reparsed += 1
+
+    def _find_error(self) -> Any:
+        # Returns the first error of document, or False if there is none.
+        # The whole source is lexed before parsing, so a lexing error
+        # comes first.
+        lines = self._lines
+        if self._failed_lines:
+            line = min(self._failed_lines, key=self._index)
+            return CompilationError(self._sourcepos(line, line.error), 'invalid token')  # type: ignore
+
+        if self._failed_stmts:
+            first = min({stmt.tokens[0][0] for stmt in self._failed_stmts}, key=self._index)
+            stmts = _iter_from(lines, self._index(first))
+            stmt = next(stmt for stmt in stmts if stmt.error is not None)
+            error, located = stmt.error  # type: ignore
+            if located is None:
+                # A statement that ended too early fails at the next token.
+                following = next(stmts, None)
+                located = following and following.tokens[0]
+
+            pos = None
+            if located is not None:
+                pos = self._sourcepos(located[0], located[1].getsourcepos().colno - 1)
+            message = error.message if isinstance(error, CompilationError) else 'invalid syntax'
+            return CompilationError(pos, message)
+
+        if not any(line.tokens for line in lines):
+            return CompilationError(None, 'invalid syntax')
+        return False
+
+    def _shift(self, start: int, end: int, new_lines: List[_Line]) -> None:
+        # Positions the new lines replacing the lines from start to end and
+        # records how the lines after them move.
+        lines, shifts = self._lines, self._shifts
+        if start < len(lines):
+            offset = self._locate(lines[start])[1]
+        elif start:
+            offset = self._locate(lines[start - 1])[1] + len(lines[start - 1].text) + 1
+        else:
+            offset = 0
+
+        old_length = sum(len(line.text) + 1 for line in lines[start:end])
+        new_length = 0
+        for index, line in enumerate(new_lines, start):
+            line.index, line.offset = index, offset + new_length
+            new_length += len(line.text) + 1
+
+        shifts.append((end, len(new_lines) - (end - start), new_length - old_length))
+        if len(shifts) > len(lines):
+            # The lines are positioned again once there are more shifts than
+            # lines, so that positioning a line takes amortized O(1) time.
+            offset = 0
+            for index, line in enumerate(itertools.chain(lines[:start], new_lines, lines[end:])):
+                line.index, line.offset, line.shifts = index, offset, 0
+                offset += len(line.text) + 1
+            shifts.clear()
+        else:
+            for line in new_lines:
+                line.shifts = len(shifts)
+
+    def _locate(self, line: _Line) -> Tuple[int, int]:
+        # Returns the index and offset of the given line of document.
+        shifts = self._shifts
+        index, offset = line.index, line.offset
+        for end, lines, chars in itertools.islice(shifts, line.shifts, None):
+            if index >= end:
+                index += lines
+                offset += chars
+        line.index, line.offset, line.shifts = index, offset, len(shifts)
+        return index, offset
+
+    def _index(self, line: _Line) -> int:
+        return self._locate(line)[0]
+
+    def _sourcepos(self, line: _Line, colno: int) -> SourcePosition:
+        index, offset = self._locate(line)
+        return SourcePosition(offset + colno, index + 1, colno + 1)
+
+
+def _lex_lines(texts: List[str]) -> List[_Line]:
+    # Lexes the given lines at once, unless one of them fails to lex.
+    lexer = get_lexer('fast')
+    serial = next(_serials) << 32
+    try:
+        buffer = lexer.tokenize('\n'.join(texts), 0, serial)
+    except LexingError:
+        return [_lex_line(text, serial + i) for i, text in enumerate(texts)]
+
+    lines = []
+    tokens = iter(buffer)
+    token = next(tokens, None)
+    end = -1
+    for text in texts:
+        end += len(text) + 1
+        line = _Line(text, [])
+        while token is not None and buffer.starts[token.index] < end:
+            line.tokens.append(token)
+            token = next(tokens, None)
+        lines.append(line)
+    return lines
+
+def _lex_line(text: str, serial: int) -> _Line:
+    lexer = get_lexer('fast')
+    try:
+        return _Line(text, list(lexer.tokenize(text, 0, serial)))
+    except LexingError as error:
+        col = error.getsourcepos().idx
+        return _Line(text, list(lexer.tokenize(text[:col], 0, serial)), col)
+
+def _group(lines: List[_Line]) -> List[_Statement]:
+    # Splits the tokens of the given lines into statements and attaches
+    # them to the lines they start on.
+    stmts: List[_Statement] = []
+    current: List[Tuple[_Line, BufferToken]] = []
+    for line in lines:
+        line.stmts = []
+        for token in line.tokens:
+            if current and token.gettokentype() in STATEMENT_TOKENS:
+                stmts.append(_Statement(current))
+                current[0][0].stmts.append(stmts[-1])
+                current = []
+            current.append((line, token))
+    if current:
+        stmts.append(_Statement(current))
+        current[0][0].stmts.append(stmts[-1])
+    return stmts
+
+def _starts_stmt(line: _Line) -> bool:
+    return bool(line.tokens) and line.tokens[0].gettokentype() in STATEMENT_TOKENS
+
+def _iter_from(lines: List[_Line], start: int) -> Iterator[_Statement]:
+    for index in range(start, len(lines)):
+        yield from lines[index].stmts
+
+def _apply(env: Dict[str, Any], effects: Tuple[Tuple[str, Any], ...]) -> None:
+    for name, value in effects:
+        if value is _MISSING:
+            env.pop(name, None)
+        else:
+            env[name] = value
+
+def _update(changed: Set[str], names: Tuple[str, ...], env: Dict[str, Any], old_env: Dict[str, Any]) -> None:
+    for name in names:
+        if env.get(name, _MISSING) is old_env.get(name, _MISSING):
+            changed.discard(name)
+        else:
+            changed.add(name)
@@ -0,0 +1,214 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the embedding API for Zed lang.
+
+The main components of this module are:
+
+- Interpreter  : Runs Zed programs and returns their output and errors.
+- RunResult    : The result of running a program.
+- RunCancelled : Raised when a run is cancelled.
+
+The vm and py engines, and rply, are only imported once they are used so
+that reading ENGINES, as ``python -m zed --lex`` does, stays cheap.
+
+For more information regarding a specific class, read the documentation for
+that class.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional, Tuple
+from zed.lexer import get_lexer
+from zed.optimizer import optimize, OPTIMIZATION_LEVELS
+from zed.output import CaptureSink, OutputSink
+from zed.parser import get_parser, CompilationError
+from zed.state import ParserState
+
+import threading
+
+if TYPE_CHECKING:
+    from zed.snapshot import Snapshot
+
+__all__ = (
+    "Interpreter",
+    "RunResult",
+    "RunCancelled",
+    "ENGINES",
+)
+
+
+ENGINES: Tuple[str, ...] = ('tree', 'vm', 'py')
+
+
+class RunResult:
+    """The result of running a Zed program.
+
+    Attributes
+    ----------
+    output: :class:`str`
+        The output printed by the program.
+    error: Optional[:class:`CompilationError`]
+        The error that stopped the program, if any. Syntax errors are
+        reported as a :class:`CompilationError` as well.
+    """
+    __slots__ = ('output', 'error')
+
+    def __init__(self, output: str, error: Optional[CompilationError] = None) -> None:
+        self.output = output
+        self.error = error
+
+    def __repr__(self) -> str:
+        return '<RunResult ok=%r output=%r error=%r>' % (self.ok, self.output, self.error)
+
+    @property
+    def ok(self) -> bool:
+        """:class:`bool`: Whether the program ran without errors."""
+        return self.error is None
+
+
+class Interpreter:
+    """Runs Zed programs in isolation from each other.
+
+    The lexer and parser are shared by all interpreters and warmed up
+    when the interpreter is created, while every run gets its own
+    :class:`ParserState` and output. An interpreter can be used from
+    multiple threads at once.
+
+    Parameters
+    ----------
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    engine: :class:`str`
+        The engine used to execute programs, one of ENGINES.
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude that every run starts from, see
+        compile_snapshot(). Runs do not affect each other's variables.
+    """
+    def __init__(
+        self,
+        lexer: str = 'rply',
+        engine: str = 'tree',
+        optimize: int = 0,
+        parser: str = 'rply',
+        snapshot: Optional[Snapshot] = None,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError('engine must be one of %r' % (ENGINES,))
+        if optimize not in OPTIMIZATION_LEVELS:
+            raise ValueError('optimize must be one of %r' % (OPTIMIZATION_LEVELS,))
+
+        self.lexer_engine = lexer
+        self.engine = engine
+        self.optimize = optimize
+        self.parser_engine = parser
+        self.snapshot = snapshot
+        self._lexer = get_lexer(lexer)
+        self._parser = get_parser(engine=parser)
+
+    def run(
+        self,
+        source: str,
+        output: Optional[OutputSink] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> RunResult:
+        """Runs the given source and returns a :class:`RunResult`.
+
+        If an output sink is given, the output is written to it rather than
+        captured and the output of returned result is empty.
+
+        If a cancelled event is given and another thread sets it, the run
+        stops at the next check and raises :exc:`RunCancelled`. The tree
+        engine checks while lexing and between statements, other engines
+        between phases.
+        """
+        from rply.errors import LexingError, ParsingError
+
+        sink = output or CaptureSink()
+        try:
+            self._execute(source, sink, cancelled)
+        except CompilationError as error:
+            return RunResult(_captured(sink), error)
+        except LexingError as error:
+            return RunResult(_captured(sink), CompilationError(error.getsourcepos(), 'invalid token'))
+        except ParsingError as error:
+            return RunResult(_captured(sink), CompilationError(error.getsourcepos(), 'invalid syntax'))
+
+        return RunResult(_captured(sink))
+
+    def run_file(self, path: str, output: Optional[OutputSink] = None) -> RunResult:
+        """Runs the file at the given path and returns a :class:`RunResult`."""
+        with open(path, 'r') as f:
+            return self.run(f.read(), output)
+
+    def _execute(self, source: str, output: OutputSink, cancelled: Optional[threading.Event]) -> None:
+        if self.engine == 'py':
+            from zed.pycompile import compile_to_code, exec_code
+
+            code = compile_to_code(source, lexer=self.lexer_engine, optimize=self.optimize, parser=self.parser_engine,
+                                   snapshot=self.snapshot)
+            _check(cancelled)
+            exec_code(code, output)
+            return
+
+        state = ParserState(output, self.snapshot)
+        tokens = self._lexer.lex(source)
+        if cancelled is not None:
+            tokens = _checked(tokens, cancelled)
+
+        program = self._parser.parse(tokens, state=state)
+        _check(cancelled)
+
+        if self.optimize:
+            optimize(program, self.optimize)  # type: ignore
+
+        if self.engine == 'vm':
+            from zed import vm
+
+            vm.VirtualMachine().run(vm.compile_program(program), output)  # type: ignore
+        elif cancelled is None:
+            program.eval()  # type: ignore
+        else:
+            for stmt in _checked(state.get_stmts(), cancelled):
+                stmt.eval()
+
+
+class RunCancelled(Exception):
+    """An exception raised when a run is stopped because it was cancelled."""
+
+
+def _captured(output: OutputSink) -> str:
+    return output.getvalue() if isinstance(output, CaptureSink) else ''
+
+def _check(cancelled: Optional[threading.Event]) -> None:
+    if cancelled is not None and cancelled.is_set():
+        raise RunCancelled
+
+def _checked(items: Iterable[Any], cancelled: threading.Event, every: int = 256) -> Iterator[Any]:
+    for i, item in enumerate(items):
+        if not i % every and cancelled.is_set():
+            raise RunCancelled
+        yield item
@@ -22,15 +22,29 @@
 
 """This module specifies lexer and lexical tokens for Zed lang.
 
-Lexer is used for lexical analysis for producing parseable tokens. Lexer
-is powered by rply lexer generator.
+Lexer is used for lexical analysis for producing parseable tokens. Two
+lexer engines are available:
+
+- rply : The default engine, powered by rply lexer generator. At each position
+         the token patterns are tried in turn until one of them matches.
+- fast : The FastLexer engine. All token patterns are compiled into a single
+         regular expression so each token is found in a single scan. Keywords
+         are matched as identifiers and then resolved through a lookup table,
+         so identifiers such as ``printer`` are not split at keyword prefixes.
 
 The main components of this module are:
 
 - get_tokens()  : Returns a mapping of language token to token patterns.
-- get_lexer()   : Returns the rply.Lexer instance used for lexing the code.
+- get_lexer()   : Returns the lexer instance used for lexing the code.
 - reset_lexer() : Resets the cached lexer such that get_lexer() recreates the lexer
                   instead of returning the cached value.
+- FastLexer     : The lexer class used by the fast engine.
+- lex_parallel() : Lexes a large file in parallel using multiple processes.
+- lex_file()     : Lexes a file through a memory map without reading it into memory.
+
+Importing any part of rply imports all of it, including the parser
+generator, so rply is only imported when the rply engine is built or a
+lexing error is raised. The fast engine can lex without importing it.
 
 For more information regarding a specific function, read the documentation for
 that function.
@@ -38,8 +52,14 @@ that function.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, Optional, Tuple, Mapping
-import rply
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Mapping
+from array import array
+from zed.tokens import BufferToken, Source, TokenBuffer
+
+import mmap
+import os
+import re
+import threading
 
 if TYPE_CHECKING:
     from rply.lexer import Lexer
@@ -48,10 +68,25 @@ __all__ = (
     "get_tokens",
     "get_lexer",
     "reset_lexer",
+    "FastLexer",
+    "lex_parallel",
+    "lex_file",
+    "LEXER_ENGINES",
+    "PARALLEL_LEX_THRESHOLD",
 )
 
 
-_lexer: Optional[Lexer] = None
+LEXER_ENGINES: Tuple[str, ...] = ('rply', 'fast')
+
+# Files of at least this size are lexed by lex_parallel() when using --lex with
+# --lexer fast.
+PARALLEL_LEX_THRESHOLD = 1 << 24
+
+_lexers: Dict[str, Any] = {}
+_lexers_lock = threading.Lock()
+
+# The source being lexed by lex_parallel(), inherited by forked workers.
+_parallel_source: Optional[str] = None
 
 
 def get_tokens() -> Mapping[str, str]:
@@ -63,26 +98,48 @@ def get_tokens() -> Mapping[str, str]:
     """
     return TOKENS.copy()
 
-def get_lexer() -> Lexer:
-    """Constructs the rply.Lexer instance for lexical analysis of source code.
+def get_lexer(engine: str = 'rply') -> Lexer:
+    """Constructs the lexer instance for lexical analysis of source code.
+
+    The ``engine`` is one of LEXER_ENGINES. The returned lexer provides
+    a ``lex(source)`` method that returns an iterator of tokens that
+    implement the rply.Token interface.
 
     On repeated calls, this function will return a cached value. For resetting
-    this cached value, use reset_lexer() function.
+    this cached value, use reset_lexer() function. This function is thread
+    safe and so are the returned lexers.
     """
-    global _lexer
-    if _lexer:
-        return _lexer
+    try:
+        return _lexers[engine]
+    except KeyError:
+        pass
 
-    lg = rply.LexerGenerator()
+    with _lexers_lock:
+        try:
+            return _lexers[engine]
+        except KeyError:
+            lexer = _build_lexer(engine)
+            _lexers[engine] = lexer
+            return lexer
 
-    for token, pattern in TOKENS.items():
-        lg.add(token, pattern)
-    for token in IGNORED_TOKENS:
-        lg.ignore(token)
+def _build_lexer(engine: str) -> Lexer:
+    if engine == 'rply':
+        import rply
 
-    _lexer = lg.build()
+        lg = rply.LexerGenerator()
 
-    return _lexer
+        for token, pattern in TOKENS.items():
+            lg.add(token, pattern)
+        for token in IGNORED_TOKENS:
+            lg.ignore(token)
+
+        lexer = lg.build()
+    elif engine == 'fast':
+        lexer = FastLexer(TOKENS, IGNORED_TOKENS)
+    else:
+        raise ValueError('unknown lexer engine %r' % engine)
+
+    return lexer
 
 def reset_lexer() -> None:
     """Resets the lexer cache.
@@ -90,11 +147,226 @@ def reset_lexer() -> None:
     After this function has been called, calling get_lexer() will construct
     a completely new lexer instance rather than returning a cached instance.
     """
-    global _lexer
-    _lexer = None
+    with _lexers_lock:
+        _lexers.clear()
+
+def lex_parallel(path: str, workers: Optional[int] = None) -> TokenBuffer:
+    """Lexes the file at the given path using multiple processes.
+
+    Tokens never span lines, so the source is split into one chunk per
+    worker at line boundaries and the chunks are lexed independently by the
+    fast engine. The token arrays of the chunks are then joined in order into
+    a single :class:`TokenBuffer` over the whole source.
+
+    The file is memory mapped and decoded as UTF-8 without newline
+    translation. Where processes are started by forking, the workers share
+    the decoded source with this process instead of receiving a copy.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        The path of file to lex.
+    workers: Optional[:class:`int`]
+        The number of worker processes. Defaults to the number of CPUs. When
+        1, the file is lexed in this process.
+    """
+    lexer: FastLexer = get_lexer('fast')
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return lexer.tokenize('')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            source = str(memoryview(mm), 'utf-8')
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return lexer.tokenize(source)
+
+    buffer = TokenBuffer(source, lexer.type_names)
+    bounds = _split_lines(source, workers)
+    import multiprocessing
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    with context.Pool(workers, _init_parallel, (source,)) as pool:
+        chunks = pool.starmap(_lex_range, [
+            (start, end, buffer.starts.typecode) for start, end in zip(bounds, bounds[1:])
+        ])
+
+    for types, starts, ends, error in chunks:
+        if error is not None:
+            from rply.errors import LexingError
+            raise LexingError(None, buffer.getsourcepos_at(error))
+        buffer.types.frombytes(types)
+        buffer.starts.frombytes(starts)
+        buffer.ends.frombytes(ends)
+
+    return buffer
+
+def lex_file(path: str) -> TokenBuffer:
+    """Lexes the file at the given path using the fast engine.
+
+    The file is memory mapped and lexed as UTF-8 bytes, so it is neither
+    read into memory nor decoded up front. The returned :class:`TokenBuffer`
+    references the mapping, and the text of a token is only decoded when
+    requested. The mapping is closed once the buffer, and any string
+    literals parsed from it, are no longer referenced.
+    """
+    lexer: FastLexer = get_lexer('fast')
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return lexer.tokenize(b'')
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return lexer.tokenize(data)
+
+def _split_lines(source: str, parts: int) -> List[int]:
+    # Returns the offsets splitting source into roughly equal parts, each
+    # ending just after a newline (or at the end of source).
+    bounds = [0]
+    size = len(source)
+    for i in range(1, parts):
+        end = source.find('\n', max(size * i // parts, bounds[-1])) + 1
+        if not end:
+            break
+        bounds.append(end)
+    bounds.append(size)
+    return bounds
+
+def _init_parallel(source: str) -> None:
+    global _parallel_source
+    _parallel_source = source
+
+def _lex_range(start: int, end: int, offset_code: str) -> Tuple[bytes, bytes, bytes, Optional[int]]:
+    types, starts, ends = array('B'), array(offset_code), array(offset_code)
+    error = get_lexer('fast')._scan(_parallel_source, types, starts, ends, start, end)
+    return types.tobytes(), starts.tobytes(), ends.tobytes(), error
+
+class FastLexer:
+    """A lexer that scans each token using a single combined regular expression.
+
+    Token patterns are joined into one alternation of named groups, in the
+    order of the given mapping, with the ignored patterns taking priority.
+    Tokens whose pattern is a plain identifier (i.e. keywords) are left out
+    of the alternation; they are matched as ``IDENT`` and then resolved
+    through a dictionary lookup.
+
+    The lexed tokens are stored in a compact :class:`TokenBuffer` rather
+    than as individual rply.Token objects.
+
+    Parameters
+    ----------
+    tokens: Mapping[:class:`str`, :class:`str`]
+        The mapping of token types to patterns.
+    ignored: Tuple[:class:`str`, ...]
+        The patterns of text that is skipped between tokens.
+
+    Attributes
+    ----------
+    type_names: Tuple[:class:`str`, ...]
+        The token type names, indexed by the token type ids used in
+        the token buffers.
+    """
+    def __init__(self, tokens: Mapping[str, str], ignored: Tuple[str, ...]) -> None:
+        ident = re.compile(tokens['IDENT'])
+
+        self.type_names: Tuple[str, ...] = tuple(tokens)
+        self.keywords: Dict[str, int] = {}
+
+        groups = ['(?P<_IGNORED%d>%s)' % (i, pattern) for i, pattern in enumerate(ignored)]
+        for token, pattern in tokens.items():
+            if token != 'IDENT' and ident.fullmatch(pattern):
+                self.keywords[pattern] = self.type_names.index(token)
+            else:
+                groups.append('(?P<%s>%s)' % (token, pattern))
+
+        # Catch-all group so that finditer() never skips over unmatched text.
+        groups.append(r'(?P<_MISMATCH>.|\n)')
+        self.regex = re.compile('|'.join(groups))
+
+        # Bytes-like sources are scanned without decoding them. The token
+        # patterns only match ASCII outside of string literals, so a
+        # multi-byte UTF-8 character is either matched by ``.`` inside a
+        # string literal or not at all, as when scanning text.
+        self._bytes_regex = re.compile('|'.join(groups).encode())
+        self._bytes_keywords = {word.encode(): tp for word, tp in self.keywords.items()}
+
+        # Maps the index of each top level group to the token type id
+        # matched by it. Ignored patterns are mapped to -1 and the catch-all
+        # group to -2.
+        self._group_types = [-1] * (self.regex.groups + 1)
+        for name, group in self.regex.groupindex.items():
+            if name == '_MISMATCH':
+                self._group_types[group] = -2
+            elif not name.startswith('_'):
+                self._group_types[group] = self.type_names.index(name)
+
+    def tokenize(self, source: Source, offset: int = 0, lineno: int = 1) -> TokenBuffer:
+        """Lexes the given source into a :class:`TokenBuffer`.
+
+        The source may be a bytes-like object holding UTF-8 text, such as a
+        memory mapped file, in which case it is lexed without being decoded.
+
+        When the source is a part of a larger source, ``offset`` and ``lineno``
+        give its position in the larger source. See :class:`TokenBuffer`.
+        """
+        buffer = TokenBuffer(source, self.type_names, offset, lineno)
+        error = self._scan(source, buffer.types, buffer.starts, buffer.ends)
+        if error is not None:
+            from rply.errors import LexingError
+            raise LexingError(None, buffer.getsourcepos_at(error))
+        return buffer
+
+    def _scan(
+        self,
+        source: Source,
+        types: array,
+        starts: array,
+        ends: array,
+        pos: int = 0,
+        endpos: Optional[int] = None,
+    ) -> Optional[int]:
+        # Appends the tokens of source[pos:endpos] to the arrays. The offsets
+        # are relative to the whole source. Returns the offset of unmatched
+        # text, if any.
+        add_type = types.append
+        add_start = starts.append
+        add_end = ends.append
+
+        if isinstance(source, str):
+            regex, keywords = self.regex, self.keywords
+        else:
+            regex, keywords = self._bytes_regex, self._bytes_keywords
+
+        group_types = self._group_types
+        ident = self.type_names.index('IDENT')
+
+        for match in regex.finditer(source, pos, len(source) if endpos is None else endpos):
+            tp = group_types[match.lastindex]  # type: ignore
+            if tp < 0:
+                if tp == -2:
+                    return match.start()
+                continue
+
+            start, end = match.span()
+            if tp == ident:
+                tp = keywords.get(source[start:end], tp)
+
+            add_type(tp)
+            add_start(start)
+            add_end(end)
+
+        return None
+
+    def lex(self, source: str) -> Iterator[BufferToken]:
+        """Returns an iterator of tokens lexed from the given source."""
+        return iter(self.tokenize(source))
 
 
-IGNORED_TOKENS: Tuple[str, ...] = (r'\s+',)
+# The patterns only match ASCII outside of string literals, spelling out the
+# classes that would match Unicode in text but not in bytes, so that all
+# engines, and text and bytes sources, lex the same tokens.
+IGNORED_TOKENS: Tuple[str, ...] = (r'[ \t\n\r\f\v]+',)
 TOKENS: Dict[str, str] = {
     # Literals
     'LT_STRING': r'(".+")|(\'.+\')|(\'\')|("")',
@@ -109,5 +381,5 @@ TOKENS: Dict[str, str] = {
     'OP_ASSIGN': r'=',
 
     # Identifier
-    'IDENT': r'[a-zA-Z_][a-zA-Z\d_]*',
+    'IDENT': r'[a-zA-Z_][a-zA-Z0-9_]*',
 }
@@ -0,0 +1,251 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the memory accounting of ``python -m zed --memstats``.
+
+profile_memory() runs a program one phase at a time under tracemalloc and
+records the peak and retained memory of each phase. Once the program is
+parsed, the memory retained by the tokens, by each type of AST node and by
+the parser state is broken down as well. The program is run with the tree
+engine, which evaluates the AST itself.
+
+The main components of this module are:
+
+- profile_memory() : Runs a program and collects the memory statistics of each phase.
+- MemoryStats      : The memory statistics of a run.
+- PhaseMemory      : The memory statistics of a single phase.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Set
+from contextlib import contextmanager
+from zed.lexer import FastLexer, get_lexer
+from zed.optimizer import optimize as optimize_program
+from zed.output import NullSink, OutputSink
+from zed.parser import get_parser
+from zed.state import ParserState
+from zed.tokens import TokenBuffer
+from zed.ast.base import BaseToken
+from zed import ast
+
+import json
+import sys
+import tracemalloc
+
+__all__ = (
+    "profile_memory",
+    "MemoryStats",
+    "PhaseMemory",
+)
+
+
+class PhaseMemory:
+    """The memory statistics of a single phase of a run.
+
+    Attributes
+    ----------
+    name: :class:`str`
+        The name of phase.
+    peak: :class:`int`
+        The highest number of bytes allocated during the phase, relative to
+        the start of phase.
+    retained: :class:`int`
+        The number of bytes still allocated at the end of phase, relative to
+        the start of phase. This is negative when the phase released memory.
+    """
+    __slots__ = ('name', 'peak', 'retained')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.peak = 0
+        self.retained = 0
+
+    def __repr__(self) -> str:
+        return '<PhaseMemory name=%r peak=%r retained=%r>' % (self.name, self.peak, self.retained)
+
+
+class MemoryStats:
+    """The memory statistics of a run.
+
+    Attributes
+    ----------
+    phases: List[:class:`PhaseMemory`]
+        The phases in the order they ran.
+    breakdown: Dict[:class:`str`, Dict[:class:`str`, :class:`int`]]
+        The ``count`` and ``bytes`` of the objects retained after parsing,
+        keyed by ``'tokens'``, the name of AST node type or the name of
+        parser state attribute.
+    """
+    def __init__(self) -> None:
+        self.phases: List[PhaseMemory] = []
+        self.breakdown: Dict[str, Dict[str, int]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseMemory]:
+        """A context manager measuring the memory of a phase with the given name.
+
+        tracemalloc must be tracing. The phase is recorded even when the body
+        raises an exception.
+        """
+        phase = PhaseMemory(name)
+        self.phases.append(phase)
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            yield phase
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            phase.peak = peak - start
+            phase.retained = current - start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the statistics as a JSON serializable dictionary."""
+        return {
+            'phases': [dict(name=phase.name, peak=phase.peak, retained=phase.retained) for phase in self.phases],
+            'breakdown': self.breakdown,
+        }
+
+    def to_json(self) -> str:
+        """Returns the statistics as JSON."""
+        return json.dumps(self.to_dict())
+
+    def format(self) -> str:
+        """Returns the statistics as human readable tables."""
+        lines = ['%-32s %12s %12s' % ('phase', 'peak KiB', 'retained KiB')]
+        for phase in self.phases:
+            lines.append('%-32s %12.1f %12.1f' % (phase.name, phase.peak / 1024, phase.retained / 1024))
+
+        if self.breakdown:
+            lines.append('')
+            lines.append('%-32s %12s %12s' % ('retained after parse', 'count', 'KiB'))
+            for name, entry in self.breakdown.items():
+                lines.append('%-32s %12d %12.1f' % (name, entry['count'], entry['bytes'] / 1024))
+        return '\n'.join(lines)
+
+
+def profile_memory(
+    source: str,
+    stats: Optional[MemoryStats] = None,
+    output: Optional[OutputSink] = None,
+    lexer: str = 'rply',
+    optimize: int = 0,
+    parser: str = 'rply',
+) -> MemoryStats:
+    """Runs the given source and returns the memory statistics of each phase.
+
+    tracemalloc is started for the run if it is not tracing already. The
+    tokens are collected before parsing so that their memory is accounted
+    apart from the AST. If the run fails, the exception is propagated and
+    the statistics of the phases that ran are left in the given ``stats``.
+
+    Parameters
+    ----------
+    source: :class:`str`
+        The source of program.
+    stats: Optional[:class:`MemoryStats`]
+        The statistics to add the phases to.
+    output: Optional[:class:`OutputSink`]
+        The sink that receives the output of program. Defaults to a
+        :class:`NullSink` so that output is not accounted.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    """
+    stats = stats or MemoryStats()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    try:
+        with stats.phase('get_lexer'):
+            lex = get_lexer(lexer)
+        with stats.phase('get_parser'):
+            instance = get_parser(engine=parser)
+
+        with stats.phase('lex'):
+            tokens: Any = lex.tokenize(source) if isinstance(lex, FastLexer) else list(lex.lex(source))
+
+        state = ParserState(output or NullSink())
+        with stats.phase('parse'):
+            program = instance.parse(iter(tokens), state=state)
+        if optimize:
+            with stats.phase('optimize'):
+                optimize_program(program, optimize)
+
+        stats.breakdown = _breakdown(tokens, program, state)
+
+        with stats.phase('release tokens'):
+            del tokens
+        with stats.phase('eval'):
+            program.eval()  # type: ignore
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    return stats
+
+
+def _breakdown(tokens: Any, program: Any, state: ParserState) -> Dict[str, Dict[str, int]]:
+    # The shallow size of objects is counted along with the strings they own,
+    # but not the source shared by every token and lazy string literal.
+    breakdown: Dict[str, Dict[str, int]] = {}
+    seen: Set[int] = set()
+
+    def add(name: str, size: int, count: int = 1) -> None:
+        entry = breakdown.setdefault(name, {'count': 0, 'bytes': 0})
+        entry['count'] += count
+        entry['bytes'] += size
+
+    if isinstance(tokens, TokenBuffer):
+        arrays = (tokens.types, tokens.starts, tokens.ends)
+        add('tokens', sys.getsizeof(tokens) + sum(map(sys.getsizeof, arrays)), len(tokens.types))
+    else:
+        size = sys.getsizeof(tokens)
+        for token in tokens:
+            pos = token.source_pos
+            size += sys.getsizeof(token) + sys.getsizeof(token.__dict__) + sys.getsizeof(token.value)
+            size += sys.getsizeof(pos) + sys.getsizeof(pos.__dict__)
+        add('tokens', size, len(tokens))
+
+    def add_node(node: Any, extra: int = 0) -> None:
+        if isinstance(node, BaseToken) and id(node) not in seen:
+            seen.add(id(node))
+            if isinstance(node, ast.String) and node._value is not None:
+                extra += sys.getsizeof(node._value)
+            add(type(node).__name__, sys.getsizeof(node) + extra)
+
+    add_node(program, sys.getsizeof(program.tokens))
+    for token in program.tokens:
+        add_node(token)
+    for stmt in state.get_stmts():
+        add_node(stmt)
+        add_node(getattr(stmt, 'value', None))
+    for value in state._definitions.values():
+        add_node(value)
+
+    add('ParserState._definitions', sys.getsizeof(state._definitions), len(state._definitions))
+    add('ParserState._current_stmts_list', sys.getsizeof(state._current_stmts_list), len(state._current_stmts_list))
+    return breakdown
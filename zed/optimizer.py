@@ -0,0 +1,147 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the optimization pass for Zed lang.
+
+The parser resolves every identifier to the value it is bound to, so the
+value a print statement prints is known after parsing. The optimizer works
+on this already folded program:
+
+- Level 0 : No optimization.
+- Level 1 : Print statements are folded to their constant values, so let and
+            del statements have no observable effect and are removed.
+- Level 2 : In addition, equal constants are interned into a constant pool so
+            that statements printing equal values share a single node.
+
+Interning needs the value of every string literal, so at level 2 literals
+that are lazily sliced from the source (see lex_file()) are materialized.
+
+The main components of this module are:
+
+- optimize()          : Optimizes a parsed program in place.
+- OptimizationStats   : The statistics of an optimization pass.
+- OPTIMIZATION_LEVELS : The supported optimization levels.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+from zed import ast
+
+if TYPE_CHECKING:
+    from zed.ast.base import BaseToken
+
+__all__ = (
+    "optimize",
+    "OptimizationStats",
+    "OPTIMIZATION_LEVELS",
+)
+
+
+OPTIMIZATION_LEVELS: Tuple[int, ...] = (0, 1, 2)
+
+
+class OptimizationStats:
+    """The statistics of an optimization pass.
+
+    Attributes
+    ----------
+    statements: :class:`int`
+        The number of statements before optimizing.
+    removed: :class:`int`
+        The number of let and del statements removed.
+    interned: :class:`int`
+        The number of constants replaced with an equal constant from the pool.
+    constants: :class:`int`
+        The number of distinct constants in the pool.
+    """
+    __slots__ = ('statements', 'removed', 'interned', 'constants')
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.removed = 0
+        self.interned = 0
+        self.constants = 0
+
+    def __repr__(self) -> str:
+        return '<OptimizationStats statements=%r removed=%r interned=%r constants=%r>' % (
+            self.statements, self.removed, self.interned, self.constants)
+
+
+def optimize(program: ast.Program, level: int = 1) -> OptimizationStats:
+    """Optimizes the given parsed program in place.
+
+    The optimized program produces the same output as the original program
+    with every engine. Returns the :class:`OptimizationStats` of the pass.
+
+    Parameters
+    ----------
+    program: :class:`ast.Program`
+        The program returned by the parser.
+    level: :class:`int`
+        The optimization level, one of OPTIMIZATION_LEVELS.
+    """
+    if level not in OPTIMIZATION_LEVELS:
+        raise ValueError('level must be one of %r' % (OPTIMIZATION_LEVELS,))
+
+    stats = OptimizationStats()
+    for stmts in _statement_lists(program):
+        stats.statements += len(stmts)
+        if level >= 1:
+            _remove_definitions(stmts, stats)
+
+    if level >= 2:
+        pool: Dict[Tuple[Any, ...], BaseToken] = {}
+        for stmts in _statement_lists(program):
+            _intern_constants(stmts, pool, stats)
+        stats.constants = len(pool)
+
+    return stats
+
+
+def _statement_lists(program: ast.Program) -> List[List[BaseToken]]:
+    return [token.state.get_stmts() for token in program.tokens if isinstance(token, ast.Statements)]
+
+def _remove_definitions(stmts: List[BaseToken], stats: OptimizationStats) -> None:
+    # Identifiers were replaced by their values while parsing and let/del
+    # only affect that, so they do nothing at runtime.
+    kept = [stmt for stmt in stmts if not isinstance(stmt, (ast.Let, ast.Del))]
+    stats.removed += len(stmts) - len(kept)
+    stmts[:] = kept
+
+def _intern_constants(stmts: List[BaseToken], pool: Dict[Tuple[Any, ...], BaseToken], stats: OptimizationStats) -> None:
+    for stmt in stmts:
+        if not isinstance(stmt, ast.Print):
+            continue
+
+        value = stmt.value
+        if isinstance(value, ast.String):
+            key: Tuple[Any, ...] = ('String', value.value)
+        elif isinstance(value, ast.Undefined):
+            key = ('Undefined',)
+        else:
+            continue
+
+        shared = pool.setdefault(key, value)
+        if shared is not value:
+            stmt.value = shared
+            stats.interned += 1
@@ -0,0 +1,184 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the output sinks for Zed lang.
+
+An output sink receives the output of print statements. Every parser state
+has an output sink, which defaults to a :class:`StreamSink` writing to the
+standard output.
+
+The main components of this module are:
+
+- OutputSink   : The base class of output sinks.
+- StreamSink   : Writes the output to a stream as soon as it is printed.
+- BufferedSink : Buffers the output and writes it to a stream in large blocks.
+- CaptureSink  : Captures the output in memory.
+- NullSink     : Discards the output.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, TextIO
+
+import io
+import sys
+
+__all__ = (
+    "OutputSink",
+    "StreamSink",
+    "BufferedSink",
+    "CaptureSink",
+    "NullSink",
+)
+
+
+class OutputSink:
+    """The base class for output sinks.
+
+    Subclasses must implement write() and may implement flush().
+    """
+    def write(self, text: str) -> None:
+        """Writes the given text to the output."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Flushes any buffered output."""
+        pass
+
+    def print(self, value: Any) -> None:
+        """Writes the given value followed by a newline, like the builtin print()."""
+        self.write(str(value) + '\n')
+
+
+class StreamSink(OutputSink):
+    """An output sink that writes the output to a stream.
+
+    Parameters
+    ----------
+    stream: Optional[TextIO]
+        The stream to write to. If not given, the output is written to
+        whatever ``sys.stdout`` is at the time of writing.
+    """
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream
+
+    def write(self, text: str) -> None:
+        (self.stream or sys.stdout).write(text)
+
+    def flush(self) -> None:
+        (self.stream or sys.stdout).flush()
+
+
+class BufferedSink(OutputSink):
+    """An output sink that writes the output to a stream in large blocks.
+
+    When the stream is backed by a file descriptor, such as the standard
+    output, the output is written to the descriptor through a buffer of
+    the given size, bypassing the (usually much smaller) buffer of the
+    stream. Otherwise the output is collected and written to the stream
+    whenever the buffer fills up.
+
+    The buffered output must be flushed using flush() before the stream
+    is used directly.
+
+    Parameters
+    ----------
+    stream: Optional[TextIO]
+        The stream to write to. Defaults to ``sys.stdout``.
+    buffer_size: :class:`int`
+        The size of buffer.
+    flush_policy: :class:`str`
+        When the buffer is written out. One of:
+
+        - ``'full'``: When the buffer is full or flush() is called.
+        - ``'line'``: After every line. This effectively disables buffering.
+    """
+    FLUSH_POLICIES = ('full', 'line')
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        buffer_size: int = 1 << 18,
+        flush_policy: str = 'full',
+    ) -> None:
+        if flush_policy not in self.FLUSH_POLICIES:
+            raise ValueError('flush_policy must be one of %r' % (self.FLUSH_POLICIES,))
+
+        self.stream = stream or sys.stdout
+        self.buffer_size = buffer_size
+        self.flush_policy = flush_policy
+        self._file: Optional[TextIO] = None
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+        try:
+            fd = self.stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            return
+
+        # Anything already written to the stream must come first.
+        self.stream.flush()
+        self._file = io.TextIOWrapper(
+            io.BufferedWriter(io.FileIO(fd, 'w', closefd=False), buffer_size),
+            encoding=getattr(self.stream, 'encoding', None),
+            errors=getattr(self.stream, 'errors', None),
+            line_buffering=flush_policy == 'line',
+        )
+        self.write = self._file.write  # type: ignore
+
+    def write(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+
+        if self.flush_policy == 'line' or self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            return
+
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        self.stream.flush()
+
+
+class CaptureSink(OutputSink):
+    """An output sink that captures the output in memory."""
+    def __init__(self) -> None:
+        self._io = io.StringIO()
+        self.write = self._io.write  # type: ignore
+
+    def getvalue(self) -> str:
+        """Returns the captured output."""
+        return self._io.getvalue()
+
+
+class NullSink(OutputSink):
+    """An output sink that discards the output."""
+    def write(self, text: str) -> None:
+        pass
+
+    def print(self, value: Any) -> None:
+        pass
@@ -24,11 +24,20 @@
 
 The main components of this module are:
 
-- get_parser()   : Returns the rply.LRParser instance used for parsing the lexed code.
+- get_parser()   : Returns the parser used for parsing the lexed code.
 - reset_parser() : Resets the cached parser such that get_parser() recreates the parser
                    instead of returning the cached value.
+- grammar_fingerprint() : Returns a hash identifying the grammar and lexical tokens.
+- warm_parser_cache()   : Builds the on-disk parse table cache ahead of time.
+- parser_cache_hit()    : Returns whether the parse tables were loaded from the cache.
+- FastParser       : The recursive descent parser used by the fast engine.
+- PARSER_ENGINES   : The names of supported parser engines.
 - CompilationError : An exception raised when compilation fails.
 
+The productions are only registered with rply, and rply itself is only
+imported, when the parser is first needed so that importing this module is
+cheap.
+
 
 For more information regarding a specific function, read the documentation for
 that function.
@@ -36,52 +45,218 @@ that function.
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Optional, Mapping
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Mapping, Tuple, Union
 from zed.sentinels import UNDEFINED
+from zed.tokens import BufferToken
 from zed import lexer, ast
 
-import rply
+import hashlib
+import json
+import os
+import threading
 
 if TYPE_CHECKING:
+    from rply import ParserGenerator, Token
+    from rply.grammar import Grammar
     from rply.parser import LRParser
+    from rply.parsergenerator import LRTable
     from rply.token import SourcePosition
     from zed.state import ParserState
 
-    Tokens = List[rply.Token]
+    Tokens = List[Token]
+    Parser = Union[LRParser, 'FastParser']
 
 
 __all__ = (
     "get_parser",
     "reset_parser",
+    "parser_cache_hit",
+    "grammar_fingerprint",
+    "warm_parser_cache",
+    "FastParser",
+    "PARSER_ENGINES",
     "CompilationError",
 )
 
 
+PARSER_ENGINES: Tuple[str, ...] = ('rply', 'fast')
+
+
 _parser: Optional[LRParser] = None
-_pg: rply.ParserGenerator = rply.ParserGenerator(list(lexer.get_tokens()))
+_parser_lock = threading.Lock()
+_generator_lock = threading.Lock()
+_parser_cache_hit: Optional[bool] = None
+_pg: Optional[ParserGenerator] = None
+_productions: List[Tuple[str, Callable[..., Any]]] = []
 
 
-def get_parser() -> LRParser:
-    """Constructs the rply.LRParser instance for parsing the lexed code.
+def get_parser(use_cache: bool = True, engine: str = 'rply') -> Parser:
+    """Constructs the parser instance for parsing the lexed code.
+
+    The ``engine`` is one of PARSER_ENGINES. The ``rply`` engine is an
+    rply.LRParser built from the grammar of this module and the ``fast``
+    engine is a :class:`FastParser` that produces the same AST and errors.
+    Both provide a ``parse(tokens, state=state)`` method.
 
     On repeated calls, this function will return a cached value. For resetting
     this cached value, use reset_parser() function.
+
+    Building the parse tables is the most expensive part of constructing the
+    parser so they are stored on disk (see get_cache_dir()) keyed by the
+    grammar_fingerprint(). When ``use_cache`` is False, the tables are always
+    built from scratch and the disk cache is neither read nor written.
+
+    This function is thread safe and the returned parser can be used from
+    multiple threads at once, as long as each parse is given its own state.
     """
-    global _parser
+    if engine == 'fast':
+        return _fast_parser
+    if engine != 'rply':
+        raise ValueError('unknown parser engine %r' % engine)
     if _parser:
         return _parser
 
-    _parser = _pg.build()
+    with _parser_lock:
+        if _parser:
+            return _parser
+        return _build_parser(use_cache)
+
+def _build_parser(use_cache: bool) -> LRParser:
+    global _parser, _parser_cache_hit
+    from rply.parser import LRParser
+    from rply.parsergenerator import LRTable
+
+    grammar = _build_grammar()
+    table = None
+
+    if use_cache:
+        table = _load_table(grammar)
+    _parser_cache_hit = table is not None
+    if table is None:
+        grammar = _build_grammar(analyze=True)
+        table = LRTable.from_grammar(grammar)
+        if use_cache:
+            _save_table(table)
+
+    _parser = LRParser(table, _get_generator().error_handler)
     return _parser
 
+def _get_generator() -> ParserGenerator:
+    # Registers the productions declared with _production() on first use.
+    global _pg
+    if _pg is not None:
+        return _pg
+
+    with _generator_lock:
+        if _pg is None:
+            import rply
+
+            pg = rply.ParserGenerator(list(lexer.get_tokens()))
+            for rule, func in _productions:
+                pg.production(rule)(func)
+            _pg = pg
+    return _pg
+
+def _production(rule: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # Declares a production, in the same order as rply.ParserGenerator.production().
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        _productions.append((rule, func))
+        return func
+    return decorator
+
 def reset_parser() -> None:
     """Resets the parser cache.
 
     After this function has been called, calling get_parser() will construct
     a completely new parser instance rather than returning a cached instance.
     """
-    global _parser
-    _parser = None
+    global _parser, _parser_cache_hit
+    with _parser_lock:
+        _parser = None
+        _parser_cache_hit = None
+
+def parser_cache_hit() -> Optional[bool]:
+    """Returns whether the parse tables were loaded from the disk cache.
+
+    This refers to the parser returned by get_parser() and is None if the
+    parser has not been constructed yet.
+    """
+    return _parser_cache_hit
+
+def grammar_fingerprint() -> str:
+    """Returns a hash that identifies the grammar.
+
+    The hash covers the production rules as well as the lexical tokens
+    and changes whenever either of them is modified.
+    """
+    pg = _get_generator()
+    hasher = hashlib.sha1()
+    hasher.update(str(pg.VERSION).encode())
+    for name, syms, _, precedence in pg.productions:
+        hasher.update(json.dumps([name, syms, precedence]).encode())
+    hasher.update(json.dumps(list(lexer.TOKENS.items())).encode())
+    hasher.update(json.dumps(lexer.IGNORED_TOKENS).encode())
+    return hasher.hexdigest()
+
+def warm_parser_cache() -> str:
+    """Builds the on-disk parse table cache if it is missing.
+
+    Returns the path of the cache file.
+    """
+    from rply.parsergenerator import LRTable
+
+    path = _get_table_path()
+    if _load_table(_build_grammar()) is None:
+        _save_table(LRTable.from_grammar(_build_grammar(analyze=True)))
+    return path
+
+def _get_table_path() -> str:
+    from zed.cache import get_cache_dir
+    return os.path.join(get_cache_dir(), 'parser-%s.json' % grammar_fingerprint())
+
+def _build_grammar(analyze: bool = False) -> Grammar:
+    # This mirrors rply.ParserGenerator.build(). Loading the parse tables
+    # from cache only requires the productions, the LR analysis is only
+    # needed when the tables are computed.
+    from rply.grammar import Grammar
+
+    pg = _get_generator()
+    grammar = Grammar(pg.tokens)
+    for level, (assoc, terms) in enumerate(pg.precedence, 1):
+        for term in terms:
+            grammar.set_precedence(term, assoc, level)
+    for name, syms, func, precedence in pg.productions:
+        grammar.add_production(name, syms, func, precedence)
+    grammar.set_start()
+
+    if analyze:
+        grammar.build_lritems()
+        grammar.compute_first()
+        grammar.compute_follow()
+
+    return grammar
+
+def _load_table(grammar: Grammar) -> Optional[LRTable]:
+    from rply.parsergenerator import LRTable
+    from zed.cache import read_cache
+
+    data = read_cache(_get_table_path())
+    if data is None:
+        return None
+
+    try:
+        table: Dict[str, Any] = json.loads(data)
+        if not _get_generator().data_is_valid(grammar, table):
+            return None
+        return LRTable.from_cache(grammar, table)
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def _save_table(table: LRTable) -> None:
+    from zed.cache import write_cache
+
+    data = json.dumps(_get_generator().serialize_table(table)).encode()
+    write_cache(_get_table_path(), data)
 
 
 class CompilationError(Exception):
@@ -99,12 +274,81 @@ class CompilationError(Exception):
         super().__init__(error)
 
 
-@_pg.production('prog : stmt_list')
+class FastParser:
+    """A recursive descent parser for the grammar of this module.
+
+    This parser builds the same AST as the rply parser and raises the same
+    errors at the same positions, including the order in which tokens are
+    read from the lexer, but it creates the nodes directly from the tokens
+    rather than going through the parse tables and the production functions.
+
+    Use get_parser(engine='fast') to get an instance.
+    """
+    __slots__ = ()
+
+    def parse(self, tokenizer: Iterator[Any], state: ParserState) -> ast.Program:
+        """Parses the given tokens and returns the :class:`ast.Program`."""
+        add_stmt = state.add_stmt
+        token = next(tokenizer, None)
+        if token is None:
+            raise _syntax_error(None)
+
+        # Statements ending in an expression are complete without reading
+        # ahead, so the next token is only read once they are added.
+        while token is not None:
+            tokentp = token.gettokentype()
+
+            if tokentp == 'STMT_PRINT':
+                add_stmt(ast.Print(state, value=_parse_expr(state, next(tokenizer, None))))
+                token = next(tokenizer, None)
+            elif tokentp == 'STMT_LET':
+                ident = _expect_ident(next(tokenizer, None)).getstr()
+                token = next(tokenizer, None)
+                tokentp = token and token.gettokentype()
+                if tokentp == 'OP_ASSIGN':
+                    add_stmt(_make_let(state, ident, _parse_expr(state, next(tokenizer, None))))
+                    token = next(tokenizer, None)
+                elif token is None or tokentp in _STMT_TOKENS:
+                    add_stmt(_make_let(state, ident, UNDEFINED))
+                else:
+                    raise _syntax_error(token)
+            elif tokentp == 'STMT_DEL':
+                add_stmt(_make_del(state, _expect_ident(next(tokenizer, None))))
+                token = next(tokenizer, None)
+            else:
+                raise _syntax_error(token)
+
+        return ast.Program(state, tokens=[ast.Statements(state)])
+
+
+_EXPR_TOKENS = ('IDENT', 'LT_STRING', 'LT_UNDEFINED')
+_STMT_TOKENS = ('STMT_PRINT', 'STMT_LET', 'STMT_DEL')
+_fast_parser = FastParser()
+
+
+def _parse_expr(state: ParserState, token: Any) -> Any:
+    tokentp = token and token.gettokentype()
+    if tokentp not in _EXPR_TOKENS:
+        raise _syntax_error(token)
+    return _make_expr(state, token, tokentp)
+
+def _expect_ident(token: Any) -> Any:
+    if token is None or token.gettokentype() != 'IDENT':
+        raise _syntax_error(token)
+    return token
+
+def _syntax_error(token: Any) -> Exception:
+    # The rply parser reports the end of input without a position.
+    from rply.errors import ParsingError
+    return ParsingError(None, None if token is None else token.getsourcepos())
+
+
+@_production('prog : stmt_list')
 def prod_prog(state: ParserState, tokens: Tokens):
     return ast.Program(state, tokens=tokens)
 
-@_pg.production('stmt_list : stmt')
-@_pg.production('stmt_list : stmt_list stmt')
+@_production('stmt_list : stmt')
+@_production('stmt_list : stmt_list stmt')
 def prod_stmt(state: ParserState, tokens: Tokens):
     if len(tokens) == 1:
         stmt = tokens[0]
@@ -114,16 +358,40 @@ def prod_stmt(state: ParserState, tokens: Tokens):
     state.add_stmt(stmt)  # type: ignore
     return ast.Statements(state)
 
-@_pg.production('expr : IDENT')
-@_pg.production('expr : LT_STRING')
-@_pg.production('expr : LT_UNDEFINED')
+@_production('expr : IDENT')
+@_production('expr : LT_STRING')
+@_production('expr : LT_UNDEFINED')
 def prod_expr_string(state: ParserState, tokens: Tokens):
-    token = tokens[0]
-    tokentp = token.gettokentype()
+    return _make_expr(state, tokens[0])
+
+@_production('stmt : STMT_PRINT expr')
+def prod_stmt_print(state: ParserState, tokens: Tokens):
+    return ast.Print(state, value=tokens[1])
+
+@_production('stmt : STMT_LET IDENT OP_ASSIGN expr')
+@_production('stmt : STMT_LET IDENT')
+def prod_stmt_let(state: ParserState, tokens: Tokens):
+    return _make_let(state, tokens[1].getstr(), UNDEFINED if len(tokens) == 2 else tokens[3])
+
+@_production('stmt : STMT_DEL IDENT')
+def prod_stmt_del(state: ParserState, tokens: Tokens):
+    return _make_del(state, tokens[1])
+
+
+# The actions shared by the productions above and the FastParser.
+
+def _make_expr(state: ParserState, token: Any, tokentp: Optional[str] = None) -> Any:
+    tokentp = tokentp or token.gettokentype()
 
     if tokentp == 'LT_UNDEFINED':
         return ast.Undefined(state)
     if tokentp == 'LT_STRING':
+        if isinstance(token, BufferToken):
+            # The value is sliced from the source when needed, without
+            # the quotes.
+            buffer, index = token.buffer, token.index
+            return ast.String(state, source=buffer.source, start=buffer.starts[index] + 1, end=buffer.ends[index] - 1)
+
         # [1:-1] is needed to dequote the string
         return ast.String(state, value=token.getstr()[1:-1])
     if tokentp == 'IDENT':
@@ -137,28 +405,15 @@ def prod_expr_string(state: ParserState, tokens: Tokens):
 
     raise AssertionError('Unknown token type for expr')
 
-@_pg.production('stmt : STMT_PRINT expr')
-def prod_stmt_print(state: ParserState, tokens: Tokens):
-    return ast.Print(state, value=tokens[1])
-
-@_pg.production('stmt : STMT_LET IDENT OP_ASSIGN expr')
-@_pg.production('stmt : STMT_LET IDENT')
-def prod_stmt_let(state: ParserState, tokens: Tokens):
-    ident = tokens[1].getstr()
-    if len(tokens) == 2:
-        value = UNDEFINED
-    else:
-        value = tokens[3]
-
+def _make_let(state: ParserState, ident: str, value: Any) -> ast.Let:
     state.add_defn(ident, value)  # type: ignore
     return ast.Let(state, ident=ident, value=value)
 
-@_pg.production('stmt : STMT_DEL IDENT')
-def prod_stmt_del(state: ParserState, tokens: Tokens):
-    ident = tokens[1].getstr()
+def _make_del(state: ParserState, token: Any) -> ast.Del:
+    ident = token.getstr()
     try:
         state.del_defn(ident)
     except KeyError:
-        raise CompilationError(tokens[1].getsourcepos(), message='identifier %r not defined' % ident)
+        raise CompilationError(token.getsourcepos(), message='identifier %r not defined' % ident)
     else:
         return ast.Del(state, ident=ident)
@@ -0,0 +1,338 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the Python backend for Zed lang.
+
+A parsed program is transpiled to a Python module and compiled with the
+builtin compile() to a code object. The statements of the program become
+the body of a single function so that variables are Python local variables.
+
+Every generated Python statement carries the line and column of the Zed
+statement it was generated from. If executing the code fails, exec_code()
+maps the failing instruction back to the Zed source position and raises
+an :class:`ExecutionError`.
+
+The main components of this module are:
+
+- compile_to_code()     : Compiles Zed source to a Python code object.
+- transpile()           : Transpiles a parsed program to a Python ast.Module.
+- statement_positions() : Returns the source positions to transpile a program with.
+- compile_file()        : Compiles a Zed file, using the on-disk code cache.
+- exec_code()           : Executes a code object returned by compile_to_code().
+- ExecutionError        : An exception raised when executing the code fails.
+
+Like Python's __pycache__, compile_file() stores the compiled code of a file
+in a ``__zedcache__`` directory next to it. The cache key covers the source,
+the Zed version, the grammar_fingerprint() and the Python implementation so
+a stale cache file is never used.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from types import CodeType
+from rply.token import SourcePosition
+from zed.sentinels import UNDEFINED
+from zed.lexer import get_lexer
+from zed.parser import get_parser, CompilationError
+from zed.cache import read_cache, write_cache, get_program_cache_path, get_program_cache_key
+from zed.output import OutputSink, StreamSink
+from zed.state import ParserState
+from zed.stream import STATEMENT_TOKENS
+from zed.tokens import LineIndex
+from zed.vm import Bindings, iter_statements
+from zed.optimizer import optimize as optimize_program
+from zed import ast as zast
+
+import ast
+import builtins
+import io
+import marshal
+
+if TYPE_CHECKING:
+    from zed.ast.base import BaseToken
+    from zed.snapshot import Snapshot
+
+__all__ = (
+    "compile_to_code",
+    "transpile",
+    "statement_positions",
+    "compile_file",
+    "exec_code",
+    "ExecutionError",
+)
+
+
+_MAIN = '__zed_main__'
+_PRINT = '__zed_print__'
+_UNDEFINED = '__zed_undefined__'
+_LINES = '__zed_lines__'
+
+_CACHE_MAGIC = b'ZEDC'
+
+
+class ExecutionError(CompilationError):
+    """An error raised when executing a compiled program fails.
+
+    The ``pos`` is the position of the Zed statement that was being
+    executed when the error occurred.
+    """
+
+
+def compile_to_code(
+    source: str,
+    filename: str = '<zed>',
+    lexer: str = 'rply',
+    optimize: int = 0,
+    parser: str = 'rply',
+    snapshot: Optional[Snapshot] = None,
+) -> CodeType:
+    """Compiles the given Zed source to a Python code object.
+
+    The returned code object is executed using exec_code().
+
+    Parameters
+    ----------
+    source: :class:`str`
+        The source of program.
+    filename: :class:`str`
+        The filename reported in the code object.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude to compile the source after.
+    """
+    keywords: List[Any] = []
+    tokens = _track_statements(get_lexer(lexer).lex(source), keywords)
+    program = get_parser(engine=parser).parse(tokens, state=ParserState(snapshot=snapshot))  # type: ignore
+
+    parsed = None
+    if optimize:
+        parsed = list(iter_statements(program))
+        optimize_program(program, optimize)
+
+    positions = statement_positions(program, keywords, parsed)
+    module = transpile(program, positions, LineIndex(source).starts)
+    return compile(module, filename, 'exec')
+
+def transpile(
+    program: zast.Program,
+    positions: Sequence[SourcePosition],
+    line_starts: Iterable[int] = (),
+) -> ast.Module:
+    """Transpiles a parsed program to a Python module.
+
+    Parameters
+    ----------
+    program: :class:`ast.Program`
+        The program returned by the parser.
+    positions: Sequence[rply.SourcePosition]
+        The source position of each statement of program, in order.
+    line_starts: Iterable[:class:`int`]
+        The offset of each line of the source. This is stored in the module
+        and used to report the position of errors during execution.
+    """
+    bindings = Bindings()
+    body: List[ast.stmt] = []
+
+    for stmt, pos in zip(iter_statements(program), positions):
+        node = _transpile_stmt(stmt, bindings)
+        node.lineno = node.end_lineno = pos.lineno
+        node.col_offset = node.end_col_offset = pos.colno - 1
+        body.append(node)
+
+    if not body:
+        body.append(ast.Pass())
+
+    module = ast.parse('%s = ()\ndef %s(): pass\n%s()\n' % (_LINES, _MAIN, _MAIN))
+    module.body[0].value = ast.Constant(value=tuple(line_starts))  # type: ignore
+    module.body[1].body = body  # type: ignore
+
+    return ast.fix_missing_locations(module)
+
+def statement_positions(
+    program: zast.Program,
+    tokens: Iterable[Any],
+    parsed: Optional[Sequence[BaseToken]] = None,
+) -> List[SourcePosition]:
+    """Returns the source position of each statement of a parsed program, in order.
+
+    The parser adds statements in the order they appear, so the position of
+    the N-th statement keyword is the position of the N-th statement.
+
+    Parameters
+    ----------
+    program: :class:`ast.Program`
+        The program returned by the parser, optionally optimized.
+    tokens: Iterable[rply.Token]
+        The tokens the program was parsed from. Only the statement keywords
+        are used, so any other tokens may be left out.
+    parsed: Optional[Sequence[:class:`BaseToken`]]
+        The statements of program as parsed, if it was optimized since. The
+        positions of statements optimized away are dropped.
+    """
+    positions = [token.getsourcepos() for token in tokens if token.gettokentype() in STATEMENT_TOKENS]
+    if parsed is None:
+        return positions
+
+    kept = set(map(id, iter_statements(program)))
+    return [pos for stmt, pos in zip(parsed, positions) if id(stmt) in kept]
+
+def compile_file(
+    filename: str,
+    cache_dir: Optional[str] = None,
+    use_cache: bool = True,
+    lexer: str = 'rply',
+    optimize: int = 0,
+    parser: str = 'rply',
+) -> CodeType:
+    """Compiles the given Zed file to a Python code object.
+
+    If the file has been compiled before, the code is loaded from the
+    cache without lexing or parsing the source.
+
+    Parameters
+    ----------
+    filename: :class:`str`
+        The path of file to compile.
+    cache_dir: Optional[:class:`str`]
+        The directory to store the cache files in. Defaults to a
+        ``__zedcache__`` directory next to the file.
+    use_cache: :class:`bool`
+        Whether to read and write the cache.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser(). Both engines compile to
+        the same code, so the cache is shared between them.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    if not use_cache:
+        return compile_to_code(_decode(data), filename, lexer, optimize, parser)
+
+    path = get_program_cache_path(filename, cache_dir)
+    key = get_program_cache_key(_CACHE_MAGIC, data, lexer, optimize)
+
+    cached = read_cache(path)
+    if cached is not None and cached[:len(key)] == key:
+        try:
+            return marshal.loads(cached[len(key):])
+        except (EOFError, ValueError, TypeError):
+            pass
+
+    code = compile_to_code(_decode(data), filename, lexer, optimize, parser)
+    write_cache(path, key + marshal.dumps(code))
+    return code
+
+def exec_code(code: CodeType, output: Optional[OutputSink] = None) -> None:
+    """Executes a code object returned by compile_to_code().
+
+    The output of print statements is written to the given sink, or to
+    the standard output if not given. Raises :class:`ExecutionError` if
+    the execution fails.
+    """
+    namespace = _make_namespace(output or StreamSink())
+    try:
+        exec(code, namespace)
+    except Exception as error:
+        pos = _find_position(error, code, namespace.get(_LINES, ()))
+        raise ExecutionError(pos, '%s: %s' % (type(error).__name__, error)) from error
+
+
+def _decode(data: bytes) -> str:
+    # Decode the same way as reading the file in text mode would.
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+def _track_statements(tokens: Iterable[Any], keywords: List[Any]) -> Iterator[Any]:
+    # Collects the statement keywords while the parser consumes the tokens,
+    # so that the tokens need not be kept for statement_positions().
+    for token in tokens:
+        if token.gettokentype() in STATEMENT_TOKENS:
+            keywords.append(token)
+        yield token
+
+def _name(ident: str, ctx: ast.expr_context) -> ast.Name:
+    # The prefix prevents clashes with Python keywords and builtins.
+    return ast.Name(id='v_' + ident, ctx=ctx)
+
+def _value(node: Any) -> ast.expr:
+    value = node.eval()
+    if value is UNDEFINED:
+        return ast.Name(id=_UNDEFINED, ctx=ast.Load())
+    return ast.Constant(value=value)
+
+def _transpile_stmt(stmt: BaseToken, bindings: Bindings) -> ast.stmt:
+    if isinstance(stmt, zast.Print):
+        ident = bindings.lookup(stmt.value)
+        arg = _value(stmt.value) if ident is None else _name(ident, ast.Load())
+        return ast.Expr(value=ast.Call(func=ast.Name(id=_PRINT, ctx=ast.Load()), args=[arg], keywords=[]))
+    if isinstance(stmt, zast.Let):
+        bindings.bind(stmt.ident, stmt.value)
+        return ast.Assign(targets=[_name(stmt.ident, ast.Store())], value=_value(stmt.value))
+    if isinstance(stmt, zast.Del):
+        if not bindings.unbind(stmt.ident):
+            # The variable was defined by a prelude, not by the program.
+            return ast.Pass()
+        return ast.Delete(targets=[_name(stmt.ident, ast.Del())])
+
+    raise TypeError('cannot transpile %r' % type(stmt).__name__)
+
+def _make_namespace(output: OutputSink) -> Dict[str, Any]:
+    return {
+        '__builtins__': builtins,
+        _PRINT: output.print,
+        _UNDEFINED: UNDEFINED,
+    }
+
+def _find_position(error: Exception, code: CodeType, line_starts: Sequence[int]) -> Optional[SourcePosition]:
+    # Find the innermost frame that is executing the generated code.
+    tb = error.__traceback__
+    frame_tb = None
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename == code.co_filename:
+            frame_tb = tb
+        tb = tb.tb_next
+
+    if frame_tb is None:
+        return None
+
+    lineno = frame_tb.tb_lineno
+    colno = 1
+    co_positions = getattr(frame_tb.tb_frame.f_code, 'co_positions', None)
+    if co_positions is not None:
+        position = list(co_positions())[frame_tb.tb_lasti // 2]
+        if position[0] is not None and position[2] is not None:
+            lineno, colno = position[0], position[2] + 1
+
+    if 0 < lineno <= len(line_starts):
+        idx = line_starts[lineno - 1] + colno - 1
+    else:
+        idx = 0
+    return SourcePosition(idx, lineno, colno)
@@ -0,0 +1,174 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the interactive Zed lang interpreter.
+
+A session keeps its parser state between inputs, so each input is lexed
+and parsed on its own while using the variables defined by the previous
+ones. An input that fails to compile leaves the variables as they were.
+
+The main components of this module are:
+
+- Session    : Runs inputs one after another with the same variables.
+- run_repl() : Runs the read-eval-print loop of ``python -m zed``.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, TextIO
+from rply.errors import LexingError, ParsingError
+from zed.lexer import get_lexer
+from zed.output import StreamSink
+from zed.parser import get_parser, CompilationError
+from zed.state import ParserState
+
+import sys
+
+if TYPE_CHECKING:
+    from zed.output import OutputSink
+    from zed.snapshot import Snapshot
+
+__all__ = (
+    "Session",
+    "run_repl",
+)
+
+
+class Session:
+    """Runs inputs one after another with the same variables.
+
+    Parameters
+    ----------
+    output: Optional[:class:`OutputSink`]
+        The sink that receives the output of print statements. Defaults to
+        a :class:`StreamSink` writing to the standard output.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude to start from, see compile_snapshot().
+    """
+    def __init__(
+        self,
+        output: Optional[OutputSink] = None,
+        lexer: str = 'rply',
+        parser: str = 'rply',
+        snapshot: Optional[Snapshot] = None,
+    ) -> None:
+        self.state = ParserState(output, snapshot)
+        self._lexer = get_lexer(lexer)
+        self._parser = get_parser(engine=parser)
+
+    def run(self, source: str) -> None:
+        """Lexes, parses and runs the given input.
+
+        Raises :class:`CompilationError` when the input fails to compile,
+        in which case nothing is run and the variables are left unchanged.
+        The error has no position when the input ended too early.
+        """
+        state = self.state
+        definitions = state._definitions.copy()
+        try:
+            self._parser.parse(self._lexer.lex(source), state=state)
+        except (CompilationError, LexingError, ParsingError) as error:
+            state._definitions = definitions
+            state.get_stmts().clear()
+            if isinstance(error, CompilationError):
+                raise
+            message = 'invalid token' if isinstance(error, LexingError) else 'invalid syntax'
+            raise CompilationError(error.getsourcepos(), message) from None
+
+        state.eval_stmts()
+
+
+def run_repl(
+    lexer: str = 'rply',
+    parser: str = 'rply',
+    stdin: Optional[TextIO] = None,
+    stdout: Optional[TextIO] = None,
+    snapshot: Optional[Snapshot] = None,
+) -> int:
+    """Runs the read-eval-print loop until the end of input and returns the exit status.
+
+    An input that ends too early, such as ``let x =``, continues on the
+    next line; an empty line or the end of input reports its error.
+    Prompts are only shown when the input is a terminal, in which case
+    line editing is enabled if the readline module is available.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    interactive = stdin.isatty()
+    if interactive and stdin is sys.stdin:
+        try:
+            import readline  # noqa: F401  (enables line editing of input())
+        except ImportError:
+            pass
+
+    session = Session(StreamSink(stdout), lexer, parser, snapshot)
+    if interactive:
+        stdout.write('Zed REPL, press Ctrl-D to exit.\n')
+
+    pending, incomplete = '', None
+    while True:
+        try:
+            line = _read(stdin, stdout, '... ' if pending else 'zed> ', interactive)
+        except KeyboardInterrupt:
+            stdout.write('\n')
+            pending = ''
+            continue
+
+        if line is None or not line.strip():
+            if pending:
+                stdout.write('%s\n' % incomplete)
+                pending = ''
+            if line is None:
+                if interactive:
+                    stdout.write('\n')
+                return 0
+            continue
+
+        source = pending + line + '\n'
+        pending = ''
+        try:
+            session.run(source)
+        except CompilationError as error:
+            if error.pos is None and error.message == 'invalid syntax':
+                pending, incomplete = source, error
+            else:
+                stdout.write('%s\n' % error)
+        stdout.flush()
+
+
+def _read(stdin: TextIO, stdout: TextIO, prompt: str, interactive: bool) -> Optional[str]:
+    # Returns the next line without its line break, or None at the end of input.
+    if interactive and stdin is sys.stdin and stdout is sys.stdout:
+        try:
+            return input(prompt)
+        except EOFError:
+            return None
+
+    if interactive:
+        stdout.write(prompt)
+        stdout.flush()
+    line = stdin.readline()
+    return line.rstrip('\n') if line else None
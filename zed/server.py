@@ -0,0 +1,310 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the Zed lang server and its client.
+
+The server keeps a warm :class:`Interpreter` resident and runs programs sent
+to it over a Unix socket, so running a program does not pay for building the
+lexer and parser. Requests are handled by a pool of worker threads and each
+program runs with its own parser state.
+
+The protocol uses one JSON object per line. The client sends a single request
+with either the ``source`` of program or the ``path`` of a file to run. Path
+requests are refused unless the server was given a directory to allow them
+in, as they run files with the permissions of the server. The server answers
+with any number of ``{"output": ...}`` messages as the program prints,
+followed by ``{"error": ...}`` where error is the error message or null.
+
+The main components of this module are:
+
+- serve()      : Runs the server on a Unix socket.
+- run_remote() : Runs a program on a server.
+- main_serve() : The entry point of ``python -m zed serve``.
+- main_run()   : The entry point of ``python -m zed run``.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, TextIO
+from zed.output import OutputSink
+
+import argparse
+import json
+import os
+import socket
+import stat
+import sys
+
+if TYPE_CHECKING:
+    from zed.interpreter import Interpreter
+    from zed.snapshot import Snapshot
+
+__all__ = (
+    "serve",
+    "run_remote",
+    "main_serve",
+    "main_run",
+)
+
+
+def serve(
+    path: str,
+    workers: Optional[int] = None,
+    lexer: str = 'rply',
+    engine: str = 'tree',
+    parser: str = 'rply',
+    snapshot: Optional[Snapshot] = None,
+    allow_paths: Optional[str] = None,
+) -> None:
+    """Runs the server on the Unix socket at the given path until interrupted.
+
+    A socket left at the path by a server that is no longer running is
+    replaced. Raises FileExistsError if the path is any other file or a
+    server is listening on it.
+
+    Parameters
+    ----------
+    path: :class:`str`
+        The path of socket.
+    workers: Optional[:class:`int`]
+        The number of requests handled at once. Defaults to the number of CPUs.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    engine: :class:`str`
+        The engine used to execute programs, see Interpreter.
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude that every program starts from.
+    allow_paths: Optional[:class:`str`]
+        The directory that path requests may run files from. Path requests
+        are refused if not given, and so are paths that resolve outside of
+        the directory.
+    """
+    # Imported here so that the client does not import the interpreter.
+    from concurrent.futures import ThreadPoolExecutor
+    from zed.interpreter import Interpreter
+
+    interpreter = Interpreter(lexer, engine, parser=parser, snapshot=snapshot)
+    if allow_paths is not None:
+        allow_paths = os.path.realpath(allow_paths)
+
+    _remove_stale_socket(path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(path)
+    except OSError:
+        server.close()
+        raise
+
+    try:
+        server.listen(64)
+        with ThreadPoolExecutor(workers or os.cpu_count() or 1, thread_name_prefix='zed') as executor:
+            while True:
+                conn, _ = server.accept()
+                executor.submit(_handle, conn, interpreter, allow_paths)
+    finally:
+        server.close()
+        os.unlink(path)
+
+def run_remote(
+    socket_path: str,
+    source: Optional[str] = None,
+    path: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+) -> Optional[str]:
+    """Runs a program on the server listening at the given socket.
+
+    Either the source of program or the path of file to run must be given.
+    The output is written to the stream, which defaults to the standard
+    output, as the program prints it.
+
+    Returns the error message if the program failed, or None.
+    """
+    if (source is None) == (path is None):
+        raise TypeError('exactly one of source and path must be given')
+
+    request: Dict[str, Any] = {'source': source} if path is None else {'path': os.path.abspath(path)}
+    stream = stream or sys.stdout
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(socket_path)
+        conn.sendall(json.dumps(request).encode() + b'\n')
+
+        with conn.makefile('rb') as f:
+            for line in f:
+                message = json.loads(line)
+                if 'output' in message:
+                    stream.write(message['output'])
+                else:
+                    return message['error']
+
+    raise ConnectionError('server closed the connection before the program finished')
+
+def main_serve(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs ``python -m zed serve`` with the given arguments."""
+    from zed.interpreter import ENGINES
+    from zed.lexer import LEXER_ENGINES
+    from zed.parser import PARSER_ENGINES
+
+    parser = argparse.ArgumentParser(prog='python -m zed serve',
+                                     description='Run Zed programs sent over a Unix socket.')
+    parser.add_argument('--socket', help='The path of socket to listen on.', required=True)
+    parser.add_argument('-j', '--workers', help='The number of requests handled at once (default: number of CPUs).',
+                        type=int)
+    parser.add_argument('--lexer', help='The lexer engine to use (default: rply).', choices=LEXER_ENGINES,
+                        default='rply')
+    parser.add_argument('--engine', help='The engine used to execute programs (default: tree).', choices=ENGINES,
+                        default='tree')
+    parser.add_argument('--parser', help='The parser engine to use (default: rply).', choices=PARSER_ENGINES,
+                        default='rply')
+    parser.add_argument('--prelude', help='A prelude or saved snapshot that every program starts from.')
+    parser.add_argument(
+        '--allow-paths',
+        help='Run files sent by path from this directory. Without it, only sources are accepted.',
+        metavar='DIR',
+    )
+    args = parser.parse_args(argv)
+
+    if args.allow_paths is not None and not os.path.isdir(args.allow_paths):
+        parser.error('--allow-paths must be a directory')
+
+    snapshot = None
+    if args.prelude is not None:
+        from zed.parser import CompilationError
+        from zed.snapshot import read_prelude
+        try:
+            snapshot = read_prelude(args.prelude, args.lexer, args.parser)
+        except (OSError, CompilationError, ValueError) as error:
+            parser.error('cannot read prelude: %s' % error)
+
+    try:
+        serve(args.socket, args.workers, args.lexer, args.engine, args.parser, snapshot, args.allow_paths)
+    except KeyboardInterrupt:
+        pass
+    except OSError as error:
+        parser.error('cannot listen on %s: %s' % (args.socket, error))
+    return 0
+
+def main_run(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs ``python -m zed run`` with the given arguments.
+
+    Returns the exit status, which is 1 if the program failed.
+    """
+    parser = argparse.ArgumentParser(prog='python -m zed run', description='Run a Zed file on a server.')
+    parser.add_argument('filename', help='The name of file to run.')
+    parser.add_argument('--connect', help='The path of socket the server listens on.', required=True)
+    parser.add_argument('--send-path', help='Send the path of file rather than its source.', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.send_path:
+        error = run_remote(args.connect, path=args.filename)
+    else:
+        with open(args.filename, 'r') as f:
+            error = run_remote(args.connect, source=f.read())
+
+    if error is not None:
+        print(error)
+        return 1
+    return 0
+
+
+class _SocketOutput(OutputSink):
+    # Sends the output to the client in chunks as the program prints it.
+    def __init__(self, conn: socket.socket, buffer_size: int = 1 << 16) -> None:
+        self.conn = conn
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._buffered = 0
+
+    def write(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.send({'output': ''.join(self._buffer)})
+            self._buffer.clear()
+            self._buffered = 0
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.conn.sendall(json.dumps(message).encode() + b'\n')
+
+
+def _handle(conn: socket.socket, interpreter: Interpreter, allow_paths: Optional[str]) -> None:
+    with conn:
+        output = _SocketOutput(conn)
+        try:
+            with conn.makefile('rb') as f:
+                request = json.loads(f.readline())
+
+            if 'path' in request:
+                path = _allowed_path(request['path'], allow_paths)
+                if path is None:
+                    output.send({'error': 'error: running files by path is not allowed'})
+                    return
+                result = interpreter.run_file(path, output)
+            else:
+                result = interpreter.run(request['source'], output)  # type: ignore
+
+            output.flush()
+            output.send({'error': None if result.ok else str(result.error)})
+        except OSError:
+            # The client went away or the file could not be read.
+            try:
+                output.send({'error': 'error: %s' % sys.exc_info()[1]})
+            except OSError:
+                pass
+        except Exception as error:
+            output.send({'error': 'error: invalid request: %r' % error})
+
+def _allowed_path(path: str, allow_paths: Optional[str]) -> Optional[str]:
+    # Returns the resolved path if it is inside the allowed directory, which
+    # is already resolved, or None. Symbolic links are resolved first so that
+    # they cannot point outside of it.
+    if allow_paths is None:
+        return None
+    path = os.path.realpath(os.path.join(allow_paths, path))
+    if os.path.commonpath((path, allow_paths)) != allow_paths:
+        return None
+    return path
+
+def _remove_stale_socket(path: str) -> None:
+    # Removes a socket that no server is listening on. Anything else at the
+    # path, including the socket of a running server, is left alone.
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError('%r exists and is not a socket' % path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise FileExistsError('a server is already listening on %r' % path)
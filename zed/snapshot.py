@@ -0,0 +1,275 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements prelude snapshots for Zed lang.
+
+A prelude is a block of definitions shared by many programs. Rather than
+lexing, parsing and defining it again for every program, it is compiled
+once into a :class:`Snapshot` of its variables. A :class:`ParserState`
+created from the snapshot starts with these variables defined.
+
+The variables of snapshot are never modified. Each parser state gets an
+overlay on top of them which holds the variables defined by the program
+and marks the ones it deletes, so that programs do not affect each other
+and starting a program does not copy the variables.
+
+Snapshots are saved to a file as a line identifying the format, followed
+by the variables as JSON.
+
+The main components of this module are:
+
+- Snapshot           : The variables defined by a prelude.
+- compile_snapshot() : Compiles a prelude to a snapshot.
+- load_snapshot()    : Loads a snapshot saved by Snapshot.save().
+- read_prelude()     : Reads a prelude file, either a saved snapshot or Zed source.
+- main()             : The entry point of ``python -m zed snapshot``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, Optional, Sequence, Set
+from collections.abc import ItemsView, KeysView, ValuesView
+from zed.output import NullSink
+from zed.state import ParserState
+from zed import ast
+
+import argparse
+import json
+import types
+
+__all__ = (
+    "Snapshot",
+    "compile_snapshot",
+    "load_snapshot",
+    "read_prelude",
+    "main",
+)
+
+# The first line of a saved snapshot. A Zed program cannot start with it.
+SNAPSHOT_HEADER = b'#zed-snapshot 1\n'
+
+
+class Snapshot:
+    """The variables defined by a prelude.
+
+    Snapshots are immutable and can be shared by any number of parser
+    states and threads. Use compile_snapshot() or load_snapshot() to
+    create one.
+
+    Attributes
+    ----------
+    definitions: Mapping[:class:`str`, Any]
+        A read only view of the variables, mapping their names to the
+        value nodes they are bound to.
+    """
+    __slots__ = ('_definitions', 'definitions')
+
+    def __init__(self, definitions: Dict[str, Any]) -> None:
+        self._definitions = definitions
+        self.definitions = types.MappingProxyType(definitions)
+
+    def __repr__(self) -> str:
+        return '<Snapshot definitions=%d>' % len(self._definitions)
+
+    def __reduce__(self) -> Any:
+        return _from_data, (self.to_data(),)
+
+    def overlay(self) -> _Overlay:
+        """Returns a new, empty overlay of the variables for a parser state."""
+        return _Overlay(self._definitions)
+
+    def to_data(self) -> Dict[str, Any]:
+        """Returns the variables as a JSON serializable dictionary."""
+        # undefined is saved as null, strings as themselves.
+        return {
+            'definitions': {
+                name: value.value if isinstance(value, ast.String) else None
+                for name, value in self._definitions.items()
+            },
+        }
+
+    def save(self, path: str) -> None:
+        """Saves the snapshot to the file at the given path."""
+        with open(path, 'wb') as f:
+            f.write(SNAPSHOT_HEADER + json.dumps(self.to_data()).encode())
+
+
+class _Overlay(dict):
+    # The variables of a parser state started from a snapshot. The dict
+    # holds the variables defined by the program; a variable that is not
+    # in it is looked up in the snapshot, unless it was deleted. As the
+    # dict comes first, defining a deleted variable again needs no marking.
+    # Looking up a variable of the dict costs the same as with a plain dict.
+    __slots__ = ('_base', '_deleted')
+
+    def __init__(self, base: Dict[str, Any]) -> None:
+        super().__init__()
+        self._base = base
+        self._deleted: Optional[Set[str]] = None
+
+    def __missing__(self, key: str) -> Any:
+        if self._deleted is not None and key in self._deleted:
+            raise KeyError(key)
+        return self._base[key]
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+
+        if dict.__contains__(self, key):
+            dict.__delitem__(self, key)
+        if key in self._base:
+            if self._deleted is None:
+                self._deleted = set()
+            self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if dict.__contains__(self, key):
+            return True
+        return key in self._base and (self._deleted is None or key not in self._deleted)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from dict.__iter__(self)
+        for key in self._base:
+            if not dict.__contains__(self, key) and (self._deleted is None or key not in self._deleted):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def keys(self) -> KeysView[str]:  # type: ignore
+        return KeysView(self)  # type: ignore
+
+    def items(self) -> ItemsView[str, Any]:  # type: ignore
+        return ItemsView(self)  # type: ignore
+
+    def values(self) -> ValuesView[Any]:  # type: ignore
+        return ValuesView(self)  # type: ignore
+
+    def copy(self) -> _Overlay:
+        overlay = _Overlay(self._base)
+        overlay.update(dict.items(self))
+        if self._deleted is not None:
+            overlay._deleted = set(self._deleted)
+        return overlay
+
+
+def compile_snapshot(source: str, lexer: str = 'rply', parser: str = 'rply') -> Snapshot:
+    """Compiles the given prelude to a :class:`Snapshot`.
+
+    The prelude may only contain let and del statements, as it is never
+    run. Raises :class:`CompilationError` if it fails to compile.
+
+    Parameters
+    ----------
+    source: :class:`str`
+        The source of prelude.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    """
+    # Imported here so that loading a snapshot does not build the parser.
+    from rply.errors import LexingError, ParsingError
+    from zed.lexer import get_lexer
+    from zed.parser import get_parser, CompilationError
+
+    state = ParserState(NullSink())
+    try:
+        get_parser(engine=parser).parse(get_lexer(lexer).lex(source), state=state)
+    except LexingError as error:
+        raise CompilationError(error.getsourcepos(), 'invalid token') from None
+    except ParsingError as error:
+        raise CompilationError(error.getsourcepos(), 'invalid syntax') from None
+
+    if any(isinstance(stmt, ast.Print) for stmt in state.get_stmts()):
+        raise ValueError('a prelude may only contain let and del statements')
+
+    for value in state._definitions.values():
+        if isinstance(value, ast.String):
+            # The value is sliced now, rather than by the programs sharing it.
+            value.value
+    return Snapshot(dict(state._definitions))
+
+
+def load_snapshot(path: str) -> Snapshot:
+    """Loads a :class:`Snapshot` saved by Snapshot.save().
+
+    Raises ValueError if the file is not a saved snapshot.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not data.startswith(SNAPSHOT_HEADER):
+        raise ValueError('%r is not a saved snapshot' % path)
+    return _from_data(json.loads(data[len(SNAPSHOT_HEADER):]))
+
+
+def read_prelude(path: str, lexer: str = 'rply', parser: str = 'rply') -> Snapshot:
+    """Returns the snapshot of the prelude file at the given path.
+
+    The file is either a snapshot saved by Snapshot.save(), which is loaded,
+    or the source of a prelude, which is compiled.
+    """
+    with open(path, 'rb') as f:
+        saved = f.read(len(SNAPSHOT_HEADER)) == SNAPSHOT_HEADER
+    if saved:
+        return load_snapshot(path)
+
+    with open(path, 'r') as f:
+        return compile_snapshot(f.read(), lexer, parser)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs ``python -m zed snapshot`` with the given arguments."""
+    parser = argparse.ArgumentParser(prog='python -m zed snapshot',
+                                     description='Compile a prelude to a snapshot file.')
+    parser.add_argument('filename', help='The name of prelude file to compile.')
+    parser.add_argument('-o', '--output', help='The file to save the snapshot to.', required=True)
+    args = parser.parse_args(argv)
+
+    from zed.parser import CompilationError
+    try:
+        snapshot = read_prelude(args.filename)
+    except (OSError, CompilationError, ValueError) as error:
+        parser.error('cannot read prelude: %s' % error)
+
+    try:
+        snapshot.save(args.output)
+    except OSError as error:
+        parser.error('cannot save snapshot: %s' % error)
+    return 0
+
+
+def _from_data(data: Dict[str, Any]) -> Snapshot:
+    state = ParserState(NullSink())
+    definitions = {
+        name: ast.Undefined(state) if value is None else ast.String(state, value=value)
+        for name, value in data['definitions'].items()
+    }
+    return Snapshot(definitions)
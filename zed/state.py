@@ -22,10 +22,13 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from zed.output import StreamSink
 
 if TYPE_CHECKING:
+    from zed.output import OutputSink
     from zed.ast.base import BaseToken
+    from zed.snapshot import Snapshot
 
 
 __all__ = (
@@ -38,14 +41,27 @@ class ParserState:
 
     An instance of this class is generally passed as first argument to
     production rules.
+
+    Parameters
+    ----------
+    output: Optional[:class:`OutputSink`]
+        The sink that receives the output of print statements. Defaults to
+        a :class:`StreamSink` writing to the standard output.
+    snapshot: Optional[:class:`Snapshot`]
+        The snapshot of a prelude to start from. The variables it defines
+        are defined in this state without being copied.
     """
-    def __init__(self) -> None:
+    def __init__(self, output: Optional[OutputSink] = None, snapshot: Optional[Snapshot] = None) -> None:
         self._current_stmts_list: List[BaseToken] = []
-        self._definitions: Dict[str, Any] = {}
+        self._definitions: Dict[str, Any] = {} if snapshot is None else snapshot.overlay()
+        self.output: OutputSink = output or StreamSink()
 
     def add_stmt(self, stmt: BaseToken) -> None:
         self._current_stmts_list.append(stmt)
 
+    def get_stmts(self) -> List[BaseToken]:
+        return self._current_stmts_list
+
     def eval_stmts(self) -> None:
         for stmt in self._current_stmts_list:
             stmt.eval()
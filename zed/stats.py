@@ -0,0 +1,264 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the phase statistics of ``python -m zed --stats``.
+
+run_with_stats() runs a program one phase at a time and records the wall
+and CPU time of each phase along with counters describing its work. The
+normal code paths are not instrumented, so the statistics cost nothing
+unless they are requested.
+
+The main components of this module are:
+
+- run_with_stats() : Runs a program and collects the statistics of each phase.
+- Stats            : The statistics of a run.
+- PhaseStats       : The statistics of a single phase.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from rply.parser import LRParser
+from zed.lexer import get_lexer
+from zed.optimizer import optimize as optimize_program
+from zed.output import OutputSink
+from zed.parser import get_parser, parser_cache_hit
+from zed.pycompile import exec_code, statement_positions, transpile
+from zed.state import ParserState
+from zed.tokens import LineIndex
+from zed.ast.base import BaseToken
+from zed import ast, vm
+
+import json
+import time
+
+__all__ = (
+    "run_with_stats",
+    "Stats",
+    "PhaseStats",
+)
+
+
+class PhaseStats:
+    """The statistics of a single phase of a run.
+
+    Attributes
+    ----------
+    name: :class:`str`
+        The name of phase.
+    wall: :class:`float`
+        The wall clock time taken by the phase, in seconds.
+    cpu: :class:`float`
+        The CPU time taken by the phase, in seconds.
+    counters: Dict[:class:`str`, Any]
+        The counters of phase, such as the number of tokens lexed.
+    """
+    __slots__ = ('name', 'wall', 'cpu', 'counters')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counters: Dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return '<PhaseStats name=%r wall=%r cpu=%r>' % (self.name, self.wall, self.cpu)
+
+
+class Stats:
+    """The statistics of a run, made of the statistics of each phase.
+
+    Attributes
+    ----------
+    phases: List[:class:`PhaseStats`]
+        The phases in the order they ran.
+    """
+    def __init__(self) -> None:
+        self.phases: List[PhaseStats] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseStats]:
+        """A context manager timing a phase with the given name.
+
+        The phase is recorded even when the body raises an exception.
+        """
+        phase = PhaseStats(name)
+        self.phases.append(phase)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield phase
+        finally:
+            phase.wall = time.perf_counter() - wall
+            phase.cpu = time.process_time() - cpu
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the statistics as a JSON serializable dictionary."""
+        return {
+            'phases': [
+                dict(name=phase.name, wall=phase.wall, cpu=phase.cpu, **phase.counters)
+                for phase in self.phases
+            ],
+            'wall': sum(phase.wall for phase in self.phases),
+            'cpu': sum(phase.cpu for phase in self.phases),
+        }
+
+    def to_json(self) -> str:
+        """Returns the statistics as JSON."""
+        return json.dumps(self.to_dict())
+
+    def format(self) -> str:
+        """Returns the statistics as a human readable table."""
+        lines = ['%-12s %10s %10s  %s' % ('phase', 'wall ms', 'cpu ms', 'details')]
+        for phase in self.phases:
+            details = '  '.join('%s=%s' % (key, _format_value(value)) for key, value in phase.counters.items())
+            lines.append('%-12s %10.3f %10.3f  %s' % (phase.name, phase.wall * 1000, phase.cpu * 1000, details))
+
+        total = self.to_dict()
+        lines.append('%-12s %10.3f %10.3f' % ('total', total['wall'] * 1000, total['cpu'] * 1000))
+        return '\n'.join(lines)
+
+
+def run_with_stats(
+    source: str,
+    stats: Optional[Stats] = None,
+    output: Optional[OutputSink] = None,
+    lexer: str = 'rply',
+    engine: str = 'tree',
+    optimize: int = 0,
+    parser: str = 'rply',
+) -> Stats:
+    """Runs the given source and returns the statistics of each phase.
+
+    If the run fails, the exception is propagated and the statistics of the
+    phases that ran are left in the given ``stats``. The py engine always
+    compiles the program; the program cache is not used.
+
+    Parameters
+    ----------
+    source: :class:`str`
+        The source of program.
+    stats: Optional[:class:`Stats`]
+        The statistics to add the phases to.
+    output: Optional[:class:`OutputSink`]
+        The sink that receives the output of program.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    engine: :class:`str`
+        The engine used to execute the program, see Interpreter.
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser(). Reductions are only
+        counted by the rply parser.
+    """
+    stats = stats or Stats()
+
+    with stats.phase('get_lexer') as phase:
+        phase.counters['engine'] = lexer
+        lex = get_lexer(lexer)
+
+    with stats.phase('get_parser') as phase:
+        phase.counters['engine'] = parser
+        instance = get_parser(engine=parser)
+        if parser == 'rply':
+            phase.counters['cache'] = 'hit' if parser_cache_hit() else 'miss'
+
+    with stats.phase('lex') as phase:
+        # The tokens are collected up front so that lexing is timed apart
+        # from parsing.
+        tokens = list(lex.lex(source))
+        phase.counters['tokens'] = len(tokens)
+    phase.counters['tokens/sec'] = len(tokens) / phase.wall if phase.wall else 0
+
+    state = ParserState(output)
+    if parser == 'rply':
+        instance = _CountingParser(instance.lr_table, instance.error_handler)  # type: ignore
+    with stats.phase('parse') as phase:
+        program = instance.parse(iter(tokens), state=state)
+    if isinstance(instance, _CountingParser):
+        phase.counters['reductions'] = instance.reductions
+    phase.counters['nodes'] = _count_nodes(program)
+
+    parsed = list(vm.iter_statements(program)) if optimize else None
+    if optimize:
+        with stats.phase('optimize') as phase:
+            result = optimize_program(program, optimize)
+        phase.counters['removed'] = result.removed
+        phase.counters['interned'] = result.interned
+
+    stmts = list(vm.iter_statements(program))
+    if engine == 'py':
+        with stats.phase('compile'):
+            positions = statement_positions(program, tokens, parsed)
+            code = compile(transpile(program, positions, LineIndex(source).starts), '<zed>', 'exec')
+    elif engine == 'vm':
+        with stats.phase('compile') as phase:
+            code = vm.compile_program(program)
+        phase.counters['instructions'] = len(code)
+
+    counters = {
+        'statements': len(stmts),
+        'prints': sum(isinstance(stmt, ast.Print) for stmt in stmts),
+        'definitions': sum(isinstance(stmt, ast.Let) for stmt in stmts),
+        'deletions': sum(isinstance(stmt, ast.Del) for stmt in stmts),
+    }
+    with stats.phase('eval') as phase:
+        phase.counters.update(counters)
+        if engine == 'py':
+            exec_code(code, state.output)
+        elif engine == 'vm':
+            vm.VirtualMachine().run(code, state.output)
+        else:
+            program.eval()  # type: ignore
+
+    return stats
+
+
+class _CountingParser(LRParser):
+    # An LRParser counting the productions it reduces.
+    def __init__(self, lr_table: Any, error_handler: Any) -> None:
+        super().__init__(lr_table, error_handler)
+        self.reductions = 0
+
+    def _reduce_production(self, t: Any, symstack: Any, statestack: Any, state: Any) -> Any:
+        self.reductions += 1
+        return super()._reduce_production(t, symstack, statestack, state)
+
+
+def _count_nodes(program: Any) -> int:
+    # Counts the distinct AST nodes reachable from the program. Identifiers
+    # resolve to the node they are bound to, so shared nodes count once.
+    seen = {id(program)}
+    for token in program.tokens:
+        seen.add(id(token))
+    for stmt in vm.iter_statements(program):
+        seen.add(id(stmt))
+        value = getattr(stmt, 'value', None)
+        if isinstance(value, BaseToken):
+            seen.add(id(value))
+    return len(seen)
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return '%.0f' % value
+    return str(value)
@@ -0,0 +1,171 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements streaming execution of Zed programs.
+
+In streaming mode, the source is read in chunks and every statement is
+evaluated as soon as it has been parsed, after which it is dropped. The
+memory used is therefore bounded by the size of a chunk and the live
+definitions rather than by the size of the program.
+
+Note that, unlike normal execution, the statements before a compilation
+error have already been evaluated when the error is raised.
+
+The main components of this module are:
+
+- run_stream()       : Runs a program read from a file object.
+- split_statements() : Groups a token stream into the tokens of each statement.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, TextIO
+from itertools import chain
+from rply.errors import LexingError
+from rply.token import SourcePosition, Token
+from zed.lexer import get_lexer, FastLexer
+from zed.parser import get_parser
+from zed.state import ParserState
+
+if TYPE_CHECKING:
+    from rply.lexer import Lexer
+    from zed.tokens import BufferToken
+
+__all__ = (
+    "run_stream",
+    "split_statements",
+)
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Every statement starts with one of these tokens and they cannot appear
+# anywhere else in a statement.
+STATEMENT_TOKENS = frozenset(('STMT_PRINT', 'STMT_LET', 'STMT_DEL'))
+
+
+def split_statements(tokens: Iterable[BufferToken]) -> Iterator[List[BufferToken]]:
+    """Groups the given tokens into the tokens of each statement.
+
+    The tokens preceding the first statement keyword, if any, are yielded
+    as a group of their own so that the parser reports them as an error.
+    """
+    group: List[BufferToken] = []
+    for token in tokens:
+        if group and token.gettokentype() in STATEMENT_TOKENS:
+            yield group
+            group = []
+        group.append(token)
+    if group:
+        yield group
+
+def run_stream(
+    fileobj: TextIO,
+    state: Optional[ParserState] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    parser: str = 'rply',
+    lexer: str = 'rply',
+) -> None:
+    """Runs the Zed program read from the given text file object.
+
+    The program is lexed one chunk at a time and evaluated one statement
+    at a time. See the module documentation for details.
+
+    Parameters
+    ----------
+    fileobj:
+        The text file object to read the source from.
+    state: :class:`ParserState`
+        The parser state to run the program in. A new state is created
+        if not given.
+    chunk_size: :class:`int`
+        The number of characters read from the file at once.
+    parser: :class:`str`
+        The parser engine to use, see get_parser().
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    """
+    if state is None:
+        state = ParserState()
+
+    instance = get_parser(engine=parser)
+    pending: List[BufferToken] = []
+
+    for tokens in _lex_chunks(fileobj, chunk_size, get_lexer(lexer)):
+        groups = split_statements(chain(pending, tokens))
+        pending = []
+
+        # The last statement may continue in the next chunk so it is only
+        # parsed once the following statement has been seen.
+        for group in groups:
+            if pending:
+                instance.parse(iter(pending), state=state).eval()  # type: ignore
+            pending = group
+
+    if pending:
+        instance.parse(iter(pending), state=state).eval()  # type: ignore
+
+def _lex_chunks(fileobj: TextIO, chunk_size: int, lexer: Lexer) -> Iterator[Iterable[BufferToken]]:
+    # Tokens never span lines, so the source is lexed up to the last newline
+    # read so far and the remaining text is carried over to the next chunk.
+    offset = 0
+    lineno = 1
+    rest = ''
+
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+
+        text = rest + chunk
+        end = text.rfind('\n') + 1
+        if not end:
+            rest = text
+            continue
+
+        rest = text[end:]
+        text = text[:end]
+        yield _lex(lexer, text, offset, lineno)
+
+        offset += len(text)
+        lineno += text.count('\n')
+
+    if rest:
+        yield _lex(lexer, rest, offset, lineno)
+
+def _lex(lexer: Lexer, text: str, offset: int, lineno: int) -> Iterable[BufferToken]:
+    if isinstance(lexer, FastLexer):
+        return lexer.tokenize(text, offset, lineno)
+    return _shift(lexer.lex(text), offset, lineno)
+
+def _shift(tokens: Iterator[Token], offset: int, lineno: int) -> Iterator[BufferToken]:
+    # The rply lexer reports positions relative to the chunk, so they are
+    # moved to the position of the chunk in the file.
+    try:
+        for token in tokens:
+            pos = token.source_pos
+            yield Token(token.name, token.value, _shift_pos(pos, offset, lineno))  # type: ignore
+    except LexingError as error:
+        raise LexingError(None, _shift_pos(error.source_pos, offset, lineno)) from None
+
+def _shift_pos(pos: SourcePosition, offset: int, lineno: int) -> SourcePosition:
+    return SourcePosition(pos.idx + offset, pos.lineno + lineno - 1, pos.colno)
@@ -0,0 +1,276 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the compact token stream produced by the fast lexer.
+
+The main components of this module are:
+
+- TokenBuffer : Stores the lexed tokens of a source in parallel arrays.
+- BufferToken : A lightweight view of a single token in a TokenBuffer.
+- LineIndex   : Maps source offsets to line and column numbers.
+
+For more information regarding a specific class, read the documentation for
+that class.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Tuple, Union
+from array import array
+from bisect import bisect_right
+
+import mmap
+import re
+
+if TYPE_CHECKING:
+    from rply.token import SourcePosition
+
+__all__ = (
+    "TokenBuffer",
+    "BufferToken",
+    "LineIndex",
+    "Source",
+)
+
+
+# A source is either text or a bytes-like object, such as a memory mapped
+# file, holding UTF-8 encoded text.
+Source = Union[str, bytes, memoryview, mmap.mmap]
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+
+class LineIndex:
+    """An index of the line start offsets of a source.
+
+    The index is built in a single pass over the source and maps an
+    offset to its line and column number using a binary search.
+
+    The offsets into a bytes-like source are byte offsets. The positions
+    returned for them are still in characters, which for a non-ASCII source
+    are counted by decoding the text before the offset.
+
+    Parameters
+    ----------
+    source: Union[:class:`str`, bytes-like]
+        The source to index.
+    offset: :class:`int`
+        The offset of the source, when it is a part of a larger source.
+    lineno: :class:`int`
+        The line number of the first line of source, when it is a part of a
+        larger source.
+
+    Attributes
+    ----------
+    starts: :class:`array.array`
+        The offset of first character of each line.
+    """
+    __slots__ = ('starts', 'offset', 'lineno', '_data')
+
+    def __init__(self, source: Source, offset: int = 0, lineno: int = 1) -> None:
+        self.starts = array('I' if len(source) < (1 << 32) else 'q', [0])
+        self.offset = offset
+        self.lineno = lineno
+        self._data: Optional[Source] = None
+
+        # Each line after the first starts just past a newline. The newlines
+        # are scanned for rather than splitting the source into lines, which
+        # would copy all of it.
+        newline = '\n' if isinstance(source, str) else b'\n'
+        self.starts.extend(match.end() for match in re.finditer(newline, source))  # type: ignore
+        if not isinstance(source, str) and _NON_ASCII.search(source) is not None:
+            self._data = source
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """Returns the (line, column) number of the given offset in the source.
+
+        Both numbers are 1-based. The line number is relative to the larger
+        source, if any.
+        """
+        index = bisect_right(self.starts, offset)
+        start = self.starts[index - 1]
+        if self._data is not None:
+            return index + self.lineno - 1, _count_chars(self._data, start, offset) + 1
+        return index + self.lineno - 1, offset - start + 1
+
+    def sourcepos(self, offset: int) -> SourcePosition:
+        """Returns the rply.SourcePosition of the given offset in the source."""
+        # Importing any part of rply imports all of it, so this is deferred
+        # until a position is needed.
+        from rply.token import SourcePosition
+
+        lineno, colno = self.position(offset)
+        if self._data is not None:
+            offset = _count_chars(self._data, 0, offset)
+        return SourcePosition(offset + self.offset, lineno, colno)
+
+
+class TokenBuffer:
+    """A compact, array-backed sequence of tokens.
+
+    Rather than creating objects for every token, the buffer stores the
+    token type id, start offset and end offset of each token in parallel
+    arrays over the original source. The text and source position of a
+    token are only computed when requested; line and column numbers are
+    resolved through a :class:`LineIndex` that is built on first use.
+
+    Iterating over the buffer or indexing it returns :class:`BufferToken`
+    views which can be passed to the parser in place of rply.Token.
+
+    Parameters
+    ----------
+    source: Union[:class:`str`, bytes-like]
+        The source the tokens were lexed from. For a bytes-like source, the
+        offsets are byte offsets and the text of tokens is decoded as UTF-8
+        when requested.
+    type_names: Tuple[:class:`str`, ...]
+        The token type names, indexed by token type id.
+    offset: :class:`int`
+        The offset of the source, when it is a part of a larger source.
+        Source positions of the tokens are reported relative to the larger
+        source while the offsets in ``starts`` and ``ends`` are always
+        relative to ``source``.
+    lineno: :class:`int`
+        The line number of the first line of source, when it is a part of a
+        larger source.
+
+    Attributes
+    ----------
+    types: :class:`array.array`
+        The token type id of each token.
+    starts: :class:`array.array`
+        The start offset of each token in the source.
+    ends: :class:`array.array`
+        The end offset of each token in the source.
+    """
+    __slots__ = ('source', 'type_names', 'offset', 'lineno', 'types', 'starts', 'ends', '_lines')
+
+    def __init__(
+        self,
+        source: Source,
+        type_names: Tuple[str, ...],
+        offset: int = 0,
+        lineno: int = 1,
+    ) -> None:
+        offset_code = 'I' if len(source) < (1 << 32) else 'q'
+
+        self.source = source
+        self.type_names = type_names
+        self.offset = offset
+        self.lineno = lineno
+        self.types = array('B')
+        self.starts = array(offset_code)
+        self.ends = array(offset_code)
+        self._lines: Optional[LineIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    @property
+    def lines(self) -> LineIndex:
+        """The :class:`LineIndex` of the source."""
+        if self._lines is None:
+            self._lines = LineIndex(self.source, self.offset, self.lineno)
+        return self._lines
+
+    def __getitem__(self, index: int) -> BufferToken:
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError('token index out of range')
+        return BufferToken(self, index)
+
+    def __iter__(self) -> Iterator[BufferToken]:
+        for index in range(len(self.types)):
+            yield BufferToken(self, index)
+
+    def gettokentype(self, index: int) -> str:
+        """Returns the type name of the token at given index."""
+        return self.type_names[self.types[index]]
+
+    def getstr(self, index: int) -> str:
+        """Returns the text of the token at given index."""
+        return _text(self.source, self.starts[index], self.ends[index])
+
+    def getsourcepos(self, index: int) -> SourcePosition:
+        """Returns the source position of the token at given index."""
+        return self.getsourcepos_at(self.starts[index])
+
+    def getsourcepos_at(self, start: int) -> SourcePosition:
+        """Returns the source position of the given offset in the source."""
+        return self.lines.sourcepos(start)
+
+
+class BufferToken:
+    """A view of a single token in a :class:`TokenBuffer`.
+
+    This provides the same interface as rply.Token and is what the parser
+    consumes. Views are cheap to create and hold no token data of their own.
+    """
+    __slots__ = ('buffer', 'index')
+
+    def __init__(self, buffer: TokenBuffer, index: int) -> None:
+        self.buffer = buffer
+        self.index = index
+
+    def __repr__(self) -> str:
+        return 'Token(%r, %r)' % (self.name, self.value)
+
+    def __eq__(self, other: Any) -> bool:
+        try:
+            return self.name == other.name and self.value == other.value
+        except AttributeError:
+            return NotImplemented
+
+    @property
+    def name(self) -> str:
+        return self.buffer.gettokentype(self.index)
+
+    @property
+    def value(self) -> str:
+        return self.buffer.getstr(self.index)
+
+    @property
+    def source_pos(self) -> SourcePosition:
+        return self.buffer.getsourcepos(self.index)
+
+    def gettokentype(self) -> str:
+        return self.buffer.gettokentype(self.index)
+
+    def getstr(self) -> str:
+        return self.buffer.getstr(self.index)
+
+    def getsourcepos(self) -> SourcePosition:
+        return self.buffer.getsourcepos(self.index)
+
+
+def _text(source: Source, start: int, end: int) -> str:
+    text = source[start:end]
+    if isinstance(text, str):
+        return text
+    return bytes(text).decode('utf-8')
+
+def _count_chars(data: Source, start: int, end: int) -> int:
+    return len(bytes(data[start:end]).decode('utf-8', 'replace'))
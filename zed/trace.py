@@ -0,0 +1,187 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements execution tracing for Zed lang.
+
+A trace callback is called as ``callback(event, state, arg)`` for each of
+the following events:
+
+- ``'eval'``      : The statements of a program are about to be evaluated.
+                    ``arg`` is the list of statements.
+- ``'statement'`` : A statement is about to be evaluated. ``arg`` is the
+                    :class:`ast.Print`, :class:`ast.Let` or :class:`ast.Del`.
+- ``'define'``    : A variable is defined. ``arg`` is ``(ident, value)``.
+- ``'delete'``    : A variable is deleted. ``arg`` is the identifier.
+
+Identifiers are resolved while parsing, so the define and delete events
+happen during parsing while the others happen during evaluation by the tree
+engine. The vm and py engines do not evaluate the AST and are not traced.
+
+Tracing is set on a single :class:`ParserState`, whose methods are replaced
+by instrumented ones while a callback is set and restored when it is removed.
+Other states are unaffected and tracing costs nothing when not in use.
+
+The main components of this module are:
+
+- set_trace()    : Sets or removes the trace callback of a parser state.
+- get_trace()    : Returns the trace callback of a parser state.
+- format_event() : Formats an event as a line of text.
+- TRACE_EVENTS   : The names of the events.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, FrozenSet, Iterable, Optional, Tuple
+from zed.sentinels import UNDEFINED
+from zed.state import ParserState
+from zed import ast
+
+__all__ = (
+    "set_trace",
+    "get_trace",
+    "format_event",
+    "TRACE_EVENTS",
+)
+
+
+TRACE_EVENTS: Tuple[str, ...] = ('eval', 'statement', 'define', 'delete')
+
+TraceCallback = Callable[[str, ParserState, Any], Any]
+
+# The methods of ParserState replaced while tracing.
+_HOOKS: Tuple[str, ...] = ('eval_stmts', 'add_defn', 'del_defn')
+
+
+def set_trace(
+    state: ParserState,
+    callback: Optional[TraceCallback],
+    events: Optional[Iterable[str]] = None,
+    every: int = 1,
+) -> None:
+    """Sets the trace callback of given parser state, or removes it if None is given.
+
+    Parameters
+    ----------
+    state: :class:`ParserState`
+        The parser state to trace.
+    callback: Optional[Callable[[:class:`str`, :class:`ParserState`, Any], Any]]
+        The function called for each traced event.
+    events: Optional[Iterable[:class:`str`]]
+        The events to trace, from TRACE_EVENTS. Defaults to all events.
+    every: :class:`int`
+        Only call the callback for every Nth statement, to bound the cost of
+        tracing long runs. The other events are not sampled.
+    """
+    for name in _HOOKS:
+        state.__dict__.pop(name, None)
+    state.__dict__.pop('_tracer', None)
+
+    if callback is None:
+        return
+
+    selected = frozenset(TRACE_EVENTS if events is None else events)
+    unknown = selected.difference(TRACE_EVENTS)
+    if unknown:
+        raise ValueError('unknown trace events %s' % ', '.join(sorted(unknown)))
+    if every < 1:
+        raise ValueError('every must be at least 1')
+
+    # The hooks are set on the instance, where they take precedence over the
+    # methods of its class.
+    tracer = state._tracer = _Tracer(state, callback, selected, every)  # type: ignore
+    if selected.intersection(('eval', 'statement')):
+        state.eval_stmts = tracer.eval_stmts  # type: ignore
+    if 'define' in selected:
+        state.add_defn = tracer.add_defn  # type: ignore
+    if 'delete' in selected:
+        state.del_defn = tracer.del_defn  # type: ignore
+
+def get_trace(state: ParserState) -> Optional[TraceCallback]:
+    """Returns the trace callback of given parser state, or None if it is not traced."""
+    tracer = state.__dict__.get('_tracer')
+    return None if tracer is None else tracer.callback
+
+def format_event(event: str, arg: Any) -> str:
+    """Formats a trace event as a line of text, for example ``let a = 'x'``."""
+    if event == 'eval':
+        return 'eval %d statements' % len(arg)
+    if event == 'define':
+        return 'define %s = %s' % (arg[0], _format_value(arg[1]))
+    if event == 'delete':
+        return 'delete %s' % arg
+    if isinstance(arg, ast.Print):
+        return 'print %s' % _format_value(arg.value)
+    if isinstance(arg, ast.Let):
+        return 'let %s = %s' % (arg.ident, _format_value(arg.value))
+    if isinstance(arg, ast.Del):
+        return 'del %s' % arg.ident
+    return '%s %s' % (event, type(arg).__name__)
+
+
+class _Tracer:
+    # The instrumented methods of a traced parser state. The original
+    # methods are those of the class of state.
+    __slots__ = ('state', 'callback', 'events', 'every', 'counter')
+
+    def __init__(self, state: ParserState, callback: TraceCallback, events: FrozenSet[str], every: int) -> None:
+        self.state = state
+        self.callback = callback
+        self.events = events
+        self.every = every
+        self.counter = 0
+
+    def eval_stmts(self) -> None:
+        state, callback = self.state, self.callback
+        stmts = state._current_stmts_list
+        if 'eval' in self.events:
+            callback('eval', state, stmts)
+
+        if 'statement' not in self.events:
+            for stmt in stmts:
+                stmt.eval()
+        else:
+            # The counter carries over calls, as streamed programs are
+            # evaluated one statement group at a time.
+            every, counter = self.every, self.counter
+            for stmt in stmts:
+                if not counter % every:
+                    callback('statement', state, stmt)
+                counter += 1
+                stmt.eval()
+            self.counter = counter
+
+        stmts.clear()
+
+    def add_defn(self, ident: str, val: Any) -> None:
+        type(self.state).add_defn(self.state, ident, val)
+        self.callback('define', self.state, (ident, val))
+
+    def del_defn(self, ident: str) -> Any:
+        result = type(self.state).del_defn(self.state, ident)
+        self.callback('delete', self.state, ident)
+        return result
+
+
+def _format_value(value: Any) -> str:
+    if value is UNDEFINED or isinstance(value, ast.Undefined):
+        return 'undefined'
+    return repr(value.eval())
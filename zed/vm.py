@@ -0,0 +1,371 @@
+# MIT License
+
+# Copyright (c) 2022 I. Ahmad
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""This module implements the bytecode compiler and virtual machine for Zed lang.
+
+Rather than evaluating the AST nodes, a parsed program can be lowered to
+a flat array of instructions that operate on a constant pool and integer
+variable slots, and then executed by a dispatch loop.
+
+The dispatch loop is faster than evaluating the AST nodes, but compiling
+costs more than the evaluation time it saves. A single run of a program
+is therefore slower end to end than with the tree engine.
+
+The main components of this module are:
+
+- compile_program() : Compiles a parsed program to :class:`Bytecode`.
+- compile_file()    : Compiles a Zed file, using the on-disk bytecode cache.
+- load_cached()     : Loads the bytecode of a Zed file from the cache, if up to date.
+- iter_statements() : Iterates over the statements of a parsed program.
+- Bytecode          : The compiled form of a program.
+- VirtualMachine    : Executes the bytecode.
+
+Each instruction is two words: an opcode and its argument. The opcodes are:
+
+- LOAD_CONST k  : Loads constant k into the accumulator.
+- STORE_SLOT s  : Stores the accumulator in variable slot s.
+- DELETE_SLOT s : Clears variable slot s.
+- PRINT_CONST k : Prints constant k.
+- PRINT_SLOT s  : Prints the value of variable slot s.
+
+Like the Python backend, compile_file() stores the bytecode of a file in
+the ``__zedcache__`` directory next to it. As the tree engine prints the
+same output, a plain ``python -m zed file.zed`` runs the cached bytecode
+rather than lexing and parsing the file again.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+from array import array
+from zed.cache import read_cache, write_cache, get_program_cache_path, get_program_cache_key
+from zed.output import StreamSink
+from zed.sentinels import UNDEFINED
+from zed import ast
+
+import io
+import marshal
+
+if TYPE_CHECKING:
+    from zed.ast.base import BaseToken
+    from zed.output import OutputSink
+
+__all__ = (
+    "compile_program",
+    "compile_file",
+    "load_cached",
+    "iter_statements",
+    "Bytecode",
+    "VirtualMachine",
+)
+
+
+LOAD_CONST = 0
+STORE_SLOT = 1
+DELETE_SLOT = 2
+PRINT_CONST = 3
+PRINT_SLOT = 4
+
+OPNAMES: Tuple[str, ...] = ('LOAD_CONST', 'STORE_SLOT', 'DELETE_SLOT', 'PRINT_CONST', 'PRINT_SLOT')
+
+_CACHE_MAGIC = b'ZEDB'
+
+
+class Bytecode:
+    """The compiled form of a Zed program.
+
+    Attributes
+    ----------
+    instructions: :class:`array.array`
+        The flat array of (opcode, argument) pairs.
+    consts: Tuple[Any, ...]
+        The constant pool.
+    names: Tuple[:class:`str`, ...]
+        The identifier of each variable slot.
+    """
+    __slots__ = ('instructions', 'consts', 'names')
+
+    def __init__(self, instructions: array, consts: Tuple[Any, ...], names: Tuple[str, ...]) -> None:
+        self.instructions = instructions
+        self.consts = consts
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.instructions) // 2
+
+    def disassemble(self) -> List[str]:
+        """Returns a human readable listing of the instructions."""
+        lines = []
+        it = iter(self.instructions)
+        for index, (op, arg) in enumerate(zip(it, it)):
+            if op in (LOAD_CONST, PRINT_CONST):
+                operand = repr(self.consts[arg])
+            else:
+                operand = self.names[arg]
+            lines.append('%6d %-12s %4d (%s)' % (index, OPNAMES[op], arg, operand))
+        return lines
+
+    def to_bytes(self) -> bytes:
+        """Returns the bytecode serialized for from_bytes()."""
+        # The undefined constant is the only one that is not a string.
+        consts = tuple(None if const is UNDEFINED else const for const in self.consts)
+        return marshal.dumps((self.instructions.typecode, self.instructions.tobytes(), consts, self.names))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Bytecode:
+        """Returns the bytecode serialized by to_bytes().
+
+        Raises ValueError if the data is not serialized bytecode.
+        """
+        try:
+            typecode, instructions, consts, names = marshal.loads(data)
+            code = array(typecode, instructions)
+        except (EOFError, TypeError) as error:
+            raise ValueError('invalid bytecode: %s' % error) from None
+
+        consts = tuple(UNDEFINED if const is None else const for const in consts)
+        return cls(code, consts, tuple(names))
+
+
+class Bindings:
+    """Tracks which variable each value node is bound to while compiling.
+
+    Identifiers are resolved to their value by the parser, so a print
+    statement only holds the value node. Replaying the let and del
+    statements in order recovers a variable that the value may be
+    loaded from instead.
+    """
+    def __init__(self) -> None:
+        # Maps id() of a value node to a variable that it is currently
+        # bound to, and each bound variable back to the id() of its value.
+        self._bound: Dict[int, str] = {}
+        self._values: Dict[str, int] = {}
+
+    def bind(self, ident: str, node: Any) -> None:
+        self.unbind(ident)
+        key = id(node)
+        self._values[ident] = key
+        self._bound.setdefault(key, ident)
+
+    def unbind(self, ident: str) -> bool:
+        """Unbinds the variable and returns whether it was bound."""
+        key = self._values.pop(ident, None)
+        if key is not None and self._bound.get(key) == ident:
+            del self._bound[key]
+        return key is not None
+
+    def lookup(self, node: Any) -> Optional[str]:
+        """Returns a variable currently bound to the node, if any."""
+        return self._bound.get(id(node))
+
+
+class _Compiler:
+    def __init__(self) -> None:
+        self.instructions = array('l')
+        self.consts: List[Any] = []
+        self.const_index: Dict[Tuple[str, Any], int] = {}
+        self.names: List[str] = []
+        self.slots: Dict[str, int] = {}
+        self.bindings = Bindings()
+
+    def emit(self, op: int, arg: int) -> None:
+        self.instructions.append(op)
+        self.instructions.append(arg)
+
+    def const(self, node: Any) -> int:
+        value = node.eval()
+        if isinstance(value, str):
+            key = ('str', value)
+        else:
+            key = (type(value).__name__, None)
+
+        try:
+            return self.const_index[key]
+        except KeyError:
+            index = self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+            return index
+
+    def slot(self, ident: str) -> int:
+        try:
+            return self.slots[ident]
+        except KeyError:
+            slot = self.slots[ident] = len(self.names)
+            self.names.append(ident)
+            return slot
+
+    def compile(self, stmt: BaseToken) -> None:
+        if isinstance(stmt, ast.Print):
+            ident = self.bindings.lookup(stmt.value)
+            if ident is None:
+                self.emit(PRINT_CONST, self.const(stmt.value))
+            else:
+                self.emit(PRINT_SLOT, self.slot(ident))
+        elif isinstance(stmt, ast.Let):
+            self.emit(LOAD_CONST, self.const(stmt.value))
+            self.emit(STORE_SLOT, self.slot(stmt.ident))
+            self.bindings.bind(stmt.ident, stmt.value)
+        elif isinstance(stmt, ast.Del):
+            self.emit(DELETE_SLOT, self.slot(stmt.ident))
+            self.bindings.unbind(stmt.ident)
+        else:
+            raise TypeError('cannot compile %r' % type(stmt).__name__)
+
+
+def iter_statements(program: ast.Program) -> Iterator[BaseToken]:
+    """Returns an iterator of the statements of a parsed program, in order."""
+    for token in program.tokens:
+        if isinstance(token, ast.Statements):
+            yield from token.state.get_stmts()
+        else:
+            yield token
+
+def compile_program(program: ast.Program) -> Bytecode:
+    """Compiles a parsed program to :class:`Bytecode`.
+
+    Parameters
+    ----------
+    program: :class:`ast.Program`
+        The program returned by the parser.
+    """
+    compiler = _Compiler()
+    for stmt in iter_statements(program):
+        compiler.compile(stmt)
+
+    return Bytecode(compiler.instructions, tuple(compiler.consts), tuple(compiler.names))
+
+def compile_file(
+    filename: str,
+    cache_dir: Optional[str] = None,
+    use_cache: bool = True,
+    lexer: str = 'rply',
+    optimize: int = 0,
+    parser: str = 'rply',
+) -> Bytecode:
+    """Compiles the given Zed file to :class:`Bytecode`.
+
+    If the file has been compiled before, the bytecode is loaded from the
+    cache without lexing or parsing the source.
+
+    Parameters
+    ----------
+    filename: :class:`str`
+        The path of file to compile.
+    cache_dir: Optional[:class:`str`]
+        The directory to store the cache files in. Defaults to a
+        ``__zedcache__`` directory next to the file.
+    use_cache: :class:`bool`
+        Whether to read and write the cache.
+    lexer: :class:`str`
+        The lexer engine to use, see get_lexer().
+    optimize: :class:`int`
+        The optimization level, see zed.optimize().
+    parser: :class:`str`
+        The parser engine to use, see get_parser(). Both engines compile to
+        the same bytecode, so the cache is shared between them.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+
+    if not use_cache:
+        return _compile_source(data, lexer, optimize, parser)
+
+    path = get_program_cache_path(filename, cache_dir, 'b')
+    key = get_program_cache_key(_CACHE_MAGIC, data, lexer, optimize)
+    code = _load(path, key)
+    if code is None:
+        code = _compile_source(data, lexer, optimize, parser)
+        write_cache(path, key + code.to_bytes())
+    return code
+
+def load_cached(
+    filename: str,
+    cache_dir: Optional[str] = None,
+    lexer: str = 'rply',
+    optimize: int = 0,
+) -> Optional[Bytecode]:
+    """Returns the bytecode of the given file stored by compile_file().
+
+    Returns None if the file has not been compiled with the given options
+    or has been modified since. See compile_file() for the parameters.
+    """
+    with open(filename, 'rb') as f:
+        data = f.read()
+    path = get_program_cache_path(filename, cache_dir, 'b')
+    return _load(path, get_program_cache_key(_CACHE_MAGIC, data, lexer, optimize))
+
+
+class VirtualMachine:
+    """Executes the :class:`Bytecode` of a program."""
+    def run(self, code: Bytecode, output: Optional[OutputSink] = None) -> None:
+        """Runs the given bytecode.
+
+        The output of print statements is written to the given sink, or
+        to the standard output if not given.
+        """
+        write = (output or StreamSink()).write
+        # The printed form of each constant is computed once.
+        lines = [str(const) + '\n' for const in code.consts]
+        consts = code.consts
+        slots: List[Any] = [None] * len(code.names)
+        acc = None
+
+        # There are no jumps so the instructions are consumed in order.
+        it = iter(code.instructions)
+        for op in it:
+            arg = next(it)
+            if op == PRINT_CONST:
+                write(lines[arg])
+            elif op == PRINT_SLOT:
+                write(str(slots[arg]) + '\n')
+            elif op == LOAD_CONST:
+                acc = consts[arg]
+            elif op == STORE_SLOT:
+                slots[arg] = acc
+            elif op == DELETE_SLOT:
+                slots[arg] = None
+            else:
+                raise RuntimeError('invalid opcode %r' % op)
+
+
+def _load(path: str, key: bytes) -> Optional[Bytecode]:
+    cached = read_cache(path)
+    if cached is None or cached[:len(key)] != key:
+        return None
+    try:
+        return Bytecode.from_bytes(cached[len(key):])
+    except ValueError:
+        return None
+
+def _compile_source(data: bytes, lexer: str, optimize: int, parser: str) -> Bytecode:
+    from zed.lexer import get_lexer
+    from zed.optimizer import optimize as optimize_program
+    from zed.output import NullSink
+    from zed.parser import get_parser
+    from zed.state import ParserState
+
+    # Decode the same way as reading the file in text mode would.
+    source = io.TextIOWrapper(io.BytesIO(data)).read()
+    program = get_parser(engine=parser).parse(get_lexer(lexer).lex(source), state=ParserState(NullSink()))
+    if optimize:
+        optimize_program(program, optimize)  # type: ignore
+    return compile_program(program)  # type: ignore